@@ -1,6 +1,10 @@
 from django.contrib import admin
-from django.contrib import admin
-from .models import Activo, Historial, Categoria, Marca
+from django.conf import settings
+from django.contrib import admin, messages
+from .archivo import dados_de_baja
+from .eliminacion import eliminar_activos
+from .models import Activo, ActivoArchivado, Historial, Categoria, Marca, Tranzabilidad
+from .referencias import referencias
 
 class MarcaInline(admin.TabularInline):
     model = Marca
@@ -25,6 +29,21 @@ class ActivoAdmin(admin.ModelAdmin):
     search_fields = ('item', 'activo', 'imei1', 'imei2', 'sn', 'documento', 'nombres_apellidos')
     ordering = ('item',)
     readonly_fields = ('fecha_creacion', 'fecha_modificacion')
+    actions = ['archivar_dados_de_baja']
+
+    @admin.action(description='Archivar los seleccionados dados de baja (según ARCHIVO_DIAS_BAJA)')
+    def archivar_dados_de_baja(self, request, queryset):
+        if not request.user.groups.filter(name='Administrador').exists() and not request.user.is_superuser:
+            self.message_user(request, 'Solo un administrador puede archivar activos.', messages.ERROR)
+            return
+        items = list(dados_de_baja(settings.ARCHIVO_DIAS_BAJA, queryset).values_list('pk', flat=True))
+        archivados = eliminar_activos(items, request.user, archivar=True)
+        omitidos = queryset.count()
+        self.message_user(
+            request,
+            f'Se archivaron {archivados} activo(s). {omitidos} seleccionado(s) no cumplían la condición y se mantienen.',
+            messages.SUCCESS
+        )
 
     def has_add_permission(self, request):
         return request.user.groups.filter(name__in=['Administrador', 'Bodega']).exists()
@@ -47,15 +66,27 @@ class ActivoAdmin(admin.ModelAdmin):
         return request.user.groups.filter(name='Administrador').exists()
 
     def save_model(self, request, obj, form, change):
-        if change:
-            # Registrar cambios en historial
+        if change and form.changed_data:
+            # Registrar cambios en historial, enlazados al movimiento que los agrupa
+            movimiento = Tranzabilidad.objects.create(
+                activo=obj,
+                tipo='actualizacion',
+                usuario=request.user,
+                # El formulario tiene el id de la zona anterior; el movimiento guarda el nombre
+                zona_origen=referencias().nombre_zona(form.initial.get('zona')),
+                zona_destino=obj.zona,
+                estado_anterior=form.initial.get('estado'),
+                estado_nuevo=obj.estado,
+                descripcion='Actualización desde el administrador: ' + ', '.join(form.changed_data)
+            )
             for field in form.changed_data:
                 Historial.objects.create(
                     activo=obj,
                     usuario=request.user,
                     campo_cambiado=field,
                     valor_anterior=form.initial.get(field),
-                    valor_nuevo=getattr(obj, field)
+                    valor_nuevo=getattr(obj, field),
+                    movimiento=movimiento
                 )
         super().save_model(request, obj, form, change)
 
@@ -64,7 +95,23 @@ class HistorialAdmin(admin.ModelAdmin):
     list_display = ('activo', 'usuario', 'campo_cambiado', 'fecha')
     list_filter = ('campo_cambiado', 'fecha')
     search_fields = ('activo__item', 'usuario__username', 'campo_cambiado')
-    readonly_fields = ('activo', 'usuario', 'campo_cambiado', 'valor_anterior', 'valor_nuevo', 'fecha')
+    readonly_fields = ('activo', 'usuario', 'campo_cambiado', 'valor_anterior', 'valor_nuevo', 'fecha', 'movimiento')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.groups.filter(name='Administrador').exists()
+
+@admin.register(ActivoArchivado)
+class ActivoArchivadoAdmin(admin.ModelAdmin):
+    list_display = ('item', 'activo', 'sn', 'estado', 'zona', 'fecha_archivo', 'archivado_por')
+    list_filter = ('zona', 'fecha_archivo')
+    search_fields = ('item', 'activo', 'imei1', 'imei2', 'sn', 'documento', 'nombres_apellidos')
+    ordering = ('item',)
 
     def has_add_permission(self, request):
         return False
@@ -0,0 +1,90 @@
+"""
+Archivo de activos retirados del inventario.
+
+archivar_activos() copia activos con sus movimientos (Tranzabilidad) y su
+historial de cambios a ActivoArchivado, TranzabilidadArchivada y
+HistorialArchivado, que tienen las mismas columnas y conservan los ids, y
+borra los movimientos e historial originales. Así las tablas en uso no crecen
+con activos que ya no circulan y su trazabilidad no se pierde.
+
+La política es archivar los activos dados de baja hace más de
+ARCHIVO_DIAS_BAJA días (comando archivar_activos o la acción del admin); el
+movimiento en sí lo hace eliminar_activos(..., archivar=True) por lotes.
+"""
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from .estadisticas import BAJA_Q
+from .models import (Activo, ActivoArchivado, Historial, HistorialArchivado, Tranzabilidad,
+                     TranzabilidadArchivada)
+
+
+# Filas por INSERT al copiar a las tablas de archivo
+TAMANO_LOTE = 1000
+
+
+def dados_de_baja(dias, queryset=None):
+    """Activos dados de baja sin modificaciones en los últimos `dias` días."""
+    activos = Activo.objects.all() if queryset is None else queryset
+    return activos.filter(BAJA_Q, fecha_modificacion__lt=timezone.now() - timedelta(days=dias))
+
+
+def columnas_comunes(origen, destino):
+    """attname de las columnas de `origen` que también tiene `destino`."""
+    destino = {campo.attname for campo in destino._meta.concrete_fields}
+    return [campo.attname for campo in origen._meta.concrete_fields if campo.attname in destino]
+
+
+def copiar(queryset, destino, **extra):
+    """Inserta en `destino` las filas del queryset (columnas comunes más `extra`). Devuelve cuántas."""
+    columnas = columnas_comunes(queryset.model, destino)
+    filas = [destino(**dict(zip(columnas, valores)), **extra)
+             for valores in queryset.order_by().values_list(*columnas).iterator(chunk_size=TAMANO_LOTE)]
+    destino.objects.bulk_create(filas, batch_size=TAMANO_LOTE)
+    return len(filas)
+
+
+def borrar_sin_senales(queryset, tamano_lote=TAMANO_LOTE):
+    """
+    Borra las filas del queryset con DELETE ... WHERE pk IN (...) directo, de a
+    `tamano_lote` ids (así la memoria no depende del total). No pasa por el
+    Collector ni por las señales: quien llama ya se encargó de las filas
+    relacionadas, del resumen, del índice y de las cachés.
+    Devuelve cuántas filas borró.
+    """
+    connection = connections[queryset.db]
+    opciones = queryset.model._meta
+    tabla = connection.ops.quote_name(opciones.db_table)
+    columna = connection.ops.quote_name(opciones.pk.column)
+    tamano_lote = min(tamano_lote, connection.features.max_query_params or tamano_lote)
+    borradas = 0
+    with connection.cursor() as cursor:
+        while True:
+            ids = list(queryset.order_by().values_list('pk', flat=True)[:tamano_lote])
+            if not ids:
+                return borradas
+            marcas = ', '.join(['%s'] * len(ids))
+            cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({marcas})', ids)
+            borradas += cursor.rowcount
+
+
+def archivar_activos(items, usuario=None):
+    """
+    Copia los activos, sus movimientos y su historial al archivo y borra los
+    movimientos e historial originales. Los activos quedan en Activo: quien
+    llama los borra después de ajustar el resumen (ver activos/eliminacion.py).
+    Debe llamarse dentro de una transacción.
+    """
+    movimientos = Tranzabilidad.objects.filter(activo_id__in=items)
+    historial = Historial.objects.filter(activo_id__in=items)
+
+    copiar(Activo.objects.filter(pk__in=items), ActivoArchivado, archivado_por=usuario)
+    copiar(movimientos, TranzabilidadArchivada)
+    # El enlace al movimiento se conserva solo si ese movimiento también se archivó
+    copiar(historial.filter(movimiento__activo_id__in=items), HistorialArchivado)
+    copiar(historial.exclude(movimiento__activo_id__in=items), HistorialArchivado, movimiento=None)
+
+    borrar_sin_senales(historial)
+    borrar_sin_senales(movimientos)
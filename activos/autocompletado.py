@@ -0,0 +1,43 @@
+"""
+Datos de apoyo de los formularios de Activo (crear, editar, asignar): las
+marcas agrupadas por categoría para el filtrado dinámico.
+
+Se sirven como un único JSON con un ETag que es el hash del contenido: el
+navegador lo guarda en localStorage y solo lo vuelve a descargar cuando
+cambió. El JSON se arma a partir de las referencias en memoria
+(activos/referencias.py) una vez por versión; si al recalcularlo el contenido
+es el mismo, el ETag no cambia y el navegador recibe un 304.
+
+Las listas de documentos, nombres y centros de costo no van aquí: crecen con el
+inventario y se piden por prefijo a activos/sugerencias.py.
+"""
+import hashlib
+import json
+
+from .referencias import referencias
+
+
+# (Referencias de las que salió, datos)
+_ultimo = (None, None)
+
+
+def _construir(refs):
+    # Marcas agrupadas por categoría; ordenadas para que el hash solo cambie cuando cambian los datos
+    marcas_por_categoria = {}
+    for marca in refs.marcas:
+        marcas_por_categoria.setdefault(marca.categoria_id, []).append({'id': marca.pk, 'nombre': marca.nombre})
+    datos = {'marcas_por_categoria': marcas_por_categoria}
+
+    contenido = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {'etag': hashlib.sha1(contenido).hexdigest()[:20], 'contenido': contenido}
+
+
+def autocompletado():
+    """{'etag', 'contenido'} con el JSON de las referencias vigentes."""
+    global _ultimo
+    refs = referencias()
+    origen, datos = _ultimo
+    if origen is not refs:
+        datos = _construir(refs)
+        _ultimo = (refs, datos)
+    return datos
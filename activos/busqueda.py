@@ -0,0 +1,113 @@
+"""
+Búsqueda de activos por niveles para el lector de la PDA (buscar_activos_ajax).
+
+1. exacto:   igualdad en sn, imei1, imei2, iccid o MAC normalizados.
+2. prefijo:  el término es el inicio de alguno de los campos de búsqueda.
+3. contiene: el término aparece en cualquier parte.
+
+Todos los niveles consultan las columnas normalizadas (con índice). Cada nivel
+solo se ejecuta si los anteriores no llenaron el límite, y los resultados se
+devuelven ordenados por nivel. Con modo='exacto' solo se ejecuta el primero.
+
+Si el índice en memoria (activos/indice.py) está listo, la búsqueda se responde
+desde él con los mismos niveles, sin consultar la base de datos.
+
+Con incluir_archivo=True, si los activos en uso no llenan el límite se completa
+con ActivoArchivado (mismas columnas), marcando esos resultados con 'archivado'.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Q
+
+from .indice import indice
+from .models import Activo, ActivoArchivado
+
+
+LIMITE = 20
+
+# Códigos que se escanean: un código leído coincide completo con uno de ellos
+CAMPOS_EXACTOS = ('sn_normalizado', 'imei1_normalizado', 'imei2_normalizado', 'iccid_normalizado',
+                  'mac_superflex_normalizado')
+
+CAMPOS_TEXTO = CAMPOS_EXACTOS + ('documento_normalizado', 'activo_normalizado')
+
+# nombres_apellidos solo participa como subcadena (índice de trigramas en PostgreSQL)
+CAMPOS_SUBCADENA = CAMPOS_TEXTO + ('nombres_apellidos_normalizado',)
+
+# La zona va como id: quien muestra los resultados resuelve el nombre
+VALORES = ('item', 'activo', 'sn', 'documento', 'imei1', 'zona_id', 'responsable', 'estado')
+
+# Mayor que cualquier carácter: con orden por bytes, 'ABC' <= x < 'ABC' + FIN_RANGO
+# equivale a "empieza por ABC"
+FIN_RANGO = '\U0010ffff'
+
+MODOS = ('exacto', 'completo')
+
+
+def _exacto(campo, termino):
+    return Q(**{campo: termino})
+
+
+def filtro_prefijo(campo, termino):
+    """
+    "Empieza por el término". En SQLite (BINARY, orden por bytes) el rango deja
+    usar el índice B-tree, que LIKE 'x%' no usa. En PostgreSQL el rango no vale
+    con las collations lingüísticas (glibc/ICU) y se usa solo LIKE 'x%', que
+    resuelven los índices varchar_pattern_ops (los *_like que Django crea para
+    las columnas con db_index y activos_sugerido_prefijo_like).
+    """
+    if connection.vendor != 'sqlite':
+        return Q(**{f'{campo}__startswith': termino})
+    return Q(**{
+        f'{campo}__gte': termino,
+        f'{campo}__lt': termino + FIN_RANGO,
+        f'{campo}__startswith': termino,
+    })
+
+
+def _contiene(campo, termino):
+    return Q(**{f'{campo}__contains': termino})
+
+
+NIVELES = [
+    ('exacto', _exacto, CAMPOS_EXACTOS),
+    ('prefijo', filtro_prefijo, CAMPOS_TEXTO),
+    ('contiene', _contiene, CAMPOS_SUBCADENA),
+]
+
+
+def _buscar_sql(modelo, termino, limite, modo):
+    niveles = NIVELES[:1] if modo == 'exacto' else NIVELES
+    resultados = []
+    vistos = set()
+    for nivel, condicion, campos in niveles:
+        faltan = limite - len(resultados)
+        if faltan <= 0:
+            break
+        filtro = reduce(or_, (condicion(campo, termino) for campo in campos))
+        consulta = modelo.objects.filter(filtro)
+        if vistos:
+            consulta = consulta.exclude(item__in=vistos)
+        for fila in consulta.order_by('item').values(*VALORES)[:faltan]:
+            fila['nivel'] = nivel
+            vistos.add(fila['item'])
+            resultados.append(fila)
+    return resultados
+
+
+def buscar(termino, limite=LIMITE, modo='completo', incluir_archivo=False):
+    """
+    Busca el término ya normalizado. Devuelve hasta `limite` diccionarios con
+    los campos de VALORES más 'nivel' (y 'archivado' en los del archivo).
+    """
+    resultados = indice.buscar(termino, limite, modo)
+    if resultados is None:
+        resultados = _buscar_sql(Activo, termino, limite, modo)
+
+    if incluir_archivo and len(resultados) < limite:
+        for fila in _buscar_sql(ActivoArchivado, termino, limite - len(resultados), modo):
+            fila['archivado'] = True
+            resultados.append(fila)
+    return resultados
@@ -0,0 +1,138 @@
+"""
+Exportación incremental (delta) del inventario para integraciones como BI.
+
+En lugar de exportar todo cada noche, el cliente guarda una marca de agua (una
+fecha) y pide solo lo ocurrido después de ella:
+
+- activos creados o modificados (fecha_modificacion, índice
+  activos_activo_fmod_item_idx),
+- movimientos de Tranzabilidad (fecha),
+- activos eliminados o archivados, tomados de los movimientos 'eliminacion'
+  (item_eliminado; en registros anteriores a ese campo solo queda el serial
+  de la descripción).
+
+La ventana es (desde, hasta], con hasta = ahora - DELTA_MARGEN_SEGUNDOS: un
+cambio de una transacción que aún no se confirma queda con una fecha anterior
+a la de su COMMIT, el margen evita saltárselo. La última línea trae hasta como
+la marca para la siguiente exportación.
+
+Formato NDJSON, un objeto por línea con una sola clave:
+{"delta": {...}}, {"activo": {...}}, {"movimiento": {...}},
+{"eliminado": {...}} y al final {"fin": {"siguiente": ..., conteos}}.
+Si falta la línea "fin" la exportación se cortó y la marca no debe avanzar.
+"""
+import json
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .exportacion import COLUMNAS_PLANAS, TAMANO_BLOQUE, por_envios
+from .models import Activo, Tranzabilidad
+
+
+CAMPOS_MOVIMIENTO = [
+    ('id', 'id'),
+    ('activo_id', 'item'),
+    ('tipo', 'tipo'),
+    ('usuario__username', 'usuario'),
+    ('zona_origen', 'zona_origen'),
+    ('zona_destino', 'zona_destino'),
+    ('estado_anterior', 'estado_anterior'),
+    ('estado_nuevo', 'estado_nuevo'),
+    ('descripcion', 'descripcion'),
+    ('fecha', 'fecha'),
+]
+
+# Serial en la descripción de las eliminaciones: "Activo eliminado. Serial: X, Documento: Y"
+PATRON_SERIAL = re.compile(r'Serial: (.*?), Documento:')
+
+
+class MarcaInvalida(ValueError):
+    """La marca de agua no es una fecha ISO 8601."""
+
+
+def leer_marca(texto):
+    """Fecha (aware) de una marca ISO 8601; None si viene vacía (exportación completa)."""
+    if not texto:
+        return None
+    try:
+        fecha = parse_datetime(texto.strip())
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise MarcaInvalida(f'Marca de agua inválida: {texto!r}; se espera una fecha ISO 8601.')
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def fin_de_ventana(desde=None):
+    """Límite superior de la ventana; nunca anterior a desde (la ventana queda vacía)."""
+    hasta = timezone.now() - timedelta(seconds=settings.DELTA_MARGEN_SEGUNDOS)
+    if desde is not None and hasta < desde:
+        return desde
+    return hasta
+
+
+def _en_ventana(queryset, campo, desde, hasta):
+    queryset = queryset.filter(**{f'{campo}__lte': hasta})
+    if desde is not None:
+        queryset = queryset.filter(**{f'{campo}__gt': desde})
+    return queryset
+
+
+def activos_modificados(desde, hasta):
+    campos = [campo for campo, _, _ in COLUMNAS_PLANAS]
+    claves = [clave for _, clave, _ in COLUMNAS_PLANAS]
+    filas = (_en_ventana(Activo.objects.all(), 'fecha_modificacion', desde, hasta)
+             .order_by('fecha_modificacion', 'item').values_list(*campos))
+    for fila in filas.iterator(chunk_size=TAMANO_BLOQUE):
+        yield dict(zip(claves, fila))
+
+
+def movimientos(desde, hasta):
+    campos = [campo for campo, _ in CAMPOS_MOVIMIENTO]
+    claves = [clave for _, clave in CAMPOS_MOVIMIENTO]
+    filas = (_en_ventana(Tranzabilidad.objects.all(), 'fecha', desde, hasta)
+             .order_by('fecha', 'id').values_list(*campos))
+    for fila in filas.iterator(chunk_size=TAMANO_BLOQUE):
+        yield dict(zip(claves, fila))
+
+
+def eliminados(desde, hasta):
+    filas = (_en_ventana(Tranzabilidad.objects.filter(tipo='eliminacion'), 'fecha', desde, hasta)
+             .order_by('fecha', 'id').values_list('id', 'item_eliminado', 'descripcion', 'fecha'))
+    for id_movimiento, item, descripcion, fecha in filas.iterator(chunk_size=TAMANO_BLOQUE):
+        serial = PATRON_SERIAL.search(descripcion or '')
+        yield {
+            'item': item,
+            'sn': serial.group(1) if serial else None,
+            'archivado': 'archivado' in (descripcion or ''),
+            'movimiento': id_movimiento,
+            'fecha': fecha,
+        }
+
+
+def _linea(clave, datos):
+    return json.dumps({clave: datos}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def lineas_delta(desde, hasta):
+    """Bloques de texto NDJSON con los cambios en (desde, hasta]."""
+    conteos = {'activos': 0, 'movimientos': 0, 'eliminados': 0}
+
+    def contar(clave, conteo, filas):
+        for datos in filas:
+            conteos[conteo] += 1
+            yield _linea(clave, datos)
+
+    # isoformat() conserva los microsegundos (DjangoJSONEncoder los recorta a milisegundos)
+    yield _linea('delta', {'desde': desde and desde.isoformat(), 'hasta': hasta.isoformat()})
+    yield from por_envios(contar('activo', 'activos', activos_modificados(desde, hasta)))
+    yield from por_envios(contar('movimiento', 'movimientos', movimientos(desde, hasta)))
+    yield from por_envios(contar('eliminado', 'eliminados', eliminados(desde, hasta)))
+    yield _linea('fin', {'siguiente': hasta.isoformat(), **conteos})
@@ -0,0 +1,85 @@
+"""
+Eliminación masiva de activos.
+
+Los activos se procesan por lotes de TAMANO_LOTE, cada uno en su propia
+transacción, para no tener bloqueadas las tablas durante toda la operación.
+Por lote: los registros de eliminación en Tranzabilidad van en un solo
+bulk_create, el historial se borra y los movimientos se desenlazan con una
+consulta cada uno, y los activos se borran con un DELETE directo por ids
+(archivo.borrar_sin_senales). Como eso no pasa por las señales, aquí mismo se
+descuenta del resumen y se actualizan el índice de búsqueda y los dashboards.
+
+Con archivar=True los activos, sus movimientos y su historial pasan a las
+tablas de archivo (activos/archivo.py) en vez de perderse.
+"""
+import logging
+from collections import Counter
+
+from django.db import transaction
+
+from .archivo import archivar_activos, borrar_sin_senales
+from .estadisticas import invalidar_dashboards
+from .indice import indice
+from .models import Activo, Historial, Tranzabilidad
+from .resumen import clave, aplicar
+
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+
+
+def _quitar_del_indice(items):
+    indice.quitar_varios(items)
+
+
+def _eliminar_lote(items, usuario, archivar):
+    with transaction.atomic():
+        activos = list(Activo.objects.filter(pk__in=items).select_for_update())
+        if not activos:
+            return 0
+        items = [activo.pk for activo in activos]
+
+        accion = 'archivado' if archivar else 'eliminado'
+        Tranzabilidad.objects.bulk_create([
+            Tranzabilidad(
+                tipo='eliminacion',
+                usuario=usuario,
+                item_eliminado=activo.pk,
+                descripcion=f'Activo {accion} (Masivo). Serial: {activo.sn}, Documento: {activo.documento}'
+            )
+            for activo in activos
+        ])
+
+        if archivar:
+            archivar_activos(items, usuario)
+        else:
+            borrar_sin_senales(Historial.objects.filter(activo_id__in=items))
+            Tranzabilidad.objects.filter(activo_id__in=items).update(activo=None)
+
+        resumen = Counter()
+        for activo in activos:
+            resumen[clave(activo)] -= 1
+        aplicar(resumen)
+        borrar_sin_senales(Activo.objects.filter(pk__in=items))
+
+        transaction.on_commit(lambda: _quitar_del_indice(items))
+        transaction.on_commit(invalidar_dashboards)
+    return len(activos)
+
+
+def eliminar_activos(items, usuario, archivar=False, tamano_lote=TAMANO_LOTE, al_avanzar=None):
+    """
+    Elimina (o archiva) los activos con esos items por lotes. al_avanzar(procesados, total)
+    se llama después de cada lote. Devuelve cuántos activos se eliminaron.
+    """
+    items = sorted({int(item) for item in items})
+    total = len(items)
+    eliminados = 0
+    for inicio in range(0, total, tamano_lote):
+        eliminados += _eliminar_lote(items[inicio:inicio + tamano_lote], usuario, archivar)
+        procesados = min(inicio + tamano_lote, total)
+        logger.info('Eliminación masiva: %s de %s activos procesados', procesados, total)
+        if al_avanzar:
+            al_avanzar(procesados, total)
+    return eliminados
@@ -0,0 +1,118 @@
+"""
+Estadísticas de inventario para los dashboards.
+
+Las cifras salen de InventarioResumen (ver activos/resumen.py), que tiene unas
+decenas de filas: los contadores generales con una sola consulta de agregación
+condicional (Sum(filter=...)) y los desgloses por zona, categoría, estado y
+operador acumulando en Python esas mismas filas.
+
+Cada dashboard guarda además un snapshot en la caché de Django; las señales de
+activos/signals.py lo invalidan cuando cambia un Activo o un movimiento y
+DASHBOARD_CACHE_SEGUNDOS actúa como red de seguridad.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Activo, InventarioResumen, Tranzabilidad, ESTADO_ASIGNADO, ESTADO_BAJA, ESTADO_CONFIRMADO
+
+
+# Definiciones mutuamente excluyentes
+BAJA_Q = Q(estado=ESTADO_BAJA)
+# con_persona: nombres_apellidos no vacío
+ASIGNADO_Q = Q(estado=ESTADO_ASIGNADO) | Q(con_persona=True)
+CONFIRMADO_Q = Q(estado=ESTADO_CONFIRMADO)
+
+
+def contadores():
+    """total_activos, asignados, en_bodega y dados_baja en una sola consulta."""
+    return InventarioResumen.objects.aggregate(
+        total_activos=Coalesce(Sum('total'), 0),
+        # 1. Dados de Baja
+        dados_baja=Coalesce(Sum('total', filter=BAJA_Q), 0),
+        # 2. Asignados: condición de asignado y NO baja
+        asignados=Coalesce(Sum('total', filter=ASIGNADO_Q & ~BAJA_Q), 0),
+        # 3. En Bodega: confirmado y NO (asignado o baja)
+        en_bodega=Coalesce(Sum('total', filter=CONFIRMADO_Q & ~ASIGNADO_Q & ~BAJA_Q), 0),
+    )
+
+
+def _ordenar(conteo, clave):
+    # +conteo descarta las combinaciones que quedaron en cero
+    return [{clave: valor, 'total': total} for valor, total in (+conteo).most_common()]
+
+
+def desgloses():
+    """Activos por zona, categoría, estado y operador a partir de las filas del resumen."""
+    por_zona = Counter()
+    por_categoria = Counter()
+    por_estado = Counter()
+    por_operador = Counter()
+
+    filas = InventarioResumen.objects.values_list('zona__nombre', 'categoria__nombre', 'estado', 'operador', 'total')
+    for zona, categoria, estado, operador, total in filas:
+        por_zona[zona] += total
+        por_categoria[categoria] += total
+        por_estado[estado] += total
+        if operador:
+            por_operador[operador] += total
+
+    return {
+        'activos_por_zona': _ordenar(por_zona, 'zona'),
+        'activos_por_categoria': _ordenar(por_categoria, 'categoria__nombre'),
+        'activos_por_estado': _ordenar(por_estado, 'estado'),
+        'activos_por_operador': _ordenar(por_operador, 'operador'),
+    }
+
+
+def resumen_dashboard():
+    """Contadores y desgloses que usan los tres dashboards (dos consultas)."""
+    resumen = contadores()
+    resumen.update(desgloses())
+    return resumen
+
+
+CLAVE_SNAPSHOT = 'dashboard:{}'
+VISTAS_DASHBOARD = ('admin', 'logistica', 'lectura')
+
+
+def _datos_dashboard(vista):
+    resumen = resumen_dashboard()
+    datos = {
+        'total_activos': resumen['total_activos'],
+        'asignados': resumen['asignados'],
+        'en_bodega': resumen['en_bodega'],
+        'dados_baja': resumen['dados_baja'],
+        'activos_por_categoria': resumen['activos_por_categoria'],
+        'activos_por_estado': resumen['activos_por_estado'],
+    }
+    if vista == 'admin':
+        datos['activos_por_zona'] = resumen['activos_por_zona'][:5]  # Top 5 zonas
+        datos['activos_por_operador'] = resumen['activos_por_operador']
+        datos['ultimos_activos'] = list(
+            Activo.objects.select_related('marca', 'categoria').order_by('-fecha_creacion')[:5]
+        )
+    elif vista == 'logistica':
+        datos['movimientos_recientes'] = list(
+            Tranzabilidad.objects.select_related('activo', 'usuario').order_by('-fecha')[:10]
+        )
+    datos['calculado_en'] = timezone.now()
+    return datos
+
+
+def snapshot_dashboard(vista):
+    """Contexto del dashboard de la vista ('admin', 'logistica' o 'lectura'), desde la caché si existe."""
+    clave = CLAVE_SNAPSHOT.format(vista)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _datos_dashboard(vista)
+        cache.set(clave, datos, settings.DASHBOARD_CACHE_SEGUNDOS)
+    return datos
+
+
+def invalidar_dashboards():
+    cache.delete_many([CLAVE_SNAPSHOT.format(vista) for vista in VISTAS_DASHBOARD])
@@ -0,0 +1,296 @@
+"""
+Exportación del inventario de activos.
+
+El Excel se genera con openpyxl en modo write-only: las filas se leen con
+.iterator() y se escriben directo a un archivo temporal, así la memoria no
+crece con el tamaño del inventario. No es streaming: la respuesta empieza
+cuando el archivo está completo, y eso tarda lo mismo que antes.
+
+CSV y NDJSON (para integraciones) se generan directo desde values_list() y se
+envían a medida que se leen, sin archivo intermedio. Si no se pide un formato
+y el resultado pasa de EXPORTACION_XLSX_MAX_FILAS filas, se exporta en CSV
+(formato_exportacion).
+
+Todas las exportaciones aceptan además un queryset de ActivoArchivado
+(incluir_archivo): esas filas van después de las de los activos en uso.
+"""
+import csv
+import json
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from .models import Activo
+from .referencias import referencias
+
+
+# Filas leídas por consulta al recorrer el queryset
+TAMANO_BLOQUE = 2000
+
+# Filas usadas para calcular el ancho de las columnas
+FILAS_MUESTRA = 500
+
+ANCHO_MAXIMO = 60
+
+ENCABEZADOS = ['ITEM', 'DOCUMENTO', 'NOMBRES Y APELLIDOS', 'IMEI 1', 'IMEI 2', 'S/N',
+               'ICCID', 'OPERADOR', 'MAC SUPERFLEX', 'MARCA', 'ACTIVO', 'CARGO', 'ESTADO',
+               'FECHA CONFIRMACIÓN', 'RESPONSABLE', 'IDENTIFICACIÓN', 'ZONA', 'CATEGORÍA',
+               'OBSERVACIÓN', 'PUNTO DE VENTA', 'CÓDIGO CENTRO COSTO', 'CENTRO COSTO PUNTO',
+               'FECHA SALIDA BODEGA', 'FECHA CREACIÓN']
+
+
+# Columnas de las exportaciones planas: (campo para values_list, clave NDJSON, encabezado CSV)
+COLUMNAS_PLANAS = [
+    ('item', 'item', 'ITEM'),
+    ('documento', 'documento', 'DOCUMENTO'),
+    ('nombres_apellidos', 'nombres_apellidos', 'NOMBRES Y APELLIDOS'),
+    ('imei1', 'imei1', 'IMEI 1'),
+    ('imei2', 'imei2', 'IMEI 2'),
+    ('sn', 'sn', 'S/N'),
+    ('iccid', 'iccid', 'ICCID'),
+    ('operador', 'operador', 'OPERADOR'),
+    ('mac_superflex', 'mac_superflex', 'MAC SUPERFLEX'),
+    ('marca__nombre', 'marca', 'MARCA'),
+    ('activo', 'activo', 'ACTIVO'),
+    ('cargo', 'cargo', 'CARGO'),
+    ('estado', 'estado', 'ESTADO'),
+    ('fecha_confirmacion', 'fecha_confirmacion', 'FECHA CONFIRMACIÓN'),
+    ('responsable', 'responsable', 'RESPONSABLE'),
+    ('identificacion', 'identificacion', 'IDENTIFICACIÓN'),
+    ('zona__nombre', 'zona', 'ZONA'),
+    ('categoria__nombre', 'categoria', 'CATEGORÍA'),
+    ('observacion', 'observacion', 'OBSERVACIÓN'),
+    ('punto_venta', 'punto_venta', 'PUNTO DE VENTA'),
+    ('codigo_centro_costo', 'codigo_centro_costo', 'CÓDIGO CENTRO COSTO'),
+    ('centro_costo_punto', 'centro_costo_punto', 'CENTRO COSTO PUNTO'),
+    ('fecha_salida_bodega', 'fecha_salida_bodega', 'FECHA SALIDA BODEGA'),
+    ('fecha_creacion', 'fecha_creacion', 'FECHA CREACIÓN'),
+    ('fecha_modificacion', 'fecha_modificacion', 'FECHA MODIFICACIÓN'),
+]
+
+# Filas que se agrupan en cada bloque enviado al cliente
+FILAS_POR_ENVIO = 500
+
+FORMATOS_PLANOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _fecha(valor):
+    try:
+        return parse_date(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _id_referencia(valor, por_nombre):
+    """
+    Id de un filtro de zona o categoría. Los enlaces de antes de las llaves
+    foráneas traen el nombre: se busca con por_nombre(); si no existe el filtro
+    no coincide con nada (id 0).
+    """
+    valor = (valor or '').strip()
+    if not valor:
+        return None
+    if valor.isdigit():
+        return int(valor)
+    encontrada = por_nombre(valor)
+    return encontrada.pk if encontrada else 0
+
+
+def leer_filtros(params):
+    """Filtros del reporte por sede validados: fechas como date y zona/categoría como id (None = sin filtro)."""
+    refs = referencias()
+    return {
+        'fecha_inicio': _fecha(params.get('fecha_inicio')),
+        'fecha_fin': _fecha(params.get('fecha_fin')),
+        'zona': _id_referencia(params.get('zona'), refs.zona),
+        'categoria': _id_referencia(params.get('categoria'), refs.categoria),
+        'estado': params.get('estado') or None,
+    }
+
+
+def filtrar_activos(params, queryset=None):
+    """Aplica los filtros del reporte por sede (fecha_inicio, fecha_fin, zona, categoria, estado)."""
+    activos = Activo.objects.all() if queryset is None else queryset
+    filtros = leer_filtros(params)
+
+    if filtros['fecha_inicio']:
+        activos = activos.filter(fecha_creacion__date__gte=filtros['fecha_inicio'])
+    if filtros['fecha_fin']:
+        activos = activos.filter(fecha_creacion__date__lte=filtros['fecha_fin'])
+    if filtros['zona'] is not None:
+        activos = activos.filter(zona_id=filtros['zona'])
+    if filtros['categoria'] is not None:
+        activos = activos.filter(categoria_id=filtros['categoria'])
+    if filtros['estado']:
+        activos = activos.filter(estado=filtros['estado'])
+    return activos
+
+
+def fila_activo(activo):
+    return [
+        activo.item,
+        activo.documento or '',
+        activo.nombres_apellidos or '',
+        activo.imei1 or '',
+        activo.imei2 or '',
+        activo.sn or '',
+        activo.iccid or '',
+        activo.operador or '',
+        activo.mac_superflex or '',
+        str(activo.marca) if activo.marca else '',
+        activo.activo or '',
+        activo.cargo or '',
+        activo.estado or '',
+        activo.fecha_confirmacion.strftime('%d/%m/%Y') if activo.fecha_confirmacion else '',
+        activo.responsable or '',
+        activo.identificacion or '',
+        str(activo.zona) if activo.zona else '',
+        str(activo.categoria) if activo.categoria else '',
+        activo.observacion or '',
+        activo.punto_venta or '',
+        activo.codigo_centro_costo or '',
+        activo.centro_costo_punto or '',
+        activo.fecha_salida_bodega.strftime('%d/%m/%Y') if activo.fecha_salida_bodega else '',
+        activo.fecha_creacion.strftime('%d/%m/%Y %H:%M') if activo.fecha_creacion else ''
+    ]
+
+
+def _anchos(filas):
+    maximos = [len(encabezado) for encabezado in ENCABEZADOS]
+    for fila in filas:
+        for i, valor in enumerate(fila):
+            maximos[i] = max(maximos[i], len(str(valor)))
+    return [min((maximo + 2) * 1.2, ANCHO_MAXIMO) for maximo in maximos]
+
+
+def _recorrer(activos, archivados=None):
+    """Activos y luego los archivados (si se piden), cada uno ordenado por item y leído por bloques."""
+    for queryset in (activos, archivados):
+        if queryset is not None:
+            queryset = queryset.select_related('marca__categoria', 'categoria', 'zona').order_by('item')
+            yield from queryset.iterator(chunk_size=TAMANO_BLOQUE)
+
+
+def escribir_xlsx(activos, destino, titulo="Reporte de Activos", archivados=None):
+    """Escribe el queryset de activos como .xlsx en destino (ruta o archivo binario)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo)
+
+    filas = (fila_activo(activo) for activo in _recorrer(activos, archivados))
+
+    # El ancho de las columnas va antes que los datos en el XML: se calcula con una muestra acotada
+    muestra = list(islice(filas, FILAS_MUESTRA))
+    for i, ancho in enumerate(_anchos(muestra), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = ancho
+
+    header_fill = PatternFill(start_color="0F172A", end_color="0F172A", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    encabezados = []
+    for encabezado in ENCABEZADOS:
+        celda = WriteOnlyCell(ws, value=encabezado)
+        celda.fill = header_fill
+        celda.font = header_font
+        celda.alignment = header_alignment
+        encabezados.append(celda)
+    ws.append(encabezados)
+
+    for fila in muestra:
+        ws.append(fila)
+    for fila in filas:
+        ws.append(fila)
+
+    wb.save(destino)
+
+
+def formato_exportacion(formato, activos, archivados=None):
+    """
+    El formato pedido. Sin formato: xlsx, o csv si las filas pasan de
+    EXPORTACION_XLSX_MAX_FILAS (el xlsx no se envía hasta estar completo).
+    """
+    if formato:
+        return formato
+    limite = settings.EXPORTACION_XLSX_MAX_FILAS
+    # Con LIMIT el conteo se detiene al pasar el límite
+    filas = activos[:limite + 1].count()
+    if archivados is not None and filas <= limite:
+        filas += archivados[:limite + 1 - filas].count()
+    return 'csv' if filas > limite else 'xlsx'
+
+
+def xlsx_temporal(activos, archivados=None):
+    """Genera el .xlsx en un archivo temporal (se borra al cerrarlo) posicionado al inicio."""
+    archivo = tempfile.TemporaryFile()
+    escribir_xlsx(activos, archivo, archivados=archivados)
+    archivo.seek(0)
+    return archivo
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valores_planos(activos, archivados=None):
+    campos = [campo for campo, _, _ in COLUMNAS_PLANAS]
+    for queryset in (activos, archivados):
+        if queryset is not None:
+            yield from queryset.order_by('item').values_list(*campos).iterator(chunk_size=TAMANO_BLOQUE)
+
+
+def por_envios(lineas):
+    """Agrupa las líneas en bloques de FILAS_POR_ENVIO para la respuesta en streaming."""
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= FILAS_POR_ENVIO:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def _celda_csv(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def lineas_csv(activos, archivados=None):
+    writer = csv.writer(_Eco())
+    # El encabezado sale antes de consultar la base de datos
+    yield writer.writerow([encabezado for _, _, encabezado in COLUMNAS_PLANAS])
+    yield from por_envios(
+        writer.writerow([_celda_csv(valor) for valor in fila])
+        for fila in _valores_planos(activos, archivados)
+    )
+
+
+def lineas_ndjson(activos, archivados=None):
+    claves = [clave for _, clave, _ in COLUMNAS_PLANAS]
+    yield from por_envios(
+        json.dumps(dict(zip(claves, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        for fila in _valores_planos(activos, archivados)
+    )
+
+
+def exportacion_plana(activos, formato, archivados=None):
+    """Generador de bloques de texto para el formato ('csv' o 'ndjson')."""
+    if formato == 'csv':
+        return lineas_csv(activos, archivados)
+    return lineas_ndjson(activos, archivados)
+
@@ -1,7 +1,9 @@
 from django import forms
-from .models import Activo, Zona, Categoria, Marca
+from .models import Activo, Categoria, Marca, ESTADOS_ACTIVO, ESTADO_ASIGNADO, ESTADO_BAJA, ESTADO_CONFIRMADO
 from django.utils import timezone
 
+from .referencias import referencias
+
 
 class ImportarActivosForm(forms.Form):
     archivo_excel = forms.FileField(
@@ -9,6 +11,13 @@ class ImportarActivosForm(forms.Form):
         help_text='El archivo debe tener la misma estructura que el reporte exportado.'
     )
 
+def campo_estado_nuevo():
+    """Estado nuevo de un movimiento de tranzabilidad: uno de los estados de Activo o ninguno."""
+    return forms.ChoiceField(
+        choices=[('', 'Sin cambio')] + ESTADOS_ACTIVO, required=False,
+        widget=forms.Select(attrs={'class': 'form-select', 'id': 'id_estado_nuevo'})
+    )
+
 class CategoriaForm(forms.ModelForm):
     class Meta:
         model = Categoria
@@ -22,16 +31,10 @@ class CategoriaForm(forms.ModelForm):
         }
 
 class ActivoForm(forms.ModelForm):
-    ESTADO_CHOICES_CREATE = [
-        ('activo confirmado', 'Activo Confirmado'),
-        ('asignado', 'Asignado'),
-    ]
+    # Un activo nuevo no puede crearse dado de baja
+    ESTADO_CHOICES_CREATE = [opcion for opcion in ESTADOS_ACTIVO if opcion[0] != ESTADO_BAJA]
     
-    ESTADO_CHOICES_UPDATE = [
-        ('activo confirmado', 'Activo Confirmado'),
-        ('asignado', 'Asignado'),
-        ('dado de baja', 'Dado de Baja'),
-    ]
+    ESTADO_CHOICES_UPDATE = ESTADOS_ACTIVO
     
     CARGO_CHOICES = [
         ('vendedor ambulante', 'Vendedor Ambulante'),
@@ -109,10 +112,10 @@ class ActivoForm(forms.ModelForm):
         
         # Configurar choices para estado según si es creación o edición
         if is_update:
-            self.fields['estado'].widget.choices = self.ESTADO_CHOICES_UPDATE
+            self.fields['estado'].choices = self.ESTADO_CHOICES_UPDATE
         else:
-            self.fields['estado'].widget.choices = self.ESTADO_CHOICES_CREATE
-            self.fields['estado'].initial = 'activo confirmado'
+            self.fields['estado'].choices = self.ESTADO_CHOICES_CREATE
+            self.fields['estado'].initial = ESTADO_CONFIRMADO
         
         # Configurar choices para cargo
         self.fields['cargo'].widget = forms.Select(attrs={'class': 'form-select'})
@@ -123,25 +126,29 @@ class ActivoForm(forms.ModelForm):
         # Configurar choices para operador
         self.fields['operador'].widget.choices = self.OPERADOR_CHOICES
         
-        # Configurar zona como select con las zonas existentes
-        zonas = Zona.objects.all().values_list('nombre', 'nombre')
-        self.fields['zona'].widget = forms.Select(attrs={'class': 'form-select'})
-        self.fields['zona'].widget.choices = [('', '')] + list(zonas)
+        # Las opciones de zona, categoría y marca salen de las referencias en memoria
+        # (activos/referencias.py); los querysets solo se consultan al validar un POST
+        refs = referencias()
+
+        # Zona: select con las zonas existentes (el valor es el id)
+        self.fields['zona'].widget.choices = [('', '')] + [(zona.pk, zona.nombre) for zona in refs.zonas]
         
         # Configurar categoría para que no muestre "----"
         self.fields['categoria'].empty_label = None
+        self.fields['categoria'].widget.choices = [(categoria.pk, str(categoria)) for categoria in refs.categorias]
         
         # Configurar marca: si hay una categoría seleccionada, filtrar marcas
-        if self.instance.pk and self.instance.categoria:
+        if self.instance.pk and self.instance.categoria_id:
             # Si estamos editando y hay una categoría, filtrar marcas
-            self.fields['marca'].queryset = Marca.objects.filter(categoria=self.instance.categoria)
+            self.fields['marca'].queryset = Marca.objects.filter(categoria_id=self.instance.categoria_id)
+            marcas = refs.marcas_por_categoria.get(self.instance.categoria_id, [])
         else:
             # Si estamos creando, mostrar todas las marcas (el filtrado se hará con JavaScript)
-            self.fields['marca'].queryset = Marca.objects.all()
+            marcas = refs.marcas
         
         # Configurar marca para que no muestre "----" si hay opciones
-        if self.fields['marca'].queryset.exists():
-            self.fields['marca'].empty_label = "Seleccione una marca"
+        vacia = "Seleccione una marca" if marcas else self.fields['marca'].empty_label
+        self.fields['marca'].widget.choices = [('', vacia)] + [(marca.pk, str(marca)) for marca in marcas]
         
         # Hacer obligatorios todos los campos de la sección "Datos del Activo"
         # Hacer obligatorios todos los campos de la sección "Datos del Activo" y asignación inicial
@@ -207,8 +214,8 @@ class ActivoForm(forms.ModelForm):
         
         # Actualizar estado basado en documento y nombres
         if instance.documento and instance.nombres_apellidos:
-            if instance.estado == 'activo confirmado':
-                instance.estado = 'asignado'
+            if instance.estado == ESTADO_CONFIRMADO:
+                instance.estado = ESTADO_ASIGNADO
         
         if commit:
             instance.save()
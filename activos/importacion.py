@@ -0,0 +1,353 @@
+"""
+Motor de importación masiva de activos desde Excel.
+
+Las filas se procesan por lotes: las tablas de referencia (Zona, Categoria,
+Marca) salen de la caché en memoria de activos/referencias.py, los seriales de
+cada lote se resuelven con una sola consulta y la escritura se hace con
+bulk_create/bulk_update dentro de una transacción por lote.
+"""
+import logging
+from collections import Counter
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .estadisticas import invalidar_dashboards
+from .indice import indice
+from .movimientos import registrar_usuario
+from .models import Activo, Tranzabilidad, CAMPOS_NORMALIZADOS, ESTADO_ASIGNADO, ESTADO_CONFIRMADO, codigo_estado, normalizar
+from .referencias import referencias as referencias_vigentes
+from .resumen import clave as clave_resumen, aplicar as aplicar_resumen
+from .sugerencias import registrar as registrar_sugerencias
+
+
+logger = logging.getLogger(__name__)
+
+# Tamaño del lote: se mantiene por debajo del límite de parámetros de SQLite
+# para el IN de seriales.
+TAMANO_LOTE = 500
+
+# Número de columnas de la plantilla (ver descargar_plantilla)
+NUM_COLUMNAS = 23
+
+# Campos que se completan en un activo existente solo si están vacíos.
+# cargo, estado, zona y observacion se dejan fuera a propósito (tienen default o info previa).
+CAMPOS_ACTUALIZABLES = [
+    'documento', 'nombres_apellidos', 'imei1', 'imei2', 'iccid', 'operador',
+    'mac_superflex', 'marca', 'activo', 'responsable', 'identificacion',
+    'categoria', 'punto_venta', 'codigo_centro_costo', 'centro_costo_punto',
+]
+
+# Campos que escribe bulk_update: los anteriores más los que ajusta preparar_guardado()
+CAMPOS_BULK_UPDATE = CAMPOS_ACTUALIZABLES + ['fecha_salida_bodega', 'fecha_modificacion'] + list(CAMPOS_NORMALIZADOS.values())
+
+
+class ErrorFila(Exception):
+    """Error de validación de una fila; el mensaje se muestra tal cual en el reporte."""
+
+
+def safe_str(val):
+    """Convierte valores de celda a texto sin notación científica."""
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return '{:.0f}'.format(val)
+    return str(val).strip()
+
+
+def texto(val):
+    return str(val).strip() if val else None
+
+
+class ResultadoImportacion:
+    """Contadores y errores acumulados de una importación."""
+
+    def __init__(self):
+        self.filas_procesadas = 0
+        self.importados = 0
+        self.actualizados = 0
+        self.omitidos = 0
+        self.errores = 0
+        self.errores_list = []
+
+    def registrar_error(self, mensaje):
+        self.errores += 1
+        self.errores_list.append(mensaje)
+
+    @property
+    def icono(self):
+        return 'warning' if self.errores > 0 else 'success'
+
+    @property
+    def titulo(self):
+        return 'Importación con Observaciones' if self.errores > 0 else 'Proceso Finalizado'
+
+    def mensaje_html(self):
+        msg = f'<br>Importados: {self.importados}<br>Actualizados: {self.actualizados}<br>Omitidos (Duplicados): {self.omitidos}'
+
+        if self.errores > 0:
+            detalles_error = "<br>".join(self.errores_list[:5])  # Mostrar primeros 5
+            if len(self.errores_list) > 5:
+                detalles_error += f"<br>... y {len(self.errores_list)-5} errores más."
+            msg += f'<br><br><b>Errores ({self.errores}):</b><br><div style="text-align:left; font-size:0.9em;">{detalles_error}</div>'
+        return msg
+
+
+def leer_fila(row_idx, row, referencias):
+    """
+    Valida una fila de la plantilla y devuelve sus datos listos para escribir,
+    o None si la fila no tiene serial. Lanza ErrorFila si no es válida.
+    """
+    # 0:ITEM, 1:DOC, 2:NOMBRES, 3:IMEI1, 4:IMEI2, 5:SN, 6:ICCID, 7:OPERADOR, 8:MAC, 9:MARCA, 10:ACTIVO
+    row = tuple(row) + (None,) * (NUM_COLUMNAS - len(row))
+
+    sn = safe_str(row[5])
+    if not sn:
+        # Sin serial no procesamos
+        return None
+
+    nombres = texto(row[2])
+    # El texto de la plantilla se lleva a uno de los estados (ver models.codigo_estado)
+    estado = codigo_estado(texto(row[12]))
+
+    # Lógica especial: nombres + activo confirmado = asignado
+    if nombres and estado == ESTADO_CONFIRMADO:
+        estado = ESTADO_ASIGNADO
+
+    zona_txt = texto(row[16]) or "Valledupar"
+    categoria_nombre = texto(row[17])
+    marca_nombre = texto(row[9])
+
+    # Zona
+    zona_obj = referencias.zona(zona_txt)
+    if not zona_obj:
+        raise ErrorFila(f"Fila {row_idx} (S/N {sn}): Zona '{zona_txt}' no existe.")
+
+    # Categoría
+    categoria_obj = referencias.categoria(categoria_nombre) if categoria_nombre else None
+    if not categoria_obj:
+        raise ErrorFila(f"Fila {row_idx} (S/N {sn}): Categoría '{categoria_nombre}' no existe.")
+
+    # Marca
+    marca_obj = None
+    if marca_nombre:
+        marca_obj = referencias.marca(marca_nombre, categoria_obj.pk)
+        if not marca_obj:
+            if marca_nombre.strip().lower() in referencias.nombres_marca:
+                raise ErrorFila(f"Fila {row_idx} (S/N {sn}): La marca '{marca_nombre}' no pertenece a la categoría '{categoria_nombre}'.")
+            raise ErrorFila(f"Fila {row_idx} (S/N {sn}): Marca '{marca_nombre}' no existe.")
+
+    if not marca_obj:
+        raise ErrorFila(f"Fila {row_idx} (S/N {sn}): Marca '{marca_nombre}' es obligatoria o no existe.")
+
+    return {
+        'fila': row_idx,
+        'sn': sn,
+        'campos': {
+            'documento': safe_str(row[1]),
+            'nombres_apellidos': nombres,
+            'imei1': safe_str(row[3]),
+            'imei2': safe_str(row[4]),
+            'sn': sn,
+            'iccid': safe_str(row[6]),
+            'operador': texto(row[7]),
+            'mac_superflex': safe_str(row[8]),
+            'marca': marca_obj,
+            'activo': texto(row[10]),
+            'cargo': texto(row[11]) or "vendedor ambulante",
+            'estado': estado,
+            'responsable': texto(row[14]),
+            'identificacion': safe_str(row[15]),
+            'zona': zona_obj,
+            'categoria': categoria_obj,
+            'observacion': texto(row[18]) or "Importado masivamente",
+            'punto_venta': texto(row[19]),
+            'codigo_centro_costo': safe_str(row[20]),
+            'centro_costo_punto': texto(row[21]),
+        },
+    }
+
+
+def _es_vacio(valor):
+    # Normalizar para chequeo de vacío (incluyendo "None" string, espacios, formulas)
+    val_str = str(valor).strip().lower() if valor is not None else ""
+    return val_str == "" or val_str == "none" or val_str == "null" or val_str.startswith('=')
+
+
+def _completar_campos(activo, campos):
+    """Completa los campos vacíos del activo con los valores de la fila. Devuelve los campos cambiados."""
+    cambios = []
+    for campo in CAMPOS_ACTUALIZABLES:
+        nuevo_valor = campos[campo]
+        # Para las FK se mira el id y así no se dispara una consulta por fila
+        valor_actual = getattr(activo, Activo._meta.get_field(campo).attname)
+        if _es_vacio(valor_actual) and nuevo_valor:
+            setattr(activo, campo, nuevo_valor)
+            cambios.append(campo)
+    return cambios
+
+
+def _bloquear_seriales(seriales):
+    """
+    Serializa los lotes que tocan los mismos seriales, para que dos workers
+    importando archivos distintos no creen el mismo S/N dos veces.
+
+    En PostgreSQL se toma un advisory lock de transacción por serial (en orden,
+    para no generar deadlocks). En SQLite no hace falta: las transacciones se
+    abren en modo IMMEDIATE (ver settings.py) y solo hay un escritor a la vez.
+    """
+    if connection.vendor != 'postgresql' or not seriales:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(hashtext(s)) FROM unnest(%s::text[]) AS s',
+            [sorted(seriales)]
+        )
+
+
+def _escribir_lote(filas, usuario):
+    """
+    Escribe un lote de filas ya validadas. Debe llamarse dentro de una transacción.
+    Devuelve (importados, actualizados, omitidos).
+    """
+    seriales = {normalizar(datos['sn']) for datos in filas}
+    _bloquear_seriales(seriales)
+    existentes = {}
+    # Búsqueda por la columna normalizada (con índice)
+    for activo in Activo.objects.filter(sn_normalizado__in=seriales).order_by('item'):
+        existentes.setdefault(activo.sn_normalizado, activo)
+
+    ahora = timezone.now()
+    nuevos = []
+    por_actualizar = {}
+    movimientos = []
+    # Ajustes de InventarioResumen del lote: {clave: cantidad}
+    resumen = Counter()
+    importados = actualizados = omitidos = 0
+
+    for datos in filas:
+        clave = normalizar(datos['sn'])
+        activo = existentes.get(clave)
+
+        if activo is None:
+            # --- CREACIÓN NUEVO ACTIVO ---
+            activo = Activo(**datos['campos'])
+            activo.preparar_guardado()
+            resumen[clave_resumen(activo)] += 1
+            nuevos.append(activo)
+            existentes[clave] = activo
+            movimientos.append(Tranzabilidad(
+                activo=activo,
+                tipo='ingreso',
+                usuario=usuario,
+                zona_destino=datos['campos']['zona'].nombre,
+                descripcion='Importación masiva desde Excel'
+            ))
+            importados += 1
+            continue
+
+        # --- LÓGICA DE ACTUALIZACIÓN (UPSERT) ---
+        clave_anterior = clave_resumen(activo)
+        cambios = _completar_campos(activo, datos['campos'])
+        if not cambios:
+            omitidos += 1
+            continue
+
+        activo.preparar_guardado()
+        resumen[clave_anterior] -= 1
+        resumen[clave_resumen(activo)] += 1
+        activo.fecha_modificacion = ahora
+        # Un serial repetido en el mismo lote sobre un activo nuevo se resuelve en el INSERT
+        if activo.pk:
+            por_actualizar[activo.pk] = activo
+        movimientos.append(Tranzabilidad(
+            activo=activo,
+            tipo='actualizacion',
+            usuario=usuario,
+            descripcion=f'Actualización masiva: campos completados {", ".join(cambios)}'
+        ))
+        actualizados += 1
+
+    if nuevos:
+        Activo.objects.bulk_create(nuevos)
+    if por_actualizar:
+        Activo.objects.bulk_update(list(por_actualizar.values()), CAMPOS_BULK_UPDATE)
+    if movimientos:
+        Tranzabilidad.objects.bulk_create(movimientos)
+        # bulk_create/bulk_update no pasan por save() ni disparan señales
+        aplicar_resumen(resumen)
+        registrar_sugerencias(nuevos + list(por_actualizar.values()))
+        transaction.on_commit(invalidar_dashboards)
+        registros = [(activo.pk, indice.registro(activo)) for activo in nuevos + list(por_actualizar.values())]
+        transaction.on_commit(lambda: indice.actualizar_varios(registros))
+        transaction.on_commit(lambda: registrar_usuario(usuario.pk))
+
+    return importados, actualizados, omitidos
+
+
+def _procesar_lote(lote, usuario, referencias, resultado):
+    validas = []
+    for row_idx, row in lote:
+        resultado.filas_procesadas += 1
+        try:
+            datos = leer_fila(row_idx, row, referencias)
+        except ErrorFila as e:
+            resultado.registrar_error(str(e))
+            continue
+        except Exception as e:
+            logger.exception('Error inesperado en la fila %s de la importación', row_idx)
+            resultado.registrar_error(f"Fila {row_idx}: Error inesperado - {str(e)}")
+            continue
+        if datos:
+            validas.append(datos)
+
+    if not validas:
+        return
+
+    try:
+        with transaction.atomic():
+            totales = _escribir_lote(validas, usuario)
+        _sumar(resultado, totales)
+    except Exception:
+        # Si el lote falla, se reintenta fila por fila para reportar el error exacto
+        for datos in validas:
+            try:
+                with transaction.atomic():
+                    totales = _escribir_lote([datos], usuario)
+                _sumar(resultado, totales)
+            except Exception as e:
+                logger.exception('Error inesperado en la fila %s de la importación', datos['fila'])
+                resultado.registrar_error(f"Fila {datos['fila']}: Error inesperado - {str(e)}")
+
+
+def _sumar(resultado, totales):
+    importados, actualizados, omitidos = totales
+    resultado.importados += importados
+    resultado.actualizados += actualizados
+    resultado.omitidos += omitidos
+
+
+def importar_filas(filas, usuario, tamano_lote=TAMANO_LOTE, al_avanzar=None):
+    """
+    Importa un iterable de (numero_fila, valores) con el formato de la plantilla.
+    al_avanzar(resultado) se llama al terminar cada lote.
+    """
+    resultado = ResultadoImportacion()
+    # Las mismas referencias para todo el archivo aunque cambien a mitad de camino
+    referencias = referencias_vigentes()
+
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            _procesar_lote(lote, usuario, referencias, resultado)
+            lote = []
+            if al_avanzar:
+                al_avanzar(resultado)
+
+    if lote:
+        _procesar_lote(lote, usuario, referencias, resultado)
+        if al_avanzar:
+            al_avanzar(resultado)
+
+    return resultado
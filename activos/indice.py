@@ -0,0 +1,365 @@
+"""
+Índice de trigramas en memoria para la búsqueda instantánea de activos.
+
+Cada worker arma el índice en un hilo aparte al recibir su primera petición,
+con una sola pasada de values_list(). Las postings son array('I') de ids (4
+bytes por entrada) y junto a cada activo se guardan solo los textos que se
+buscan y los valores que devuelve buscar_activos_ajax, así que la búsqueda no
+toca la base de datos.
+
+Las señales de Activo (y el importador) lo actualizan al confirmarse cada
+escritura hecha en este proceso. Lo que escriben otros procesos (workers de
+importación, otros workers web) se trae de la base cada
+INDICE_BUSQUEDA_SINCRONIZAR_SEGUNDOS, al buscar: los activos con
+fecha_modificacion posterior a la última sincronización (índice
+activos_activo_fmod_item_idx) y los movimientos de eliminación (item_eliminado).
+Se relee también un margen de DELTA_MARGEN_SEGUNDOS hacia atrás, como en la
+exportación delta, por las transacciones que confirman después de su fecha.
+Con más de MAX_CAMBIOS por sincronización se reconstruye en vez de aplicarlos.
+
+Lo que no deja esa huella (restauraciones y cargas con fechas propias) llama a
+invalidar(), que renueva un sello de versión en la caché de Django como en
+referencias.py: el índice de un proceso sin el sello vigente se reconstruye en
+segundo plano. Además se reconstruye cada INDICE_BUSQUEDA_SEGUNDOS (borrados
+sueltos fuera de la aplicación, caché no compartida). Mientras no está listo
+(frío o reconstruyéndose), las búsquedas se hacen en SQL.
+"""
+import logging
+import sys
+import threading
+import time
+import uuid
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .models import Activo, Tranzabilidad
+
+
+logger = logging.getLogger(__name__)
+
+# Textos donde el término coincide exacto (códigos que se escanean)
+EXACTOS = ('sn_normalizado', 'imei1_normalizado', 'imei2_normalizado', 'iccid_normalizado',
+           'mac_superflex_normalizado')
+# Textos donde se busca por prefijo y subcadena (los exactos más estos)
+TEXTOS = EXACTOS + ('documento_normalizado', 'activo_normalizado')
+# Valores que se devuelven en cada resultado (ver busqueda.VALORES)
+VALORES = ('activo', 'sn', 'documento', 'imei1', 'zona_id', 'responsable', 'estado')
+
+# Solo participa como subcadena
+NOMBRES = 'nombres_apellidos_normalizado'
+
+# Posiciones dentro de la tupla guardada por activo: TEXTOS, NOMBRES y VALORES
+_NOMBRES = len(TEXTOS)
+_VALORES = _NOMBRES + 1
+
+NIVELES = ('exacto', 'prefijo', 'contiene')
+
+# Filas leídas por consulta al armar el índice
+TAMANO_BLOQUE = 5000
+
+# Cambios de otros procesos que se aplican en una sincronización; con más se reconstruye
+MAX_CAMBIOS = 5000
+
+CLAVE_VERSION = 'indice_activos:version'
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _registro(valores):
+    """Tupla que se guarda por activo a partir de TEXTOS + NOMBRES + VALORES."""
+    textos = tuple(valores[:_VALORES])
+    # responsable y estado se repiten mucho entre activos
+    mostrados = tuple(sys.intern(v) if isinstance(v, str) else v for v in valores[_VALORES:])
+    return textos + mostrados
+
+
+def _version():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Primera lectura (o la caché la descartó): gana el primer proceso que la escribe
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _renovar_version():
+    version = uuid.uuid4().hex
+    cache.set(CLAVE_VERSION, version, None)
+    return version
+
+
+class IndiceActivos:
+
+    def __init__(self):
+        self._bloqueo = threading.Lock()
+        self._construyendo = False
+        self._listo = False
+        # Momento del último armado (o intento); None = nunca o invalidado
+        self._construido_en = None
+        # Sello de versión con el que se armó
+        self._version = None
+        # Fecha (de la base) hasta la que se trajeron los cambios de otros procesos
+        self._marca = None
+        self._sincronizado_en = None
+        self._sincronizando = False
+        self._postings = {}
+        self._activos = {}
+        # Entradas agregadas por actualizaciones; cuando superan a las originales se reconstruye
+        self._entradas = 0
+        self._entradas_extra = 0
+        # Escrituras confirmadas mientras se arma el índice; se aplican al terminar
+        self._pendientes = []
+
+    # --- Construcción -------------------------------------------------------
+
+    def iniciar(self):
+        """Arma el índice en un hilo aparte si está frío o desactualizado."""
+        if not settings.INDICE_BUSQUEDA_ACTIVO:
+            return
+        with self._bloqueo:
+            if self._construyendo or not self._vencido():
+                return
+            self._construyendo = True
+        threading.Thread(target=self._construir_en_hilo, name='indice-activos', daemon=True).start()
+
+    def _construir_en_hilo(self):
+        try:
+            self.construir()
+        except Exception:
+            logger.exception('No se pudo construir el índice de búsqueda de activos')
+            with self._bloqueo:
+                self._listo = False
+                self._construido_en = time.monotonic()
+        finally:
+            with self._bloqueo:
+                self._construyendo = False
+                self._pendientes = []
+            # El hilo tiene su propia conexión
+            connection.close()
+
+    def construir(self):
+        inicio = time.monotonic()
+        # Se leen antes de consultar: lo escrito durante el armado se trae después
+        version = _version()
+        marca = timezone.now()
+        if Activo.objects.count() > settings.INDICE_BUSQUEDA_MAX_ACTIVOS:
+            # Por encima del límite de memoria se sigue usando SQL (se reintenta al vencer)
+            with self._bloqueo:
+                self._listo = False
+                self._construido_en = time.monotonic()
+                self._version = version
+            return
+
+        postings = {}
+        activos = {}
+        entradas = 0
+        campos = ('item',) + TEXTOS + (NOMBRES,) + VALORES
+        filas = Activo.objects.order_by('item').values_list(*campos).iterator(chunk_size=TAMANO_BLOQUE)
+        for item, *valores in filas:
+            registro = _registro(valores)
+            activos[item] = registro
+            for trigrama in self._trigramas_registro(registro):
+                lista = postings.get(trigrama)
+                if lista is None:
+                    lista = postings[trigrama] = array('I')
+                lista.append(item)
+                entradas += 1
+
+        with self._bloqueo:
+            self._postings = postings
+            self._activos = activos
+            self._entradas = entradas
+            self._entradas_extra = 0
+            self._construido_en = time.monotonic()
+            self._version = version
+            self._marca = marca
+            self._sincronizado_en = time.monotonic()
+            self._listo = True
+            self._construyendo = False
+            pendientes, self._pendientes = self._pendientes, []
+            for pk, registro in pendientes:
+                self._guardar(pk, registro)
+        logger.info('Índice de activos: %s activos, %s trigramas en %.2fs',
+                    len(activos), len(postings), time.monotonic() - inicio)
+
+    @staticmethod
+    def _trigramas_registro(registro):
+        trigramas = set()
+        for texto in registro[:_VALORES]:
+            if texto:
+                trigramas |= _trigramas(texto)
+        return trigramas
+
+    @property
+    def listo(self):
+        """True si las búsquedas se responden desde el índice (armado y vigente)."""
+        return self._listo and not self._vencido()
+
+    def _vencido(self):
+        return (self._construido_en is None
+                or time.monotonic() - self._construido_en > settings.INDICE_BUSQUEDA_SEGUNDOS
+                or self._version != _version())
+
+    # --- Actualización (señales) --------------------------------------------
+
+    @staticmethod
+    def registro(activo):
+        """Datos del activo tal como se guardan en el índice (se toman al momento del save)."""
+        return _registro([getattr(activo, campo) for campo in TEXTOS + (NOMBRES,) + VALORES])
+
+    def actualizar(self, pk, registro):
+        """Agrega o reemplaza un activo; registro=None lo quita."""
+        self.actualizar_varios([(pk, registro)])
+
+    def quitar(self, pk):
+        self.actualizar(pk, None)
+
+    def quitar_varios(self, pks):
+        self.actualizar_varios([(pk, None) for pk in pks])
+
+    def actualizar_varios(self, cambios):
+        """Aplica los (pk, registro) en este proceso; los demás los traen al sincronizar."""
+        with self._bloqueo:
+            for pk, registro in cambios:
+                if self._construyendo:
+                    self._pendientes.append((pk, registro))
+                if self._listo:
+                    self._guardar(pk, registro)
+
+    def sincronizar(self):
+        """Aplica los cambios de otros procesos desde la última sincronización (ver el docstring del módulo)."""
+        with self._bloqueo:
+            if self._sincronizando or self._construyendo or not self._listo:
+                return
+            self._sincronizando = True
+            desde = self._marca - timedelta(seconds=settings.DELTA_MARGEN_SEGUNDOS)
+        try:
+            hasta = timezone.now()
+            campos = ('item',) + TEXTOS + (NOMBRES,) + VALORES
+            modificados = list(Activo.objects.filter(fecha_modificacion__gt=desde)
+                               .order_by('fecha_modificacion', 'item').values_list(*campos)[:MAX_CAMBIOS + 1])
+            eliminados = list(Tranzabilidad.objects.filter(tipo='eliminacion', fecha__gt=desde)
+                              .exclude(item_eliminado=None).order_by('fecha', 'id')
+                              .values_list('item_eliminado', flat=True)[:MAX_CAMBIOS + 1])
+            with self._bloqueo:
+                if len(modificados) + len(eliminados) > MAX_CAMBIOS:
+                    self._construido_en = None
+                    return
+                for item, *valores in modificados:
+                    self._guardar(item, _registro(valores))
+                for item in eliminados:
+                    self._guardar(item, None)
+                self._marca = hasta
+                self._sincronizado_en = time.monotonic()
+        finally:
+            with self._bloqueo:
+                self._sincronizando = False
+
+    def _guardar(self, pk, registro):
+        # Se llama con el bloqueo tomado
+        if registro is None:
+            self._activos.pop(pk, None)
+            return
+        anterior = self._activos.get(pk)
+        nuevos = self._trigramas_registro(registro)
+        if anterior is not None:
+            # Las postings del texto anterior se quedan; la verificación de la búsqueda las descarta
+            nuevos -= self._trigramas_registro(anterior)
+        for trigrama in nuevos:
+            self._postings.setdefault(trigrama, array('I')).append(pk)
+        self._activos[pk] = registro
+        self._entradas_extra += len(nuevos)
+        if self._entradas_extra > self._entradas:
+            # Demasiadas entradas sobrantes: se reconstruye compacto
+            self._construido_en = None
+
+    def invalidar(self):
+        """
+        Marca el índice como desactualizado en todos los procesos. Para cargas que
+        no dejan huella para sincronizar (restauraciones, fechas propias).
+        """
+        self._construido_en = None
+        _renovar_version()
+
+    # --- Búsqueda -----------------------------------------------------------
+
+    def buscar(self, termino, limite, modo='completo'):
+        """
+        Resultados con el mismo formato que busqueda.buscar(), o None si la
+        búsqueda debe hacerse en SQL (índice frío o desactualizado, o término
+        de menos de 3 caracteres).
+        """
+        if not self._listo or self._vencido():
+            self.iniciar()
+            return None
+        if len(termino) < 3:
+            return None
+        if time.monotonic() - self._sincronizado_en >= settings.INDICE_BUSQUEDA_SINCRONIZAR_SEGUNDOS:
+            self.sincronizar()
+            if not self.listo:
+                self.iniciar()
+                return None
+
+        postings = self._postings
+        activos = self._activos
+        listas = sorted((postings.get(t, ()) for t in _trigramas(termino)), key=len)
+        if not listas[0]:
+            return []
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            candidatos.intersection_update(lista)
+            if not candidatos:
+                return []
+
+        # Se recorre en orden de item: cada nivel se llena con los primeros `limite`
+        # y, una vez llenos prefijo y subcadena, solo se siguen buscando exactos
+        niveles = ([], [], [])
+        exactos, prefijos, contienen = niveles
+        for item in sorted(candidatos):
+            registro = activos.get(item)
+            if registro is None:
+                continue
+            if termino in registro[:len(EXACTOS)]:
+                exactos.append((item, registro))
+                if len(exactos) >= limite:
+                    break
+                continue
+            if modo == 'exacto':
+                continue
+            if len(prefijos) < limite and self._empieza(registro, termino):
+                prefijos.append((item, registro))
+            elif len(contienen) < limite and self._contiene(registro, termino):
+                contienen.append((item, registro))
+
+        resultados = []
+        for nivel, encontrados in zip(NIVELES, niveles):
+            for item, registro in encontrados[:limite - len(resultados)]:
+                fila = dict(zip(VALORES, registro[_VALORES:]))
+                fila['item'] = item
+                fila['nivel'] = nivel
+                resultados.append(fila)
+        return resultados
+
+    @staticmethod
+    def _empieza(registro, termino):
+        for texto in registro[:_NOMBRES]:
+            if texto and texto.startswith(termino):
+                return True
+        return False
+
+    @staticmethod
+    def _contiene(registro, termino):
+        # NOMBRES solo participa como subcadena
+        for texto in registro[:_VALORES]:
+            if texto and termino in texto:
+                return True
+        return False
+
+indice = IndiceActivos()
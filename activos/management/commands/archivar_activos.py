@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from activos.archivo import dados_de_baja
+from activos.eliminacion import TAMANO_LOTE, eliminar_activos
+
+
+class Command(BaseCommand):
+    help = ('Mueve a las tablas de archivo los activos dados de baja hace más de N días, '
+            'con su tranzabilidad y su historial.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.ARCHIVO_DIAS_BAJA,
+                            help='Días sin modificaciones desde la baja (por defecto ARCHIVO_DIAS_BAJA).')
+        parser.add_argument('--usuario', required=True,
+                            help='Usuario que queda registrado en los movimientos de archivo.')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Activos por transacción.')
+        parser.add_argument('--simular', action='store_true', help='Solo informa cuántos activos se archivarían.')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']!r}.")
+
+        items = list(dados_de_baja(options['dias']).order_by('item').values_list('pk', flat=True))
+        if options['simular'] or not items:
+            self.stdout.write(f"{len(items)} activo(s) dados de baja hace más de {options['dias']} días.")
+            return
+
+        def al_avanzar(procesados, total):
+            self.stdout.write(f'  {procesados}/{total}')
+
+        archivados = eliminar_activos(items, usuario, archivar=True, tamano_lote=options['lote'],
+                                      al_avanzar=al_avanzar)
+        self.stdout.write(self.style.SUCCESS(f'Activos archivados: {archivados}.'))
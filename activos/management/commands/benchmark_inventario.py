@@ -0,0 +1,347 @@
+"""
+Benchmark de las rutas más pesadas sobre inventarios sintéticos de distintos
+tamaños (10k, 100k y 1M activos por defecto).
+
+Trabaja en una base de datos desechable creada con el mismo motor que la
+configurada (SQLite o PostgreSQL, según DATABASE_URL), con el mecanismo de las
+bases de prueba de Django: se crea al empezar y se destruye al terminar. Para
+cada tamaño se vacía, se genera el inventario con activos/sinteticos.py y se
+miden los escenarios con el cliente de pruebas de Django (middleware, vistas y
+plantillas completos).
+
+Por escenario se reportan percentiles de latencia, consultas SQL y tiempo en
+la base de datos por petición, bytes de respuesta y pico de memoria residente.
+En Linux el pico se reinicia antes de cada escenario (/proc/self/clear_refs);
+en otros sistemas es el pico acumulado del proceso.
+"""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO
+
+import django
+import openpyxl
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from activos.estadisticas import invalidar_dashboards
+from activos.importacion import NUM_COLUMNAS
+from activos.indice import indice
+from activos.metricas import PERCENTILES, ContadorConsultas, percentil
+from activos.models import Activo, ESTADO_ASIGNADO
+from activos.sinteticos import Generador, despues_de_generar, serial
+from usuarios.models import Usuario
+
+
+TAMANOS = '10000,100000,1000000'
+
+
+class Escenario:
+    """
+    Una petición a medir. `peticion(cliente, repeticion)` devuelve la respuesta;
+    `antes(repeticion)` prepara lo que no se mide (invalidar cachés, armar archivos).
+    Los pesados (exportar, importar) se repiten menos.
+    """
+
+    def __init__(self, nombre, rol, peticion, antes=None, pesado=False, ajustes=None):
+        self.nombre = nombre
+        self.rol = rol
+        self.peticion = peticion
+        self.antes = antes
+        self.pesado = pesado
+        self.ajustes = ajustes or {}
+
+
+def _get(nombre_url, **parametros):
+    url = reverse(nombre_url)
+    return lambda cliente, repeticion: cliente.get(url, parametros)
+
+
+def _contenido(respuesta):
+    """Consume la respuesta (también las que van en streaming) y devuelve su tamaño en bytes."""
+    if respuesta.streaming:
+        return sum(len(parte) for parte in respuesta.streaming_content)
+    return len(respuesta.content)
+
+
+def _reiniciar_pico_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as archivo:
+            archivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _pico_rss_mb():
+    try:
+        with open('/proc/self/status') as archivo:
+            for linea in archivo:
+                if linea.startswith('VmHWM:'):
+                    return round(int(linea.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB en Linux, bytes en macOS
+    return round(maximo / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _estadisticas(valores):
+    ordenados = sorted(valores)
+    datos = {f'p{p}': percentil(ordenados, p) for p in PERCENTILES}
+    datos['max'] = ordenados[-1]
+    return datos
+
+
+def _archivo_importacion(semilla, repeticion, filas, tamano):
+    """
+    XLSX con el formato de la plantilla: la mitad de las filas actualiza activos
+    generados y la otra mitad crea activos nuevos (distintos en cada repetición).
+    """
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append([f'Columna {i + 1}' for i in range(NUM_COLUMNAS)])
+    for i in range(filas):
+        fila = [None] * NUM_COLUMNAS
+        if i % 2 and tamano:
+            fila[5] = serial(semilla, (i * 7919 + repeticion) % tamano)
+        else:
+            fila[5] = f'SNB{repeticion:03d}{i:09d}'
+        fila[1] = str(10_000_000 + i)
+        fila[2] = f'Persona Importada {i}'
+        fila[9] = 'MAQUINA SUNMI V2'
+        fila[10] = f'Equipo importado {i}'
+        fila[12] = 'asignado'
+        fila[16] = 'Valledupar'
+        fila[17] = 'MAQUINA'
+        hoja.append(fila)
+    salida = BytesIO()
+    libro.save(salida)
+    return salida.getvalue()
+
+
+def escenarios(muestra, semilla, filas_importacion, tamano):
+    """Escenarios en orden: primero los de solo lectura, al final la importación (escribe)."""
+    hoy = timezone.localdate()
+    hace_un_mes = (hoy - timedelta(days=30)).isoformat()
+    busquedas = (
+        ('exacta', {'q': muestra['sn'], 'modo': 'exacto'}),
+        ('prefijo', {'q': muestra['sn'][:8]}),
+        ('subcadena', {'q': muestra['documento'][2:8]}),
+    )
+    archivos = {}
+
+    def preparar_archivo(repeticion):
+        archivos[repeticion] = _archivo_importacion(semilla, repeticion, filas_importacion, tamano)
+
+    def importar(cliente, repeticion):
+        archivo = SimpleUploadedFile(f'benchmark{repeticion}.xlsx', archivos.pop(repeticion))
+        return cliente.post(reverse('activos:importar_activos'), {'archivo_excel': archivo},
+                            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    lista = [
+        Escenario('dashboard_admin', 'admin', _get('activos:admin_dashboard'), antes=lambda r: invalidar_dashboards()),
+        Escenario('dashboard_admin_en_cache', 'admin', _get('activos:admin_dashboard')),
+        Escenario('dashboard_logistica', 'logistica', _get('activos:logistica_dashboard'),
+                  antes=lambda r: invalidar_dashboards()),
+        Escenario('dashboard_lectura', 'lectura', _get('activos:lectura_dashboard'),
+                  antes=lambda r: invalidar_dashboards()),
+        Escenario('listado', 'logistica', _get('activos:home')),
+        Escenario('listado_pagina_50', 'logistica', _get('activos:home', page=50)),
+        Escenario('listado_sn', 'logistica', _get('activos:home', sn=muestra['sn'])),
+        Escenario('listado_documento', 'logistica', _get('activos:home', documento=muestra['documento'])),
+        Escenario('listado_activo', 'logistica', _get('activos:home', activo=muestra['activo'])),
+        Escenario('listado_imei', 'logistica', _get('activos:home', imei=muestra['imei1'])),
+        Escenario('tranzabilidad', 'logistica', _get('activos:tranzabilidad_list')),
+        Escenario('tranzabilidad_tipo', 'logistica', _get('activos:tranzabilidad_list', tipo='transferencia')),
+        Escenario('tranzabilidad_usuario', 'logistica', _get('activos:tranzabilidad_list', usuario=muestra['usuario'])),
+        Escenario('tranzabilidad_fechas', 'logistica',
+                  _get('activos:tranzabilidad_list', fecha_inicio=hace_un_mes, fecha_fin=hoy.isoformat())),
+        Escenario('tranzabilidad_activo', 'logistica', _get('activos:tranzabilidad_list', activo=muestra['sn'])),
+        Escenario('tranzabilidad_combinado', 'logistica',
+                  _get('activos:tranzabilidad_list', tipo='transferencia', fecha_inicio=hace_un_mes,
+                       usuario=muestra['usuario'])),
+    ]
+    # La búsqueda por SQL se mide con el índice apagado; la del índice, después de armarlo
+    lista += [Escenario(f'busqueda_{nombre}_sql', 'logistica', _get('activos:buscar_activos_ajax', **parametros),
+                        ajustes={'INDICE_BUSQUEDA_ACTIVO': False})
+              for nombre, parametros in busquedas]
+    lista.append(Escenario('indice_construccion', 'logistica', lambda cliente, repeticion: indice.construir(),
+                           pesado=True))
+    lista += [Escenario(f'busqueda_{nombre}_indice', 'logistica', _get('activos:buscar_activos_ajax', **parametros))
+              for nombre, parametros in busquedas]
+    lista += [
+        Escenario('exportar_xlsx', 'logistica', _get('activos:exportar_excel'), pesado=True),
+        Escenario('exportar_csv', 'logistica', _get('activos:exportar_excel', formato='csv'), pesado=True),
+        Escenario('importar', 'logistica', importar, antes=preparar_archivo, pesado=True,
+                  ajustes={'IMPORTACION_EN_SEGUNDO_PLANO': False}),
+    ]
+    return lista
+
+
+class Command(BaseCommand):
+    help = ('Mide listados, búsqueda, dashboards, exportación e importación sobre inventarios sintéticos '
+            'en una base de datos desechable y escribe un informe JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default=TAMANOS, help=f'Activos por inventario, separados por coma ({TAMANOS}).')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Peticiones por escenario.')
+        parser.add_argument('--repeticiones-pesadas', type=int, default=2,
+                            help='Peticiones por escenario pesado (exportar, importar, armar el índice).')
+        parser.add_argument('--eventos', type=int, default=3, help='Movimientos por activo además del ingreso.')
+        parser.add_argument('--filas-importacion', type=int, default=1000, help='Filas del archivo a importar.')
+        parser.add_argument('--escenarios', help='Solo estos escenarios (nombres separados por coma).')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--salida', help='Archivo donde escribir el JSON (por defecto la salida estándar).')
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = [int(valor) for valor in options['tamanos'].split(',') if valor.strip()]
+        except ValueError:
+            raise CommandError('--tamanos debe ser una lista de enteros separados por coma.')
+        if not tamanos or min(tamanos) < 1:
+            raise CommandError('--tamanos debe tener al menos un tamaño mayor que cero.')
+        self.options = options
+        self.filtro = set(options['escenarios'].split(',')) if options['escenarios'] else None
+
+        nombre_original = connection.settings_dict['NAME']
+        directorio = None
+        if connection.vendor == 'sqlite':
+            # En archivo y no en memoria, como en producción
+            directorio = tempfile.mkdtemp(prefix='benchmark-inventario-')
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directorio, 'benchmark.sqlite3')
+
+        ajustes = override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False, METRICAS_ACTIVAS=False)
+        ajustes.enable()
+        self.progreso('Creando la base de datos desechable...')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            informe = {
+                'fecha': timezone.now().isoformat(),
+                'motor': connection.vendor,
+                'version_motor': self.version_motor(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'pico_rss_por_escenario': _reiniciar_pico_rss(),
+                'parametros': {clave: options[clave] for clave in (
+                    'repeticiones', 'repeticiones_pesadas', 'eventos', 'filas_importacion', 'semilla')},
+                'tamanos': [self.medir_tamano(tamano) for tamano in tamanos],
+            }
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            ajustes.disable()
+            if directorio:
+                shutil.rmtree(directorio, ignore_errors=True)
+
+        contenido = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(contenido + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Informe escrito en {options['salida']}."))
+        else:
+            self.stdout.write(contenido)
+
+    def progreso(self, mensaje):
+        # Por stderr: stdout queda para el JSON
+        self.stderr.write(mensaje)
+
+    def version_motor(self):
+        consulta = 'SELECT sqlite_version()' if connection.vendor == 'sqlite' else 'SELECT version()'
+        with connection.cursor() as cursor:
+            cursor.execute(consulta)
+            return cursor.fetchone()[0]
+
+    def medir_tamano(self, tamano):
+        options = self.options
+        self.progreso(f'== {tamano} activos')
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        indice.invalidar()
+
+        inicio = time.perf_counter()
+        generador = Generador(semilla=options['semilla'], eventos_por_activo=options['eventos'])
+        totales = generador.generar(
+            tamano, al_avanzar=lambda hechos, total: self.progreso(f'  generados {hechos}/{total}'))
+        generacion = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        despues_de_generar()
+        posterior = time.perf_counter() - inicio
+
+        clientes = {}
+        for rol in ('admin', 'logistica', 'lectura'):
+            usuario = Usuario.objects.create(username=f'benchmark_{rol}', rol=rol)
+            clientes[rol] = Client()
+            clientes[rol].force_login(usuario)
+
+        resultado = {
+            'activos': totales['activos'],
+            'movimientos': totales['movimientos'],
+            'historial': totales['historial'],
+            'generacion_s': round(generacion, 2),
+            'resumen_y_caches_s': round(posterior, 2),
+            'escenarios': {},
+        }
+        for escenario in escenarios(self.muestra(), options['semilla'], options['filas_importacion'], tamano):
+            if self.filtro and escenario.nombre not in self.filtro:
+                continue
+            self.progreso(f'  {escenario.nombre}')
+            datos = resultado['escenarios'][escenario.nombre] = self.medir(escenario, clientes[escenario.rol])
+            if escenario.nombre.startswith('busqueda_'):
+                # Por encima de INDICE_BUSQUEDA_MAX_ACTIVOS el índice no se arma y se busca en SQL
+                datos['indice_listo'] = indice.listo
+        return resultado
+
+    def muestra(self):
+        """Un activo asignado de la mitad de la tabla para los filtros y búsquedas."""
+        rango = Activo.objects.aggregate(minimo=Min('item'), maximo=Max('item'))
+        medio = (rango['minimo'] + rango['maximo']) // 2
+        activo = (Activo.objects.filter(estado=ESTADO_ASIGNADO, imei1__isnull=False, item__gte=medio).order_by('item')
+                  .values('sn', 'documento', 'activo', 'imei1').first())
+        if activo is None:
+            activo = Activo.objects.order_by('item').values('sn', 'documento', 'activo', 'imei1').first()
+        activo = {clave: valor or '0000000000' for clave, valor in activo.items()}
+        activo['usuario'] = Usuario.objects.filter(username__startswith='sintetico').order_by('pk').values_list('pk', flat=True).first()
+        return activo
+
+    def medir(self, escenario, cliente):
+        repeticiones = self.options['repeticiones_pesadas' if escenario.pesado else 'repeticiones']
+        latencias, consultas, tiempos_bd, tamanos = [], [], [], []
+        _reiniciar_pico_rss()
+        with override_settings(**escenario.ajustes):
+            for repeticion in range(repeticiones):
+                if escenario.antes:
+                    escenario.antes(repeticion)
+                contador = ContadorConsultas()
+                inicio = time.perf_counter()
+                with connection.execute_wrapper(contador):
+                    respuesta = escenario.peticion(cliente, repeticion)
+                    tamano = _contenido(respuesta) if respuesta is not None else 0
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if respuesta is not None and respuesta.status_code >= 300:
+                    raise CommandError(f'{escenario.nombre}: la vista respondió {respuesta.status_code}.')
+                consultas.append(contador.consultas)
+                tiempos_bd.append(contador.segundos * 1000)
+                tamanos.append(tamano)
+
+        return {
+            'repeticiones': repeticiones,
+            'latencia_ms': {clave: round(valor, 2) for clave, valor in _estadisticas(latencias).items()},
+            'tiempo_bd_ms': {clave: round(valor, 2) for clave, valor in _estadisticas(tiempos_bd).items()},
+            'consultas': _estadisticas(consultas),
+            'bytes': _estadisticas(tamanos),
+            'pico_rss_mb': _pico_rss_mb(),
+        }
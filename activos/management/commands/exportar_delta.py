@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activos.delta import MarcaInvalida, fin_de_ventana, leer_marca, lineas_delta
+
+
+class Command(BaseCommand):
+    help = ('Exporta en NDJSON los activos modificados, los movimientos y las eliminaciones posteriores '
+            'a una marca de agua, y devuelve la marca para la siguiente exportación.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Marca de agua (fecha ISO 8601). Sin ella ni --marca, exporta todo.')
+        parser.add_argument('--marca',
+                            help='Archivo con la marca de agua: se lee si existe y, si la exportación termina, '
+                                 'se reemplaza por la siguiente.')
+        parser.add_argument('--salida', help='Archivo NDJSON de salida (por defecto, la salida estándar).')
+
+    def handle(self, *args, **options):
+        texto = options['desde']
+        if texto is None and options['marca'] and os.path.exists(options['marca']):
+            with open(options['marca'], encoding='utf-8') as archivo:
+                texto = archivo.read()
+        try:
+            desde = leer_marca(texto)
+        except MarcaInvalida as e:
+            raise CommandError(str(e))
+        hasta = fin_de_ventana(desde)
+
+        if options['salida']:
+            # Se escribe a un temporal: un archivo a medias nunca queda con el nombre final
+            temporal = options['salida'] + '.parcial'
+            with open(temporal, 'w', encoding='utf-8') as destino:
+                fin = self._escribir(destino, desde, hasta)
+            os.replace(temporal, options['salida'])
+            informe = self.stdout
+        else:
+            fin = self._escribir(sys.stdout, desde, hasta)
+            informe = self.stderr
+
+        siguiente = fin['siguiente']
+        if options['marca']:
+            temporal = options['marca'] + '.parcial'
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                archivo.write(siguiente + '\n')
+            os.replace(temporal, options['marca'])
+        informe.write(self.style.SUCCESS(
+            f"Delta exportado: {fin['activos']} activos, {fin['movimientos']} movimientos, "
+            f"{fin['eliminados']} eliminados. Siguiente marca: {siguiente}"
+        ))
+
+    def _escribir(self, destino, desde, hasta):
+        """Escribe los bloques y devuelve los datos de la línea "fin"."""
+        ultimo = ''
+        for bloque in lineas_delta(desde, hasta):
+            destino.write(bloque)
+            ultimo = bloque
+        return json.loads(ultimo)['fin']
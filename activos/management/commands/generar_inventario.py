@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, time as hora
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from activos.models import Activo
+from activos.sinteticos import (CATEGORIAS, CATEGORIAS_CON_SIM, TAMANO_LOTE, ZONAS, Generador, despues_de_generar,
+                                serial)
+
+
+def _lista(valor):
+    return [parte.strip() for parte in valor.split(',') if parte.strip()]
+
+
+class Command(BaseCommand):
+    help = ('Genera activos sintéticos con su tranzabilidad e historial para pruebas de carga. '
+            'Con la misma semilla el resultado es el mismo.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('cantidad', type=int, help='Activos a generar.')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--desde', type=int, default=0,
+                            help='Posición del primer activo; para agregar a una generación anterior con la misma semilla.')
+        parser.add_argument('--zonas', help='Zonas separadas por coma (por defecto las del volcado inicial).')
+        parser.add_argument('--categoria', action='append', metavar='CATEGORIA=MARCA1,MARCA2',
+                            help='Categoría con sus marcas; se puede repetir (por defecto MAQUINA y Televisores).')
+        parser.add_argument('--con-sim', metavar='CATEGORIA1,CATEGORIA2',
+                            help=f"Categorías con IMEI e ICCID (por defecto {', '.join(sorted(CATEGORIAS_CON_SIM))}).")
+        parser.add_argument('--eventos', type=int, default=3, help='Movimientos por activo además del ingreso.')
+        parser.add_argument('--historial', type=int, default=1,
+                            help='Cambios de Historial por cada actualización o cambio de estado.')
+        parser.add_argument('--usuarios', type=int, default=5, help='Usuarios sintéticos a los que se atribuyen los movimientos.')
+        parser.add_argument('--hasta', help='Fecha (AAAA-MM-DD) de los eventos más recientes; por defecto hoy.')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Activos por transacción.')
+        parser.add_argument('--procesos', type=int, default=1,
+                            help='Procesos que escriben lotes en paralelo (solo PostgreSQL).')
+
+    def handle(self, *args, **options):
+        cantidad = options['cantidad']
+        if cantidad < 1 or options['lote'] < 1 or options['usuarios'] < 1:
+            raise CommandError('cantidad, --lote y --usuarios deben ser mayores que cero.')
+        if options['eventos'] < 0 or options['historial'] < 0:
+            raise CommandError('--eventos y --historial no pueden ser negativos.')
+
+        categorias = CATEGORIAS
+        if options['categoria']:
+            categorias = {}
+            for valor in options['categoria']:
+                nombre, _, marcas = valor.partition('=')
+                if not nombre.strip() or not _lista(marcas):
+                    raise CommandError(f'--categoria {valor!r}: use CATEGORIA=MARCA1,MARCA2.')
+                categorias[nombre.strip()] = tuple(_lista(marcas))
+        con_sim = _lista(options['con_sim']) if options['con_sim'] is not None else CATEGORIAS_CON_SIM
+        zonas = _lista(options['zonas']) if options['zonas'] else ZONAS
+
+        hasta = None
+        if options['hasta']:
+            try:
+                hasta = timezone.make_aware(datetime.combine(datetime.strptime(options['hasta'], '%Y-%m-%d'), hora.min))
+            except ValueError:
+                raise CommandError('--hasta debe tener el formato AAAA-MM-DD.')
+
+        procesos = options['procesos']
+        if procesos > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite admite un solo escritor a la vez: se usa un proceso.'))
+            procesos = 1
+
+        primero = serial(options['semilla'], options['desde'])
+        if Activo.objects.filter(sn=primero).exists():
+            raise CommandError(
+                f'Ya existe el activo {primero}: use --desde para continuar una generación anterior u otra --semilla.'
+            )
+
+        generador = Generador(
+            semilla=options['semilla'], zonas=zonas, categorias=categorias, categorias_con_sim=con_sim,
+            eventos_por_activo=options['eventos'], historial_por_evento=options['historial'],
+            usuarios=options['usuarios'], hasta=hasta, tamano_lote=options['lote'],
+        )
+        inicio = time.perf_counter()
+
+        def al_avanzar(generados, total):
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(f'  {generados}/{total} ({generados / segundos:.0f} activos/s)')
+
+        totales = generador.generar(cantidad, desde=options['desde'], procesos=procesos, al_avanzar=al_avanzar)
+        self.stdout.write('Reconstruyendo resumen, sugerencias y cachés...')
+        despues_de_generar()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generados {totales['activos']} activos, {totales['movimientos']} movimientos y "
+            f"{totales['historial']} cambios de historial en {time.perf_counter() - inicio:.1f} s. "
+            f"Siguiente --desde: {options['desde'] + cantidad}."
+        ))
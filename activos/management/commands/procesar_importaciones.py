@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from activos.trabajos import ejecutar_trabajo, liberar_colgados, nombre_worker, tomar_siguiente
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de importaciones de Excel. Se pueden correr varios workers en paralelo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa los trabajos pendientes y termina.')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--expiracion', type=int, default=30,
+                            help='Minutos sin avance tras los que un trabajo en proceso se devuelve a la cola.')
+        parser.add_argument('--worker', default=None, help='Identificador del worker (por defecto host-pid).')
+
+    def handle(self, *args, **options):
+        worker = options['worker'] or nombre_worker()
+        self.stdout.write(f'Worker {worker} iniciado.')
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            # Las invalidaciones de este proceso no llegan a la caché de los procesos web
+            self.stdout.write(self.style.WARNING(
+                'La caché es LocMemCache: la web no verá las invalidaciones de este worker '
+                '(dashboards, búsqueda, referencias). Configura un CACHE_BACKEND compartido.'
+            ))
+
+        while True:
+            close_old_connections()
+            # En cada vuelta: un worker puede caerse mientras este sigue corriendo
+            devueltos, fallidos = liberar_colgados(options['expiracion'])
+            if devueltos:
+                self.stdout.write(self.style.WARNING(f'{devueltos} trabajo(s) colgado(s) devuelto(s) a la cola.'))
+            if fallidos:
+                self.stdout.write(self.style.WARNING(
+                    f'{fallidos} importación(es) interrumpida(s) en una petición marcada(s) como fallida(s).'))
+            trabajo = tomar_siguiente(worker)
+
+            if trabajo is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            self.stdout.write(f'Procesando {trabajo}...')
+            trabajo = ejecutar_trabajo(trabajo)
+            estilo = self.style.SUCCESS if trabajo.estado == 'completado' else self.style.ERROR
+            self.stdout.write(estilo(
+                f'Trabajo {trabajo.pk} {trabajo.estado}: {trabajo.importados} importados, '
+                f'{trabajo.actualizados} actualizados, {trabajo.omitidos} omitidos, {trabajo.errores} errores.'
+            ))
+
+        self.stdout.write('Cola vacía, worker finalizado.')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from activos.sugerencias import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Vuelve a llenar las sugerencias de autocompletado con los valores que usan hoy los activos.'
+
+    def handle(self, *args, **options):
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Sugerencias reconstruidas: {total} valor(es).'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activos.respaldo import TAMANO_LOTE, RespaldoInvalido, respaldar
+
+
+class Command(BaseCommand):
+    help = ('Respalda los datos de usuarios y activos en un directorio: un archivo JSONL por modelo, '
+            'leído por streaming (la memoria no depende del tamaño de la base).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directorio', help='Directorio donde escribir el respaldo (se crea si no existe).')
+        parser.add_argument('--comprimir', action='store_true', help='Comprime cada archivo con gzip.')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por lectura.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+        inicio = time.monotonic()
+        ultimo = {'momento': 0}
+
+        def al_avanzar(modelo, filas, total):
+            # Como mucho una línea cada 2 segundos, más la del final de cada modelo
+            ahora = time.monotonic()
+            if filas == total or ahora - ultimo['momento'] >= 2:
+                ultimo['momento'] = ahora
+                self.stdout.write(f'  {modelo}: {filas}/{total}')
+
+        try:
+            manifiesto = respaldar(options['directorio'], comprimir=options['comprimir'],
+                                   tamano_lote=options['lote'], al_avanzar=al_avanzar)
+        except RespaldoInvalido as e:
+            raise CommandError(str(e))
+
+        filas = sum(entrada['filas'] for entrada in manifiesto['modelos'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Respaldo en {options['directorio']}: {len(manifiesto['modelos'])} modelos, {filas} filas, "
+            f'{time.monotonic() - inicio:.1f} s.'
+        ))
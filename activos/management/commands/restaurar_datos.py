@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activos.respaldo import TAMANO_LOTE, RespaldoInvalido, restaurar
+from activos.restauracion_paralela import PROCESOS, restaurar_paralelo
+
+
+class Command(BaseCommand):
+    help = ('Restaura un respaldo de respaldar_datos con inserciones por lotes. Si se interrumpe, '
+            'volver a ejecutarlo continúa desde el último lote confirmado; las filas con el mismo id se sobrescriben.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directorio', help='Directorio del respaldo (con manifiesto.json).')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por transacción.')
+        parser.add_argument('--checkpoint', help='Archivo de checkpoint (por defecto dentro del directorio del respaldo).')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignora el checkpoint y empieza desde el principio.')
+        parser.add_argument('--paralelo', action='store_true',
+                            help='Tablas independientes en varios procesos y COPY en PostgreSQL (ver activos/restauracion_paralela.py).')
+        parser.add_argument('--procesos', type=int, default=PROCESOS, help='Procesos de la primera fase con --paralelo.')
+        parser.add_argument('--vaciar', action='store_true',
+                            help='Borra antes los datos de usuarios y activos de la base (no al continuar desde un checkpoint).')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['procesos'] < 1:
+            raise CommandError('--lote y --procesos deben ser mayores que cero.')
+        inicio = time.monotonic()
+        ultimo = {'momento': 0, 'modelo': None}
+
+        def al_avanzar(modelo, filas, total):
+            ahora = time.monotonic()
+            if modelo != ultimo['modelo']:
+                ultimo.update(modelo=modelo, inicio=ahora, filas=filas)
+            if filas == total or ahora - ultimo['momento'] >= 2:
+                ultimo['momento'] = ahora
+                ritmo = (filas - ultimo['filas']) / max(ahora - ultimo['inicio'], 0.001)
+                self.stdout.write(f'  {modelo}: {filas}/{total} ({ritmo:.0f} filas/s)')
+
+        try:
+            opciones = {'tamano_lote': options['lote'], 'checkpoint': options['checkpoint'],
+                        'reiniciar': options['reiniciar'], 'vaciar': options['vaciar'], 'al_avanzar': al_avanzar}
+            if options['paralelo']:
+                restauradas = restaurar_paralelo(options['directorio'], procesos=options['procesos'], **opciones)
+            else:
+                restauradas = restaurar(options['directorio'], **opciones)
+        except RespaldoInvalido as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Restauración completa: {sum(restauradas.values())} filas en {time.monotonic() - inicio:.1f} s.'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from activos.resumen import diferencias, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen de inventario (InventarioResumen) o verifica que coincida con los activos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Solo compara el resumen con la tabla de activos; termina con error si hay desfase.')
+        parser.add_argument('--max-diferencias', type=int, default=20, help='Diferencias a mostrar al verificar.')
+
+    def handle(self, *args, **options):
+        if not options['verificar']:
+            filas = reconstruir()
+            self.stdout.write(self.style.SUCCESS(f'Resumen reconstruido: {filas} fila(s).'))
+            return
+
+        encontradas = diferencias()
+        if not encontradas:
+            self.stdout.write(self.style.SUCCESS('El resumen coincide con la tabla de activos.'))
+            return
+
+        for clave, real, resumen in encontradas[:options['max_diferencias']]:
+            zona_id, categoria_id, marca_id, estado, operador, con_persona = clave
+            self.stdout.write(
+                f'zona={zona_id} categoria={categoria_id} marca={marca_id} estado={estado!r} '
+                f'operador={operador!r} con_persona={con_persona}: activos={real} resumen={resumen}'
+            )
+        raise CommandError(
+            f'El resumen tiene {len(encontradas)} diferencia(s). '
+            'Ejecute `python manage.py resumen_inventario` para reconstruirlo.'
+        )
@@ -0,0 +1,164 @@
+"""
+Métricas por vista: consultas SQL, tiempo en la base de datos, tiempo total y
+tamaño de la respuesta de cada petición, agrupadas por el nombre de la URL
+(activos:home, activos:tranzabilidad_list, ...).
+
+MetricasMiddleware envuelve la petición con connection.execute_wrapper para
+contar y cronometrar las consultas. Por vista se guardan las últimas
+METRICAS_MUESTRAS peticiones en memoria del proceso y de ellas salen los
+percentiles que devuelve la vista metricas_vistas (solo administradores).
+Las consultas que hace una respuesta en streaming mientras se envía no se
+cuentan: ocurren después de que la petición sale del middleware.
+
+Cada vista tiene un presupuesto de consultas (METRICAS_PRESUPUESTOS o
+METRICAS_PRESUPUESTO_CONSULTAS); si se pasa se registra un warning, o se
+levanta PresupuestoExcedido con METRICAS_PRESUPUESTO_ESTRICTO (pruebas).
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+
+
+class PresupuestoExcedido(Exception):
+    """La vista hizo más consultas SQL que las de su presupuesto."""
+
+
+def percentil(valores_ordenados, p):
+    """Percentil p (rango más cercano) de una lista ya ordenada."""
+    if not valores_ordenados:
+        return None
+    posicion = max(math.ceil(p / 100 * len(valores_ordenados)) - 1, 0)
+    return valores_ordenados[posicion]
+
+
+def _estadisticas(valores):
+    ordenados = sorted(valor for valor in valores if valor is not None)
+    if not ordenados:
+        return None
+    datos = {f'p{p}': percentil(ordenados, p) for p in PERCENTILES}
+    datos['max'] = ordenados[-1]
+    return datos
+
+
+class MetricasVistas:
+    """Muestras recientes por vista; seguro para varios hilos."""
+
+    def __init__(self):
+        self._bloqueo = threading.Lock()
+        self._vistas = {}
+        self.desde = timezone.now()
+
+    def registrar(self, vista, consultas, tiempo_bd, tiempo_total, tamano, excedido=False):
+        with self._bloqueo:
+            datos = self._vistas.get(vista)
+            if datos is None:
+                datos = self._vistas[vista] = {
+                    'peticiones': 0,
+                    'excedidas': 0,
+                    'muestras': deque(maxlen=settings.METRICAS_MUESTRAS),
+                }
+            datos['peticiones'] += 1
+            datos['excedidas'] += excedido
+            datos['muestras'].append((consultas, tiempo_bd, tiempo_total, tamano))
+
+    def resumen(self):
+        """Percentiles por vista, de la más lenta a la más rápida según el p90 del tiempo total."""
+        with self._bloqueo:
+            copia = {vista: (datos['peticiones'], datos['excedidas'], list(datos['muestras']))
+                     for vista, datos in self._vistas.items()}
+
+        vistas = []
+        for vista, (peticiones, excedidas, muestras) in copia.items():
+            consultas, tiempo_bd, tiempo_total, tamano = zip(*muestras)
+            vistas.append({
+                'vista': vista,
+                'peticiones': peticiones,
+                'muestras': len(muestras),
+                'presupuesto_consultas': presupuesto(vista),
+                'excedidas': excedidas,
+                'consultas': _estadisticas(consultas),
+                'tiempo_bd_ms': _estadisticas(tiempo_bd),
+                'tiempo_total_ms': _estadisticas(tiempo_total),
+                'bytes': _estadisticas(tamano),
+            })
+        vistas.sort(key=lambda datos: datos['tiempo_total_ms']['p90'], reverse=True)
+        return {'desde': self.desde, 'vistas': vistas}
+
+    def reiniciar(self):
+        with self._bloqueo:
+            self._vistas = {}
+            self.desde = timezone.now()
+
+
+metricas = MetricasVistas()
+
+
+def presupuesto(vista):
+    return settings.METRICAS_PRESUPUESTOS.get(vista, settings.METRICAS_PRESUPUESTO_CONSULTAS)
+
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta las consultas y acumula su duración."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _tamano(response):
+    if response.streaming:
+        valor = response.get('Content-Length')
+        return int(valor) if valor else None
+    return len(response.content)
+
+
+class MetricasMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICAS_ACTIVAS:
+            return self.get_response(request)
+
+        contador = ContadorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+        tiempo_total = time.perf_counter() - inicio
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        if coincidencia is None or not coincidencia.view_name:
+            # Estáticos, 404 sin ruta, ...
+            return response
+
+        vista = coincidencia.view_name
+        limite = presupuesto(vista)
+        excedido = limite is not None and contador.consultas > limite
+        metricas.registrar(vista, contador.consultas, round(contador.segundos * 1000, 2),
+                           round(tiempo_total * 1000, 2), _tamano(response), excedido)
+        if excedido:
+            mensaje = f'{vista} hizo {contador.consultas} consultas SQL (presupuesto: {limite}) en {request.path}'
+            if settings.METRICAS_PRESUPUESTO_ESTRICTO:
+                raise PresupuestoExcedido(mensaje)
+            logger.warning(mensaje)
+        return response
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0015_remove_zona_descripcion_zona_codigo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Archivo')),
+                ('archivo', models.BinaryField(verbose_name='Contenido del Archivo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('fallido', 'Fallido')], db_index=True, default='pendiente', max_length=20, verbose_name='Estado')),
+                ('worker', models.CharField(blank=True, max_length=100, null=True, verbose_name='Worker')),
+                ('total_filas', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Filas')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('importados', models.PositiveIntegerField(default=0, verbose_name='Importados')),
+                ('actualizados', models.PositiveIntegerField(default=0, verbose_name='Actualizados')),
+                ('omitidos', models.PositiveIntegerField(default=0, verbose_name='Omitidos')),
+                ('errores', models.PositiveIntegerField(default=0, verbose_name='Errores')),
+                ('errores_detalle', models.JSONField(blank=True, default=list, verbose_name='Detalle de Errores')),
+                ('mensaje', models.TextField(blank=True, null=True, verbose_name='Mensaje')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Fin')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Importación',
+                'verbose_name_plural': 'Trabajos de Importación',
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+    ]
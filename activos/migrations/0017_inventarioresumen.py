@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def construir_resumen(apps, schema_editor):
+    """Carga InventarioResumen con los activos existentes."""
+    Activo = apps.get_model('activos', 'Activo')
+    InventarioResumen = apps.get_model('activos', 'InventarioResumen')
+
+    conteo = Counter()
+    campos = ('zona', 'categoria_id', 'marca_id', 'estado', 'operador', 'nombres_apellidos')
+    for zona, categoria_id, marca_id, estado, operador, nombres in Activo.objects.values_list(*campos).iterator():
+        conteo[(zona, categoria_id, marca_id, estado, operador, bool(nombres))] += 1
+
+    InventarioResumen.objects.bulk_create([
+        InventarioResumen(zona=zona, categoria_id=categoria_id, marca_id=marca_id, estado=estado,
+                          operador=operador, con_persona=con_persona, total=total)
+        for (zona, categoria_id, marca_id, estado, operador, con_persona), total in conteo.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0016_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventarioResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zona', models.CharField(max_length=100, verbose_name='Zona')),
+                ('estado', models.CharField(max_length=100, verbose_name='Estado')),
+                ('operador', models.CharField(blank=True, max_length=50, null=True, verbose_name='Operador')),
+                ('con_persona', models.BooleanField(default=False, verbose_name='Con Persona Asignada')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='activos.categoria', verbose_name='Categoría')),
+                ('marca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='activos.marca', verbose_name='Marca')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Inventario',
+                'verbose_name_plural': 'Resumen de Inventario',
+            },
+        ),
+        migrations.RunPython(construir_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+CAMPOS_NORMALIZADOS = {
+    'iccid': 'iccid_normalizado',
+    'mac_superflex': 'mac_superflex_normalizado',
+}
+
+TAMANO_LOTE = 1000
+
+
+def normalizar(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip().upper()
+    return valor or None
+
+
+def completar_normalizados(apps, schema_editor):
+    """Llena iccid_normalizado y mac_superflex_normalizado de los activos existentes, por lotes."""
+    Activo = apps.get_model('activos', 'Activo')
+    campos = list(CAMPOS_NORMALIZADOS)
+    lote = []
+    for item, *valores in Activo.objects.order_by('item').values_list('item', *campos).iterator(chunk_size=TAMANO_LOTE):
+        activo = Activo(item=item)
+        for campo, valor in zip(campos, valores):
+            setattr(activo, CAMPOS_NORMALIZADOS[campo], normalizar(valor))
+        lote.append(activo)
+        if len(lote) >= TAMANO_LOTE:
+            Activo.objects.bulk_update(lote, list(CAMPOS_NORMALIZADOS.values()))
+            lote = []
+    if lote:
+        Activo.objects.bulk_update(lote, list(CAMPOS_NORMALIZADOS.values()))
+
+
+def crear_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for columna in CAMPOS_NORMALIZADOS.values():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS activos_activo_{columna}_trgm '
+            f'ON activos_activo USING gin ({columna} gin_trgm_ops)'
+        )
+
+
+def borrar_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for columna in CAMPOS_NORMALIZADOS.values():
+        schema_editor.execute(f'DROP INDEX IF EXISTS activos_activo_{columna}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0018_activo_columnas_normalizadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='iccid_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='activo',
+            name='mac_superflex_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.RunPython(completar_normalizados, migrations.RunPython.noop),
+        migrations.RunPython(crear_indices_trigramas, borrar_indices_trigramas),
+    ]
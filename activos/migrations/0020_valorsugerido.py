@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+CAMPOS = ('documento', 'nombres_apellidos', 'identificacion', 'codigo_centro_costo', 'centro_costo_punto')
+
+
+def cargar_valores(apps, schema_editor):
+    """Llena ValorSugerido con los valores distintos que tienen hoy los activos."""
+    Activo = apps.get_model('activos', 'Activo')
+    ValorSugerido = apps.get_model('activos', 'ValorSugerido')
+    for campo in CAMPOS:
+        valores = (
+            Activo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+            .order_by().values_list(campo, flat=True).distinct()
+        )
+        filas = []
+        for valor in valores.iterator():
+            valor = valor[:200]
+            normalizado = valor.strip().upper()
+            if normalizado:
+                filas.append(ValorSugerido(campo=campo, valor=valor, valor_normalizado=normalizado))
+        ValorSugerido.objects.bulk_create(filas, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0019_activo_iccid_mac_normalizados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValorSugerido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(max_length=50, verbose_name='Campo')),
+                ('valor', models.CharField(max_length=200, verbose_name='Valor')),
+                ('valor_normalizado', models.CharField(max_length=200, verbose_name='Valor Normalizado')),
+            ],
+            options={
+                'verbose_name': 'Valor Sugerido',
+                'verbose_name_plural': 'Valores Sugeridos',
+                'indexes': [models.Index(fields=['campo', 'valor_normalizado'], name='activos_sugerido_prefijo_idx')],
+                'unique_together': {('campo', 'valor')},
+            },
+        ),
+        migrations.RunPython(cargar_valores, migrations.RunPython.noop),
+    ]
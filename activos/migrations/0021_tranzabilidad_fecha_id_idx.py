@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0020_valorsugerido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tranzabilidad',
+            index=models.Index(fields=['fecha', 'id'], name='activos_tranz_fecha_id_idx'),
+        ),
+    ]
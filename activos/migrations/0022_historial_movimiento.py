@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:25
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Heurística con la que se asociaban hasta ahora (ver activos/movimientos.py)
+VENTANA = timedelta(seconds=2)
+TIPOS_CON_HISTORIAL = ('actualizacion', 'cambio_estado')
+ACTIVOS_POR_LOTE = 500
+
+
+def enlazar_historiales(apps, schema_editor):
+    """Enlaza cada Historial con el movimiento del mismo activo más cercano dentro de ±2 s."""
+    Historial = apps.get_model('activos', 'Historial')
+    Tranzabilidad = apps.get_model('activos', 'Tranzabilidad')
+
+    activos = list(
+        Historial.objects.filter(movimiento__isnull=True).order_by('activo_id')
+        .values_list('activo_id', flat=True).distinct()
+    )
+    for inicio in range(0, len(activos), ACTIVOS_POR_LOTE):
+        lote = activos[inicio:inicio + ACTIVOS_POR_LOTE]
+        movimientos = {}
+        for movimiento_id, activo_id, fecha in (
+            Tranzabilidad.objects.filter(activo_id__in=lote, tipo__in=TIPOS_CON_HISTORIAL)
+            .values_list('id', 'activo_id', 'fecha')
+        ):
+            movimientos.setdefault(activo_id, []).append((fecha, movimiento_id))
+
+        enlazados = []
+        for historial in Historial.objects.filter(activo_id__in=lote, movimiento__isnull=True).only('id', 'activo_id', 'fecha'):
+            cercanos = [
+                (abs(fecha - historial.fecha), movimiento_id)
+                for fecha, movimiento_id in movimientos.get(historial.activo_id, ())
+                if abs(fecha - historial.fecha) <= VENTANA
+            ]
+            if cercanos:
+                historial.movimiento_id = min(cercanos)[1]
+                enlazados.append(historial)
+        Historial.objects.bulk_update(enlazados, ['movimiento'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0021_tranzabilidad_fecha_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historial',
+            name='movimiento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='historiales', to='activos.tranzabilidad', verbose_name='Movimiento'),
+        ),
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['activo', 'fecha'], name='activos_hist_activo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tranzabilidad',
+            index=models.Index(fields=['activo', 'fecha'], name='activos_tranz_activo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tranzabilidad',
+            index=models.Index(fields=['tipo', 'fecha'], name='activos_tranz_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tranzabilidad',
+            index=models.Index(fields=['usuario', 'fecha'], name='activos_tranz_usr_fecha_idx'),
+        ),
+        migrations.RunPython(enlazar_historiales, migrations.RunPython.noop),
+    ]
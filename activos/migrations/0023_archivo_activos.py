@@ -0,0 +1,105 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0022_historial_movimiento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivoArchivado',
+            fields=[
+                ('item', models.IntegerField(primary_key=True, serialize=False, verbose_name='ITEM')),
+                ('documento', models.CharField(blank=True, max_length=100, null=True, verbose_name='DOCUMENTO')),
+                ('nombres_apellidos', models.CharField(blank=True, max_length=200, null=True, verbose_name='NOMBRES Y APELLIDOS')),
+                ('imei1', models.CharField(blank=True, max_length=100, null=True, verbose_name='IMEI 1')),
+                ('imei2', models.CharField(blank=True, max_length=100, null=True, verbose_name='IMEI 2')),
+                ('sn', models.CharField(blank=True, max_length=100, null=True, verbose_name='S/N')),
+                ('iccid', models.CharField(blank=True, max_length=100, null=True, verbose_name='ICCID')),
+                ('operador', models.CharField(blank=True, max_length=50, null=True, verbose_name='OPERADOR')),
+                ('mac_superflex', models.CharField(blank=True, max_length=100, null=True, verbose_name='MAC SUPERFLEX')),
+                ('marca_old', models.CharField(blank=True, max_length=100, null=True, verbose_name='MARCA OLD')),
+                ('activo', models.CharField(blank=True, max_length=100, null=True, verbose_name='ACTIVO')),
+                ('cargo', models.CharField(max_length=100, verbose_name='CARGO')),
+                ('estado', models.CharField(max_length=100, verbose_name='ESTADO')),
+                ('fecha_confirmacion', models.DateField(blank=True, null=True, verbose_name='FECHA DE CONFIRMACIÓN')),
+                ('responsable', models.CharField(blank=True, max_length=100, null=True, verbose_name='RESPONSABLE')),
+                ('identificacion', models.CharField(blank=True, max_length=100, null=True, verbose_name='IDENTIFICACIÓN')),
+                ('zona', models.CharField(max_length=100, verbose_name='ZONA')),
+                ('observacion', models.TextField(verbose_name='OBSERVACIÓN')),
+                ('punto_venta', models.CharField(blank=True, max_length=100, null=True, verbose_name='PUNTO DE VENTA')),
+                ('codigo_centro_costo', models.CharField(blank=True, max_length=100, null=True, verbose_name='CÓDIGO CENTRO DE COSTO')),
+                ('centro_costo_punto', models.CharField(blank=True, max_length=100, null=True, verbose_name='CENTRO DE COSTO PUNTO')),
+                ('fecha_salida_bodega', models.DateField(blank=True, null=True, verbose_name='FECHA DE SALIDA DE BODEGA')),
+                ('fecha_creacion', models.DateTimeField(verbose_name='Fecha de Creación')),
+                ('fecha_modificacion', models.DateTimeField(verbose_name='Fecha de Modificación')),
+                ('sn_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('imei1_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('imei2_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('documento_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('activo_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('iccid_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('mac_superflex_normalizado', models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True)),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Archivo')),
+                ('archivado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Archivado por')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='activos.categoria', verbose_name='Categoría')),
+                ('marca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='activos.marca', verbose_name='MARCA')),
+            ],
+            options={
+                'verbose_name': 'Activo Archivado',
+                'verbose_name_plural': 'Activos Archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='TranzabilidadArchivada',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('ingreso', 'Ingreso'), ('salida', 'Salida'), ('transferencia', 'Transferencia'), ('cambio_estado', 'Cambio de Estado'), ('asignacion', 'Asignación'), ('actualizacion', 'Actualización'), ('eliminacion', 'Eliminación')], max_length=20, verbose_name='Tipo de Tranzabilidad')),
+                ('zona_origen', models.CharField(blank=True, max_length=100, null=True, verbose_name='Zona Origen')),
+                ('zona_destino', models.CharField(blank=True, max_length=100, null=True, verbose_name='Zona Destino')),
+                ('estado_anterior', models.CharField(blank=True, max_length=100, null=True, verbose_name='Estado Anterior')),
+                ('estado_nuevo', models.CharField(blank=True, max_length=100, null=True, verbose_name='Estado Nuevo')),
+                ('descripcion', models.TextField(blank=True, null=True, verbose_name='Descripción')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('activo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='activos.activoarchivado', verbose_name='Activo')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Tranzabilidad Archivada',
+                'verbose_name_plural': 'Tranzabilidad Archivada',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistorialArchivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('campo_cambiado', models.CharField(max_length=100, verbose_name='Campo Cambiado')),
+                ('valor_anterior', models.TextField(blank=True, null=True, verbose_name='Valor Anterior')),
+                ('valor_nuevo', models.TextField(blank=True, null=True, verbose_name='Valor Nuevo')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historiales', to='activos.activoarchivado', verbose_name='Activo')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('movimiento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='historiales', to='activos.tranzabilidadarchivada', verbose_name='Movimiento')),
+            ],
+            options={
+                'verbose_name': 'Historial Archivado',
+                'verbose_name_plural': 'Historiales Archivados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tranzabilidadarchivada',
+            index=models.Index(fields=['activo', 'fecha'], name='activos_tranzarch_act_fec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialarchivado',
+            index=models.Index(fields=['activo', 'fecha'], name='activos_histarch_act_fec_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0023_archivo_activos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='zona_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='activos.zona', verbose_name='ZONA'),
+        ),
+        migrations.AddField(
+            model_name='activoarchivado',
+            name='zona_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='activos.zona', verbose_name='ZONA'),
+        ),
+        migrations.AddField(
+            model_name='inventarioresumen',
+            name='zona_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='activos.zona', verbose_name='Zona'),
+        ),
+    ]
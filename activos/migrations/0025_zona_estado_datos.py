@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:31
+
+from collections import Counter
+
+from django.db import migrations
+
+
+# Copia de models.codigo_estado: las migraciones no importan código de la app
+def codigo_estado(valor):
+    valor = (valor or '').strip().lower()
+    if 'baja' in valor:
+        return 'dado de baja'
+    if 'asignado' in valor:
+        return 'asignado'
+    return 'activo confirmado'
+
+
+def convertir(apps, schema_editor):
+    """
+    Pasa la zona de texto a la referencia a Zona (sin distinguir mayúsculas ni
+    espacios; las zonas que no existen se crean) y el estado a su código.
+    Después reconstruye el resumen con las claves nuevas.
+    """
+    Zona = apps.get_model('activos', 'Zona')
+    Activo = apps.get_model('activos', 'Activo')
+    ActivoArchivado = apps.get_model('activos', 'ActivoArchivado')
+    InventarioResumen = apps.get_model('activos', 'InventarioResumen')
+
+    zonas = {}
+    for zona in Zona.objects.order_by('pk'):
+        zonas.setdefault(zona.nombre.strip().lower(), zona.pk)
+
+    for modelo in (Activo, ActivoArchivado):
+        for texto in modelo.objects.order_by().values_list('zona', flat=True).distinct():
+            nombre = (texto or '').strip()
+            if not nombre:
+                continue
+            if nombre.lower() not in zonas:
+                zonas[nombre.lower()] = Zona.objects.create(nombre=nombre).pk
+            modelo.objects.filter(zona=texto).update(zona_ref_id=zonas[nombre.lower()])
+
+        for estado in modelo.objects.order_by().values_list('estado', flat=True).distinct():
+            codigo = codigo_estado(estado)
+            if codigo != estado:
+                modelo.objects.filter(estado=estado).update(estado=codigo)
+
+    InventarioResumen.objects.all().delete()
+    conteo = Counter()
+    campos = ('zona_ref_id', 'categoria_id', 'marca_id', 'estado', 'operador', 'nombres_apellidos')
+    for zona_id, categoria_id, marca_id, estado, operador, nombres in Activo.objects.values_list(*campos).iterator():
+        conteo[(zona_id, categoria_id, marca_id, estado, operador, bool(nombres))] += 1
+    InventarioResumen.objects.bulk_create([
+        InventarioResumen(zona='', zona_ref_id=zona_id, categoria_id=categoria_id, marca_id=marca_id,
+                          estado=estado, operador=operador, con_persona=con_persona, total=total)
+        for (zona_id, categoria_id, marca_id, estado, operador, con_persona), total in conteo.items()
+    ], batch_size=500)
+
+
+def revertir(apps, schema_editor):
+    """Vuelve a escribir el nombre de la zona en la columna de texto (los estados quedan con su código)."""
+    Zona = apps.get_model('activos', 'Zona')
+    nombres = dict(Zona.objects.values_list('pk', 'nombre'))
+    for modelo in ('Activo', 'ActivoArchivado', 'InventarioResumen'):
+        modelo = apps.get_model('activos', modelo)
+        for zona_id in modelo.objects.order_by().values_list('zona_ref_id', flat=True).distinct():
+            if zona_id is not None:
+                modelo.objects.filter(zona_ref_id=zona_id).update(zona=nombres[zona_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0024_zona_ref'),
+    ]
+
+    operations = [
+        migrations.RunPython(convertir, revertir),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+ESTADOS_ACTIVO = [('activo confirmado', 'Activo Confirmado'), ('asignado', 'Asignado'), ('dado de baja', 'Dado de Baja')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0025_zona_estado_datos'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='activo',
+            name='zona',
+        ),
+        migrations.RemoveField(
+            model_name='activoarchivado',
+            name='zona',
+        ),
+        migrations.RemoveField(
+            model_name='inventarioresumen',
+            name='zona',
+        ),
+        migrations.RenameField(
+            model_name='activo',
+            old_name='zona_ref',
+            new_name='zona',
+        ),
+        migrations.RenameField(
+            model_name='activoarchivado',
+            old_name='zona_ref',
+            new_name='zona',
+        ),
+        migrations.RenameField(
+            model_name='inventarioresumen',
+            old_name='zona_ref',
+            new_name='zona',
+        ),
+        migrations.AlterField(
+            model_name='activo',
+            name='zona',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='activos', to='activos.zona', verbose_name='ZONA'),
+        ),
+        migrations.AlterField(
+            model_name='activo',
+            name='estado',
+            field=models.CharField(choices=ESTADOS_ACTIVO, db_index=True, default='activo confirmado', max_length=20, verbose_name='ESTADO'),
+        ),
+        migrations.AlterField(
+            model_name='activoarchivado',
+            name='estado',
+            field=models.CharField(choices=ESTADOS_ACTIVO, max_length=20, verbose_name='ESTADO'),
+        ),
+        migrations.AlterField(
+            model_name='inventarioresumen',
+            name='estado',
+            field=models.CharField(choices=ESTADOS_ACTIVO, max_length=20, verbose_name='Estado'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0026_activo_zona_fk_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tranzabilidad',
+            name='item_eliminado',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Item Eliminado'),
+        ),
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['fecha_modificacion', 'item'], name='activos_activo_fmod_item_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+TAMANO_LOTE = 1000
+
+
+def normalizar(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip().upper()
+    return valor or None
+
+
+def completar_normalizados(apps, schema_editor):
+    """Llena nombres_apellidos_normalizado de los activos existentes (y archivados), por lotes."""
+    for nombre in ('Activo', 'ActivoArchivado'):
+        modelo = apps.get_model('activos', nombre)
+        lote = []
+        filas = modelo.objects.exclude(nombres_apellidos=None).order_by('item')
+        for item, valor in filas.values_list('item', 'nombres_apellidos').iterator(chunk_size=TAMANO_LOTE):
+            lote.append(modelo(item=item, nombres_apellidos_normalizado=normalizar(valor)))
+            if len(lote) >= TAMANO_LOTE:
+                modelo.objects.bulk_update(lote, ['nombres_apellidos_normalizado'])
+                lote = []
+        if lote:
+            modelo.objects.bulk_update(lote, ['nombres_apellidos_normalizado'])
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS activos_activo_nombres_apellidos_normalizado_trgm '
+        'ON activos_activo USING gin (nombres_apellidos_normalizado gin_trgm_ops)'
+    )
+
+
+def borrar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS activos_activo_nombres_apellidos_normalizado_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0027_delta_exportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='nombres_apellidos_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='activoarchivado',
+            name='nombres_apellidos_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(completar_normalizados, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice_trigramas, borrar_indice_trigramas),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:16
+
+from django.db import migrations
+
+
+def crear_indice_prefijo(apps, schema_editor):
+    # LIKE 'x%' solo usa un índice con varchar_pattern_ops si la collation no es "C";
+    # las columnas normalizadas de Activo ya lo tienen (*_like, por db_index)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS activos_sugerido_prefijo_like '
+        'ON activos_valorsugerido (campo, valor_normalizado varchar_pattern_ops)'
+    )
+
+
+def borrar_indice_prefijo(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS activos_sugerido_prefijo_like')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activos', '0028_nombres_apellidos_normalizado'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_prefijo, borrar_indice_prefijo),
+    ]
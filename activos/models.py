@@ -1,7 +1,53 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 
+# Columnas de búsqueda: copia normalizada (ver normalizar) de cada campo, con índice.
+# Se recalculan en Activo.preparar_guardado(), que usan save() y las rutas masivas.
+CAMPOS_NORMALIZADOS = {
+    'sn': 'sn_normalizado',
+    'imei1': 'imei1_normalizado',
+    'imei2': 'imei2_normalizado',
+    'documento': 'documento_normalizado',
+    'activo': 'activo_normalizado',
+    'iccid': 'iccid_normalizado',
+    'mac_superflex': 'mac_superflex_normalizado',
+    'nombres_apellidos': 'nombres_apellidos_normalizado',
+}
+
+
+# Estados de un activo (Activo.estado). El código es el mismo texto que ya se
+# guardaba, así que filtros, plantillas y exportaciones no cambian.
+ESTADO_CONFIRMADO = 'activo confirmado'
+ESTADO_ASIGNADO = 'asignado'
+ESTADO_BAJA = 'dado de baja'
+ESTADOS_ACTIVO = [
+    (ESTADO_CONFIRMADO, 'Activo Confirmado'),
+    (ESTADO_ASIGNADO, 'Asignado'),
+    (ESTADO_BAJA, 'Dado de Baja'),
+]
+
+
+def codigo_estado(valor, por_defecto=ESTADO_CONFIRMADO):
+    """Código de estado de un texto libre (importaciones, datos viejos): busca 'baja' y 'asignado'."""
+    valor = (valor or '').strip().lower()
+    if not valor:
+        return por_defecto
+    if 'baja' in valor:
+        return ESTADO_BAJA
+    if 'asignado' in valor:
+        return ESTADO_ASIGNADO
+    return ESTADO_CONFIRMADO
+
+
+def normalizar(valor):
+    """Forma canónica para búsquedas: sin espacios en los extremos y en mayúsculas."""
+    if valor is None:
+        return None
+    valor = str(valor).strip().upper()
+    return valor or None
+
+
 class Zona(models.Model):
     nombre = models.CharField(max_length=100, unique=True, verbose_name="Nombre de la Zona")
     codigo = models.CharField(max_length=20, blank=True, null=True, verbose_name="Código")
@@ -57,11 +103,12 @@ class Activo(models.Model):
     marca = models.ForeignKey('Marca', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="MARCA")
     activo = models.CharField(max_length=100, blank=True, null=True, verbose_name="ACTIVO")
     cargo = models.CharField(max_length=100, default="vendedor ambulante", verbose_name="CARGO")
-    estado = models.CharField(max_length=100, default="activo confirmado", verbose_name="ESTADO")
+    estado = models.CharField(max_length=20, choices=ESTADOS_ACTIVO, default=ESTADO_CONFIRMADO, db_index=True, verbose_name="ESTADO")
     fecha_confirmacion = models.DateField(auto_now_add=True, verbose_name="FECHA DE CONFIRMACIÓN")
     responsable = models.CharField(max_length=100, blank=True, null=True, verbose_name="RESPONSABLE")
     identificacion = models.CharField(max_length=100, blank=True, null=True, verbose_name="IDENTIFICACIÓN")
-    zona = models.CharField(max_length=100, default="Valledupar", verbose_name="ZONA")
+    # PROTECT: una zona con activos no se puede borrar (renombrarla sí, los activos la siguen)
+    zona = models.ForeignKey('Zona', on_delete=models.PROTECT, null=True, related_name='activos', verbose_name="ZONA")
     categoria = models.ForeignKey('Categoria', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Categoría")
     observacion = models.TextField(default="VERIFICADO", verbose_name="OBSERVACIÓN")
     punto_venta = models.CharField(max_length=100, blank=True, null=True, verbose_name="PUNTO DE VENTA")
@@ -71,6 +118,17 @@ class Activo(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     fecha_modificacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de Modificación")
 
+    # Columnas normalizadas para búsqueda (CAMPOS_NORMALIZADOS); no se editan a mano
+    sn_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    imei1_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    imei2_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    documento_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    activo_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    iccid_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    mac_superflex_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    # Solo se busca como subcadena: en PostgreSQL tiene índice de trigramas y no B-tree
+    nombres_apellidos_normalizado = models.CharField(max_length=200, blank=True, null=True, editable=False)
+
     def detectar_operador(self):
         """Detecta el operador basado en el ICCID"""
         if not self.iccid:
@@ -92,7 +150,12 @@ class Activo(models.Model):
         
         return None
 
-    def save(self, *args, **kwargs):
+    def preparar_guardado(self):
+        """
+        Aplica las reglas de negocio previas al guardado.
+        Se usa desde save() y desde las rutas masivas (bulk_create/bulk_update),
+        que no pasan por save().
+        """
         # Detectar operador automáticamente antes de guardar
         if self.iccid:
             operador_detectado = self.detectar_operador()
@@ -101,11 +164,22 @@ class Activo(models.Model):
         
         # Lógica para establecer fecha de salida de bodega
         # Si tiene responsable/asignado o tiene nombres y apellidos (asignado a persona), establecer la fecha actual
-        if (self.responsable or self.nombres_apellidos or self.estado == 'asignado') and not self.fecha_salida_bodega:
+        if (self.responsable or self.nombres_apellidos or self.estado == ESTADO_ASIGNADO) and not self.fecha_salida_bodega:
             from django.utils import timezone
             self.fecha_salida_bodega = timezone.now().date()
-            
-        super().save(*args, **kwargs)
+
+        # Columnas normalizadas para búsqueda
+        for campo, columna in CAMPOS_NORMALIZADOS.items():
+            setattr(self, columna, normalizar(getattr(self, campo)))
+
+    def save(self, *args, **kwargs):
+        self.preparar_guardado()
+        # El resumen del inventario se ajusta en la misma transacción que el activo
+        from .resumen import clave_guardada, mover
+        with transaction.atomic():
+            anterior = clave_guardada(self.pk) if self.pk else None
+            super().save(*args, **kwargs)
+            mover(anterior, self)
 
     def __str__(self):
         return f"Activo {self.item} - {self.activo}"
@@ -113,6 +187,32 @@ class Activo(models.Model):
     class Meta:
         verbose_name = "Activo"
         verbose_name_plural = "Activos"
+        indexes = [
+            # Exportación delta: activos modificados después de una marca, en orden
+            models.Index(fields=['fecha_modificacion', 'item'], name='activos_activo_fmod_item_idx'),
+        ]
+
+
+class InventarioResumen(models.Model):
+    """
+    Cantidad de activos por zona, categoría, marca, estado y operador.
+    Se mantiene desde activos/resumen.py; `python manage.py resumen_inventario` lo reconstruye.
+    """
+    zona = models.ForeignKey('Zona', on_delete=models.CASCADE, null=True, related_name='+', verbose_name="Zona")
+    categoria = models.ForeignKey('Categoria', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Categoría")
+    marca = models.ForeignKey('Marca', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Marca")
+    estado = models.CharField(max_length=20, choices=ESTADOS_ACTIVO, verbose_name="Estado")
+    operador = models.CharField(max_length=50, blank=True, null=True, verbose_name="Operador")
+    # nombres_apellidos no vacío: cuenta como asignado en los dashboards
+    con_persona = models.BooleanField(default=False, verbose_name="Con Persona Asignada")
+    total = models.IntegerField(default=0, verbose_name="Total")
+
+    def __str__(self):
+        return f"{self.zona_id} / {self.categoria_id} / {self.marca_id} / {self.estado} / {self.operador}: {self.total}"
+
+    class Meta:
+        verbose_name = "Resumen de Inventario"
+        verbose_name_plural = "Resumen de Inventario"
 
 
 class Tranzabilidad(models.Model):
@@ -135,6 +235,8 @@ class Tranzabilidad(models.Model):
     estado_nuevo = models.CharField(max_length=100, blank=True, null=True, verbose_name="Estado Nuevo")
     descripcion = models.TextField(blank=True, null=True, verbose_name="Descripción")
     fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    # En las eliminaciones, el item del activo borrado (activo queda en NULL); lo lee la exportación delta
+    item_eliminado = models.PositiveIntegerField(blank=True, null=True, verbose_name="Item Eliminado")
 
     def __str__(self):
         return f"{self.tipo} - {self.activo} - {self.fecha}"
@@ -144,6 +246,14 @@ class Tranzabilidad(models.Model):
         verbose_name_plural = "Tranzabilidad"
         ordering = ['-fecha']
         db_table = 'activos_tranzabilidad'
+        indexes = [
+            # Orden del listado y de la paginación por cursor (activos/paginacion.py)
+            models.Index(fields=['fecha', 'id'], name='activos_tranz_fecha_id_idx'),
+            # Movimientos de un activo, por tipo o por usuario en un rango de fechas
+            models.Index(fields=['activo', 'fecha'], name='activos_tranz_activo_fecha_idx'),
+            models.Index(fields=['tipo', 'fecha'], name='activos_tranz_tipo_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha'], name='activos_tranz_usr_fecha_idx'),
+        ]
 
 
 class Historial(models.Model):
@@ -153,6 +263,9 @@ class Historial(models.Model):
     valor_anterior = models.TextField(blank=True, null=True, verbose_name="Valor Anterior")
     valor_nuevo = models.TextField(blank=True, null=True, verbose_name="Valor Nuevo")
     fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    # Movimiento que originó el cambio (los anteriores a la columna se enlazaron por fecha ±2 s)
+    movimiento = models.ForeignKey(Tranzabilidad, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='historiales', verbose_name="Movimiento")
 
     def __str__(self):
         return f"Historial {self.activo} - {self.campo_cambiado}"
@@ -160,3 +273,164 @@ class Historial(models.Model):
     class Meta:
         verbose_name = "Historial"
         verbose_name_plural = "Historiales"
+        indexes = [
+            models.Index(fields=['activo', 'fecha'], name='activos_hist_activo_fecha_idx'),
+        ]
+
+
+class ActivoArchivado(models.Model):
+    """
+    Activo retirado del inventario en uso (ver activos/archivo.py). Mismas
+    columnas e item que tenía en Activo; no cuenta en dashboards ni listados.
+    """
+    item = models.IntegerField(primary_key=True, verbose_name="ITEM")
+    documento = models.CharField(max_length=100, blank=True, null=True, verbose_name="DOCUMENTO")
+    nombres_apellidos = models.CharField(max_length=200, blank=True, null=True, verbose_name="NOMBRES Y APELLIDOS")
+    imei1 = models.CharField(max_length=100, blank=True, null=True, verbose_name="IMEI 1")
+    imei2 = models.CharField(max_length=100, blank=True, null=True, verbose_name="IMEI 2")
+    sn = models.CharField(max_length=100, blank=True, null=True, verbose_name="S/N")
+    iccid = models.CharField(max_length=100, blank=True, null=True, verbose_name="ICCID")
+    operador = models.CharField(max_length=50, blank=True, null=True, verbose_name="OPERADOR")
+    mac_superflex = models.CharField(max_length=100, blank=True, null=True, verbose_name="MAC SUPERFLEX")
+    marca_old = models.CharField(max_length=100, blank=True, null=True, verbose_name="MARCA OLD")
+    marca = models.ForeignKey('Marca', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="MARCA")
+    activo = models.CharField(max_length=100, blank=True, null=True, verbose_name="ACTIVO")
+    cargo = models.CharField(max_length=100, verbose_name="CARGO")
+    estado = models.CharField(max_length=20, choices=ESTADOS_ACTIVO, verbose_name="ESTADO")
+    fecha_confirmacion = models.DateField(blank=True, null=True, verbose_name="FECHA DE CONFIRMACIÓN")
+    responsable = models.CharField(max_length=100, blank=True, null=True, verbose_name="RESPONSABLE")
+    identificacion = models.CharField(max_length=100, blank=True, null=True, verbose_name="IDENTIFICACIÓN")
+    zona = models.ForeignKey('Zona', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="ZONA")
+    categoria = models.ForeignKey('Categoria', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Categoría")
+    observacion = models.TextField(verbose_name="OBSERVACIÓN")
+    punto_venta = models.CharField(max_length=100, blank=True, null=True, verbose_name="PUNTO DE VENTA")
+    codigo_centro_costo = models.CharField(max_length=100, blank=True, null=True, verbose_name="CÓDIGO CENTRO DE COSTO")
+    centro_costo_punto = models.CharField(max_length=100, blank=True, null=True, verbose_name="CENTRO DE COSTO PUNTO")
+    fecha_salida_bodega = models.DateField(blank=True, null=True, verbose_name="FECHA DE SALIDA DE BODEGA")
+    fecha_creacion = models.DateTimeField(verbose_name="Fecha de Creación")
+    fecha_modificacion = models.DateTimeField(verbose_name="Fecha de Modificación")
+
+    sn_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    imei1_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    imei2_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    documento_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    activo_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    iccid_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    mac_superflex_normalizado = models.CharField(max_length=100, blank=True, null=True, editable=False, db_index=True)
+    nombres_apellidos_normalizado = models.CharField(max_length=200, blank=True, null=True, editable=False)
+
+    fecha_archivo = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Archivo")
+    archivado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='+', verbose_name="Archivado por")
+
+    def __str__(self):
+        return f"Activo archivado {self.item} - {self.activo}"
+
+    class Meta:
+        verbose_name = "Activo Archivado"
+        verbose_name_plural = "Activos Archivados"
+
+
+class TranzabilidadArchivada(models.Model):
+    """Movimiento de un activo archivado; mismas columnas e id que en Tranzabilidad."""
+    id = models.IntegerField(primary_key=True)
+    activo = models.ForeignKey(ActivoArchivado, on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='movimientos', verbose_name="Activo")
+    tipo = models.CharField(max_length=20, choices=Tranzabilidad.TIPO_CHOICES, verbose_name="Tipo de Tranzabilidad")
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', verbose_name="Usuario")
+    zona_origen = models.CharField(max_length=100, blank=True, null=True, verbose_name="Zona Origen")
+    zona_destino = models.CharField(max_length=100, blank=True, null=True, verbose_name="Zona Destino")
+    estado_anterior = models.CharField(max_length=100, blank=True, null=True, verbose_name="Estado Anterior")
+    estado_nuevo = models.CharField(max_length=100, blank=True, null=True, verbose_name="Estado Nuevo")
+    descripcion = models.TextField(blank=True, null=True, verbose_name="Descripción")
+    fecha = models.DateTimeField(verbose_name="Fecha")
+
+    def __str__(self):
+        return f"{self.tipo} - {self.activo} - {self.fecha}"
+
+    class Meta:
+        verbose_name = "Tranzabilidad Archivada"
+        verbose_name_plural = "Tranzabilidad Archivada"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['activo', 'fecha'], name='activos_tranzarch_act_fec_idx'),
+        ]
+
+
+class HistorialArchivado(models.Model):
+    """Cambio de un activo archivado; mismas columnas e id que en Historial."""
+    id = models.IntegerField(primary_key=True)
+    activo = models.ForeignKey(ActivoArchivado, on_delete=models.CASCADE, related_name='historiales', verbose_name="Activo")
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', verbose_name="Usuario")
+    campo_cambiado = models.CharField(max_length=100, verbose_name="Campo Cambiado")
+    valor_anterior = models.TextField(blank=True, null=True, verbose_name="Valor Anterior")
+    valor_nuevo = models.TextField(blank=True, null=True, verbose_name="Valor Nuevo")
+    fecha = models.DateTimeField(verbose_name="Fecha")
+    movimiento = models.ForeignKey(TranzabilidadArchivada, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='historiales', verbose_name="Movimiento")
+
+    def __str__(self):
+        return f"Historial {self.activo} - {self.campo_cambiado}"
+
+    class Meta:
+        verbose_name = "Historial Archivado"
+        verbose_name_plural = "Historiales Archivados"
+        indexes = [
+            models.Index(fields=['activo', 'fecha'], name='activos_histarch_act_fec_idx'),
+        ]
+
+
+class TrabajoImportacion(models.Model):
+    """Importación de Excel encolada; la procesa el comando procesar_importaciones."""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Usuario")
+    nombre_archivo = models.CharField(max_length=255, verbose_name="Archivo")
+    archivo = models.BinaryField(verbose_name="Contenido del Archivo")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', db_index=True, verbose_name="Estado")
+    worker = models.CharField(max_length=100, blank=True, null=True, verbose_name="Worker")
+    total_filas = models.PositiveIntegerField(blank=True, null=True, verbose_name="Total de Filas")
+    filas_procesadas = models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")
+    importados = models.PositiveIntegerField(default=0, verbose_name="Importados")
+    actualizados = models.PositiveIntegerField(default=0, verbose_name="Actualizados")
+    omitidos = models.PositiveIntegerField(default=0, verbose_name="Omitidos")
+    errores = models.PositiveIntegerField(default=0, verbose_name="Errores")
+    errores_detalle = models.JSONField(default=list, blank=True, verbose_name="Detalle de Errores")
+    mensaje = models.TextField(blank=True, null=True, verbose_name="Mensaje")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_inicio = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Inicio")
+    fecha_fin = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Fin")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
+
+    def __str__(self):
+        return f"Importación {self.pk} - {self.nombre_archivo} ({self.estado})"
+
+    @property
+    def terminado(self):
+        return self.estado in ('completado', 'fallido')
+
+    class Meta:
+        verbose_name = "Trabajo de Importación"
+        verbose_name_plural = "Trabajos de Importación"
+        ordering = ['fecha_creacion']
+
+
+class ValorSugerido(models.Model):
+    """Valores distintos de los campos de Activo con autocompletado (ver activos/sugerencias.py)."""
+    campo = models.CharField(max_length=50, verbose_name="Campo")
+    valor = models.CharField(max_length=200, verbose_name="Valor")
+    valor_normalizado = models.CharField(max_length=200, verbose_name="Valor Normalizado")
+
+    def __str__(self):
+        return f"{self.campo}: {self.valor}"
+
+    class Meta:
+        verbose_name = "Valor Sugerido"
+        verbose_name_plural = "Valores Sugeridos"
+        unique_together = ['campo', 'valor']
+        indexes = [models.Index(fields=['campo', 'valor_normalizado'], name='activos_sugerido_prefijo_idx')]
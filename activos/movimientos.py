@@ -0,0 +1,36 @@
+"""
+Datos de apoyo del listado de tranzabilidad.
+
+La lista de usuarios del filtro (los que tienen movimientos) se guarda en la
+caché de Django; se invalida cuando aparece un movimiento de un usuario que no
+estaba en ella. Los cambios de Historial de cada movimiento se cargan con
+prefetch_related('historiales') sobre el enlace Historial.movimiento.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import Tranzabilidad
+
+
+CLAVE_USUARIOS = 'tranzabilidad:usuarios'
+
+
+def usuarios_con_movimientos():
+    """[{'id', 'username'}] de los usuarios que tienen movimientos, desde la caché si existe."""
+    usuarios = cache.get(CLAVE_USUARIOS)
+    if usuarios is None:
+        usuarios = list(
+            get_user_model().objects.filter(
+                id__in=Tranzabilidad.objects.order_by().values('usuario_id').distinct()
+            ).order_by('username').values('id', 'username')
+        )
+        cache.set(CLAVE_USUARIOS, usuarios, settings.TRANZABILIDAD_USUARIOS_CACHE_SEGUNDOS)
+    return usuarios
+
+
+def registrar_usuario(usuario_id):
+    """Invalida la lista del filtro si el usuario todavía no estaba en ella."""
+    usuarios = cache.get(CLAVE_USUARIOS)
+    if usuarios is not None and all(usuario['id'] != usuario_id for usuario in usuarios):
+        cache.delete(CLAVE_USUARIOS)
@@ -0,0 +1,170 @@
+"""
+Paginación por cursor (keyset) para los listados de activos y de movimientos.
+
+En vez de OFFSET, cada página se pide a partir de la fila límite de la anterior
+(WHERE (fecha, id) < (...) ORDER BY fecha DESC, id DESC LIMIT n), así una página
+profunda cuesta lo mismo que la primera y las filas que se insertan mientras se
+navega no desplazan las páginas. El orden tiene que ser único (terminar en la
+llave primaria) y estar cubierto por un índice.
+
+El cursor viaja en ?cursor= como base64 de la dirección y los valores de la
+fila límite; los templates lo arman con query_transform, que conserva los
+filtros. El total exacto (COUNT(*)) solo se calcula con ?total=1.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+
+
+SIGUIENTE = 'n'
+ANTERIOR = 'p'
+
+
+def _nombre(campo):
+    return campo.lstrip('-')
+
+
+def _invertir(campo):
+    return _nombre(campo) if campo.startswith('-') else f'-{campo}'
+
+
+def _valor_cursor(valor):
+    # isoformat() conserva los microsegundos: DjangoJSONEncoder los recorta a milisegundos y
+    # las filas con la misma fecha hasta el milisegundo quedarían fuera de la página siguiente
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    return valor
+
+
+def codificar(direccion, valores):
+    datos = json.dumps([direccion, [_valor_cursor(valor) for valor in valores]], cls=DjangoJSONEncoder,
+                       separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar(cursor, modelo, nombres):
+    """(dirección, valores) del cursor, o None si no es válido (se muestra la primera página)."""
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direccion, valores = json.loads(datos)
+        if direccion not in (SIGUIENTE, ANTERIOR) or len(valores) != len(nombres):
+            return None
+        return direccion, [modelo._meta.get_field(nombre).to_python(valor)
+                           for nombre, valor in zip(nombres, valores)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+def filtro_despues(orden, valores):
+    """Q de las filas que van después de `valores` según el orden (p. ej. ('-fecha', '-id'))."""
+    filtro = Q()
+    for i, campo in enumerate(orden):
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion = Q(**{f'{_nombre(campo)}__{operador}': valores[i]})
+        for previo, valor in zip(orden[:i], valores[:i]):
+            condicion &= Q(**{_nombre(previo): valor})
+        filtro |= condicion
+    return filtro
+
+
+class PaginaCursor:
+    """Página con la misma interfaz que usan los templates de una Page de Django."""
+
+    def __init__(self, object_list, cursor_anterior=None, cursor_siguiente=None):
+        self.object_list = object_list
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+        # Lo completa la vista: None si no se contó
+        self.total = None
+        self.total_exacto = False
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginar(queryset, orden, cursor=None, tamano=20):
+    """PaginaCursor con hasta `tamano` filas del queryset a partir del cursor (una consulta)."""
+    nombres = [_nombre(campo) for campo in orden]
+    decodificado = decodificar(cursor, queryset.model, nombres) if cursor else None
+    direccion, valores = decodificado or (SIGUIENTE, None)
+
+    # Hacia atrás se recorre en el orden inverso y luego se da vuelta la página
+    recorrido = orden if direccion == SIGUIENTE else [_invertir(campo) for campo in orden]
+    filas = queryset.order_by(*recorrido)
+    if valores is not None:
+        filas = filas.filter(filtro_despues(recorrido, valores))
+    filas = list(filas[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    if not filas and valores is not None:
+        # El cursor quedó fuera de los resultados (filas borradas o filtros cambiados)
+        return paginar(queryset, orden, None, tamano)
+
+    if direccion == SIGUIENTE:
+        hay_siguiente, hay_anterior = hay_mas, valores is not None
+    else:
+        filas.reverse()
+        hay_siguiente, hay_anterior = True, hay_mas
+
+    def limite(fila, direccion_cursor):
+        return codificar(direccion_cursor, [getattr(fila, nombre) for nombre in nombres])
+
+    return PaginaCursor(
+        filas,
+        cursor_anterior=limite(filas[0], ANTERIOR) if hay_anterior else None,
+        cursor_siguiente=limite(filas[-1], SIGUIENTE) if hay_siguiente else None,
+    )
+
+
+def estimar_total(queryset):
+    """Filas aproximadas de la tabla sin filtros según las estadísticas de PostgreSQL; None si no hay."""
+    if queryset.query.has_filters() or connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                       [queryset.model._meta.db_table])
+        fila = cursor.fetchone()
+    # -1: la tabla todavía no tiene estadísticas (nunca se analizó)
+    return fila[0] if fila and fila[0] >= 0 else None
+
+
+class PaginacionCursorMixin:
+    """
+    Reemplaza el Paginator de ListView por paginar(). orden_cursor es el orden
+    del listado; page_obj es una PaginaCursor y page_obj.total el total exacto
+    (con ?total=1), estimado o None.
+    """
+    orden_cursor = ('-pk',)
+
+    def contar(self, queryset):
+        """(total, exacto) del listado sin hacer COUNT(*) salvo que se pida."""
+        if self.request.GET.get('total') == '1':
+            return queryset.count(), True
+        return estimar_total(queryset), False
+
+    def paginate_queryset(self, queryset, page_size):
+        pagina = paginar(queryset, self.orden_cursor, self.request.GET.get('cursor'), page_size)
+        pagina.total, pagina.total_exacto = self.contar(queryset)
+        return None, pagina, pagina.object_list, pagina.has_other_pages()
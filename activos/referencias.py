@@ -0,0 +1,113 @@
+"""
+Caché en memoria del proceso de las tablas de referencia: Zona, Categoria y Marca.
+
+Cambian unas pocas veces al mes pero se leen en cada formulario de Activo, en
+cada fila importada y en varios listados. referencias() devuelve una instancia
+de Referencias con las filas y los mapas por id y por nombre (sin distinguir
+mayúsculas), armada una sola vez por versión.
+
+La versión es un sello en la caché de Django que las señales de Zona,
+Categoria y Marca renuevan al confirmarse la escritura; cada llamada compara el
+sello (una lectura de la caché) con el de los datos del proceso y los vuelve a
+cargar si cambió. Con una caché que no se comparte entre procesos (LocMemCache)
+los demás workers se enteran a más tardar en REFERENCIAS_SEGUNDOS.
+
+Las instancias se comparten entre peticiones: se leen, no se modifican.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Categoria, Marca, Zona
+
+
+CLAVE_VERSION = 'referencias:version'
+
+_bloqueo = threading.Lock()
+_actuales = None
+
+
+def _clave_nombre(nombre):
+    return (nombre or '').strip().lower()
+
+
+class Referencias:
+    """Zonas, categorías y marcas de una versión con sus mapas de búsqueda."""
+
+    def __init__(self, version):
+        self.version = version
+        self.cargado_en = time.monotonic()
+
+        # Listas en el orden en que se muestran en los selects
+        self.zonas = list(Zona.objects.order_by('nombre'))
+        self.categorias = list(Categoria.objects.order_by('pk'))
+        self.marcas = list(Marca.objects.select_related('categoria').order_by('pk'))
+
+        self.zona_por_id = {zona.pk: zona for zona in self.zonas}
+        self.categoria_por_id = {categoria.pk: categoria for categoria in self.categorias}
+        self.marca_por_id = {marca.pk: marca for marca in self.marcas}
+
+        # Por nombre en minúsculas; si dos filas coinciden gana la más antigua
+        self.zona_por_nombre = {}
+        for zona in sorted(self.zonas, key=lambda zona: zona.pk):
+            self.zona_por_nombre.setdefault(_clave_nombre(zona.nombre), zona)
+        self.categoria_por_nombre = {}
+        for categoria in self.categorias:
+            self.categoria_por_nombre.setdefault(_clave_nombre(categoria.nombre), categoria)
+        self.marca_por_nombre = {}
+        self.marcas_por_categoria = {}
+        for marca in self.marcas:
+            self.marca_por_nombre.setdefault((_clave_nombre(marca.nombre), marca.categoria_id), marca)
+            self.marcas_por_categoria.setdefault(marca.categoria_id, []).append(marca)
+        self.nombres_marca = {nombre for nombre, _ in self.marca_por_nombre}
+
+    def zona(self, nombre):
+        """Zona con ese nombre (sin distinguir mayúsculas ni espacios) o None."""
+        return self.zona_por_nombre.get(_clave_nombre(nombre))
+
+    def categoria(self, nombre):
+        return self.categoria_por_nombre.get(_clave_nombre(nombre))
+
+    def marca(self, nombre, categoria_id):
+        return self.marca_por_nombre.get((_clave_nombre(nombre), categoria_id))
+
+    def nombre_zona(self, zona_id):
+        zona = self.zona_por_id.get(zona_id)
+        return zona.nombre if zona else None
+
+    def vencido(self):
+        return time.monotonic() - self.cargado_en > settings.REFERENCIAS_SEGUNDOS
+
+
+def _version():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Primera lectura (o la caché la descartó): gana el primer proceso que la escribe
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def referencias():
+    """Referencias vigentes del proceso; se recargan si cambió la versión o vencieron."""
+    global _actuales
+    version = _version()
+    actuales = _actuales
+    if actuales is not None and actuales.version == version and not actuales.vencido():
+        return actuales
+    with _bloqueo:
+        actuales = _actuales
+        if actuales is None or actuales.version != version or actuales.vencido():
+            actuales = Referencias(version)
+            _actuales = actuales
+    return actuales
+
+
+def invalidar_referencias():
+    """Renueva el sello de versión: todos los procesos recargan en su próxima lectura."""
+    global _actuales
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex, None)
+    _actuales = None
@@ -0,0 +1,401 @@
+"""
+Respaldo y restauración de los datos de usuarios y activos por streaming.
+
+respaldar() escribe un archivo JSONL por modelo (opcionalmente gzip) en orden
+de dependencias: cada línea es la lista de valores de una fila en el orden de
+las columnas del manifiesto (manifiesto.json, que se escribe al final). Las
+filas se leen con values_list().iterator(), sin armar instancias, dentro de
+una sola transacción para que el respaldo sea una foto consistente.
+
+restaurar() lee cada archivo línea a línea y lo inserta con bulk_create por
+lotes, una transacción por lote. Tras cada lote confirmado se actualiza un
+checkpoint, así una restauración interrumpida continúa donde quedó. Una fila
+con el mismo id que una existente la sobrescribe (las migraciones crean
+algunas categorías y marcas; repetir un lote no duplica nada). Con vaciar=True
+se borran antes las tablas del respaldo. La memoria depende del tamaño del
+lote, no de la base. bulk_create pone la hora actual en los campos auto_now y
+auto_now_add: en la misma transacción se reponen las fechas del respaldo con
+bulk_update, que no los toca.
+
+Las tablas intermedias de los ManyToMany de usuarios (grupos y permisos)
+apuntan a tablas que no se respaldan: esas columnas se guardan con la llave
+natural (codename, app, modelo) y se resuelven contra la base de destino.
+"""
+import base64
+import datetime
+import decimal
+import gzip
+import itertools
+import json
+import os
+import uuid
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.duration import duration_iso_string
+
+from .archivo import borrar_sin_senales
+from .estadisticas import invalidar_dashboards
+from .indice import indice
+from .movimientos import CLAVE_USUARIOS
+from .referencias import invalidar_referencias
+
+
+APPS = ('usuarios', 'activos')
+MANIFIESTO = 'manifiesto.json'
+CHECKPOINT = 'restauracion.checkpoint.json'
+VERSION = 1
+
+# Filas por lote: por transacción al restaurar y por lectura al respaldar
+TAMANO_LOTE = 2000
+
+# Filas por UPDATE al reponer las fechas automáticas (un CASE por columna)
+LOTE_FECHAS = 500
+
+# Tipos que JSON no representa: se guardan como texto y al restaurar los convierte field.to_python()
+TIPOS_CONVERTIDOS = {'DateTimeField', 'DateField', 'TimeField', 'DecimalField', 'UUIDField', 'DurationField',
+                     'BinaryField'}
+
+
+class RespaldoInvalido(Exception):
+    """El directorio no tiene un respaldo que se pueda restaurar en esta base."""
+
+
+def dependencias(modelo, incluidos):
+    """Modelos de `incluidos` a los que apunta `modelo` (sin contarse a sí mismo)."""
+    return {campo.related_model for campo in modelo._meta.concrete_fields
+            if campo.is_relation and campo.related_model in incluidos and campo.related_model is not modelo}
+
+
+def modelos_respaldo():
+    """Modelos de APPS (con las tablas intermedias de sus ManyToMany) en orden de dependencias."""
+    modelos = []
+    for app_label in APPS:
+        for modelo in apps.get_app_config(app_label).get_models():
+            if modelo._meta.proxy or not modelo._meta.managed:
+                continue
+            modelos.append(modelo)
+            for campo in modelo._meta.local_many_to_many:
+                if campo.remote_field.through._meta.auto_created:
+                    modelos.append(campo.remote_field.through)
+
+    incluidos = set(modelos)
+    ordenados = []
+    pendientes = list(modelos)
+    while pendientes:
+        listos = [modelo for modelo in pendientes if dependencias(modelo, incluidos) <= set(ordenados)]
+        if not listos:
+            raise RespaldoInvalido('Dependencias circulares entre: '
+                                   + ', '.join(modelo._meta.label for modelo in pendientes))
+        ordenados.extend(listos)
+        pendientes = [modelo for modelo in pendientes if modelo not in listos]
+    return ordenados
+
+
+def columnas(modelo):
+    return [campo.attname for campo in modelo._meta.concrete_fields]
+
+
+def _externas(modelo, incluidos):
+    """Columnas que apuntan a modelos fuera del respaldo con llave natural: {attname: modelo}."""
+    return {campo.attname: campo.related_model for campo in modelo._meta.concrete_fields
+            if campo.is_relation and campo.related_model not in incluidos
+            and hasattr(campo.related_model, 'natural_key')}
+
+
+def _abrir(ruta, modo):
+    if ruta.endswith('.gz'):
+        return gzip.open(ruta, modo + 't', encoding='utf-8', compresslevel=6)
+    return open(ruta, modo, encoding='utf-8', newline='\n')
+
+
+def _a_json(valor):
+    # A diferencia de DjangoJSONEncoder, conserva los microsegundos
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, datetime.timedelta):
+        return duration_iso_string(valor)
+    if isinstance(valor, (decimal.Decimal, uuid.UUID)):
+        return str(valor)
+    if isinstance(valor, (bytes, memoryview)):
+        return base64.b64encode(bytes(valor)).decode('ascii')
+    raise TypeError(f'{type(valor).__name__} no se puede respaldar')
+
+
+def _escribir_json(ruta, datos):
+    # Archivo temporal y reemplazo: nunca queda un JSON a medio escribir
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+# --- Respaldo ---------------------------------------------------------------
+
+def _respaldar_modelo(modelo, directorio, comprimir, incluidos, tamano_lote, al_avanzar):
+    etiqueta = modelo._meta.label_lower
+    nombres = columnas(modelo)
+    externas = _externas(modelo, incluidos)
+    # Tablas chicas (permisos, grupos): se cargan enteras para traducir id -> llave natural
+    traducciones = [
+        (nombres.index(columna), {objeto.pk: list(objeto.natural_key()) for objeto in relacionado._default_manager.all()})
+        for columna, relacionado in externas.items()
+    ]
+    archivo = f'{etiqueta}.jsonl' + ('.gz' if comprimir else '')
+    total = modelo._base_manager.count()
+
+    filas = 0
+    with _abrir(os.path.join(directorio, archivo), 'w') as salida:
+        consulta = modelo._base_manager.order_by('pk').values_list(*nombres)
+        for valores in consulta.iterator(chunk_size=tamano_lote):
+            if traducciones:
+                valores = list(valores)
+                for posicion, traduccion in traducciones:
+                    if valores[posicion] is not None:
+                        valores[posicion] = traduccion[valores[posicion]]
+            salida.write(json.dumps(valores, default=_a_json, ensure_ascii=False, separators=(',', ':')))
+            salida.write('\n')
+            filas += 1
+            if al_avanzar and filas % tamano_lote == 0:
+                al_avanzar(etiqueta, filas, total)
+    if al_avanzar:
+        al_avanzar(etiqueta, filas, filas)
+
+    return {
+        'modelo': etiqueta,
+        'archivo': archivo,
+        'columnas': nombres,
+        'filas': filas,
+        'externas': {columna: relacionado._meta.label_lower for columna, relacionado in externas.items()},
+    }
+
+
+def respaldar(directorio, comprimir=False, tamano_lote=TAMANO_LOTE, al_avanzar=None):
+    """
+    Escribe el respaldo en `directorio` y devuelve el manifiesto.
+    al_avanzar(modelo, filas, total) se llama cada `tamano_lote` filas.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    modelos = modelos_respaldo()
+    incluidos = set(modelos)
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Todas las tablas desde la misma foto, aunque la aplicación siga escribiendo
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        entradas = [_respaldar_modelo(modelo, directorio, comprimir, incluidos, tamano_lote, al_avanzar)
+                    for modelo in modelos]
+
+    manifiesto = {
+        'version': VERSION,
+        'fecha': timezone.now().isoformat(),
+        'motor': connection.vendor,
+        'modelos': entradas,
+    }
+    _escribir_json(os.path.join(directorio, MANIFIESTO), manifiesto)
+    return manifiesto
+
+
+# --- Restauración -----------------------------------------------------------
+
+def leer_manifiesto(directorio):
+    ruta = os.path.join(directorio, MANIFIESTO)
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+    except FileNotFoundError:
+        raise RespaldoInvalido(f'No existe {ruta}: el respaldo no está completo.')
+    if manifiesto.get('version') != VERSION:
+        raise RespaldoInvalido(f"Versión de respaldo no soportada: {manifiesto.get('version')!r}.")
+    return manifiesto
+
+
+def leer_checkpoint(ruta, manifiesto):
+    """Filas ya restauradas por modelo; vacío si no hay checkpoint o es de otro respaldo."""
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+    except FileNotFoundError:
+        return {}
+    if datos.get('respaldo') != manifiesto['fecha']:
+        return {}
+    return datos['filas']
+
+
+def guardar_checkpoint(ruta, manifiesto, progreso):
+    _escribir_json(ruta, {'respaldo': manifiesto['fecha'], 'filas': progreso})
+
+
+def modelo_de(entrada):
+    """Modelo de una entrada del manifiesto, validando que sus columnas existan en esta base."""
+    try:
+        modelo = apps.get_model(entrada['modelo'])
+    except LookupError:
+        raise RespaldoInvalido(f"El modelo {entrada['modelo']} no existe en esta versión de la aplicación.")
+    faltantes = set(entrada['columnas']) - set(columnas(modelo))
+    if faltantes:
+        raise RespaldoInvalido(
+            f"{entrada['modelo']}: columnas {', '.join(sorted(faltantes))} del respaldo no existen; "
+            'aplique las mismas migraciones que la base de origen.'
+        )
+    return modelo
+
+
+def campos_automaticos(modelo):
+    """Campos con auto_now/auto_now_add: bulk_create les pone la hora actual."""
+    return [campo for campo in modelo._meta.concrete_fields
+            if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)]
+
+
+def _reponer_fechas(modelo, lote, fechas):
+    """
+    Vuelve a poner las fechas del respaldo (`fechas`, una lista por objeto) en
+    los campos automáticos. bulk_update no aplica auto_now.
+    """
+    campos = campos_automaticos(modelo)
+    for objeto, valores in zip(lote, fechas):
+        for campo, valor in zip(campos, valores):
+            setattr(objeto, campo.attname, valor)
+    modelo._base_manager.bulk_update(lote, [campo.name for campo in campos], batch_size=LOTE_FECHAS)
+
+
+def filas_respaldo(directorio, entrada, modelo, desde=0):
+    """
+    Genera las filas del archivo de una entrada como listas de valores ya
+    convertidos a Python, a partir de la fila `desde`.
+    """
+    campos = {campo.attname: campo for campo in modelo._meta.concrete_fields}
+    convertidores = [(posicion, campos[columna].to_python) for posicion, columna in enumerate(entrada['columnas'])
+                     if campos[columna].get_internal_type() in TIPOS_CONVERTIDOS]
+
+    resolver = []
+    for columna, etiqueta in entrada.get('externas', {}).items():
+        relacionado = apps.get_model(etiqueta)
+        cache_llaves = {}
+
+        def por_llave(llave, relacionado=relacionado, cache_llaves=cache_llaves):
+            llave = tuple(llave)
+            if llave not in cache_llaves:
+                try:
+                    cache_llaves[llave] = relacionado._default_manager.get_by_natural_key(*llave).pk
+                except relacionado.DoesNotExist:
+                    raise RespaldoInvalido(f'{relacionado._meta.label} {llave} no existe en esta base.')
+            return cache_llaves[llave]
+
+        resolver.append((entrada['columnas'].index(columna), por_llave))
+
+    with _abrir(os.path.join(directorio, entrada['archivo']), 'r') as archivo:
+        for linea in itertools.islice(archivo, desde, None):
+            valores = json.loads(linea)
+            for posicion, convertir in convertidores:
+                if valores[posicion] is not None:
+                    valores[posicion] = convertir(valores[posicion])
+            for posicion, convertir in resolver:
+                if valores[posicion] is not None:
+                    valores[posicion] = convertir(valores[posicion])
+            yield valores
+
+
+def restaurar_modelo(directorio, entrada, desde=0, tamano_lote=TAMANO_LOTE, al_confirmar=None):
+    """
+    Inserta las filas de una entrada del manifiesto a partir de la fila
+    `desde`, una transacción por lote. al_confirmar(filas) se llama tras cada
+    lote confirmado con el total de filas restauradas del modelo.
+    """
+    modelo = modelo_de(entrada)
+    nombres = entrada['columnas']
+    campos = {campo.attname: campo.name for campo in modelo._meta.concrete_fields}
+    pk = modelo._meta.pk
+    actualizables = [campos[columna] for columna in nombres if columna != pk.attname]
+    if actualizables:
+        conflictos = {'update_conflicts': True, 'unique_fields': [pk.name], 'update_fields': actualizables}
+    else:
+        conflictos = {'ignore_conflicts': True}
+    automaticos = [campo.attname for campo in campos_automaticos(modelo)]
+    hechas = desde
+    lote = []
+
+    def insertar():
+        # bulk_create reemplaza las fechas automáticas por la hora actual: se guardan antes
+        fechas = [[getattr(objeto, campo) for campo in automaticos] for objeto in lote]
+        with transaction.atomic():
+            modelo._base_manager.bulk_create(lote, batch_size=tamano_lote, **conflictos)
+            if automaticos:
+                _reponer_fechas(modelo, lote, fechas)
+        if al_confirmar:
+            al_confirmar(hechas)
+
+    for valores in filas_respaldo(directorio, entrada, modelo, desde):
+        lote.append(modelo(**dict(zip(nombres, valores))))
+        if len(lote) >= tamano_lote:
+            hechas += len(lote)
+            insertar()
+            lote = []
+    if lote:
+        hechas += len(lote)
+        insertar()
+    return hechas
+
+
+def reiniciar_secuencias(modelos):
+    """Ajusta las secuencias de ids (PostgreSQL) al máximo restaurado; en SQLite no hace nada."""
+    sentencias = connection.ops.sequence_reset_sql(no_style(), modelos)
+    with connection.cursor() as cursor:
+        for sentencia in sentencias:
+            cursor.execute(sentencia)
+
+
+def terminar_restauracion(modelos, ruta_checkpoint):
+    """
+    Ajusta las secuencias, vence las cachés (bulk_create no dispara señales) y
+    borra el checkpoint.
+    """
+    reiniciar_secuencias(modelos)
+    invalidar_referencias()
+    invalidar_dashboards()
+    indice.invalidar()
+    cache.delete(CLAVE_USUARIOS)
+    if os.path.exists(ruta_checkpoint):
+        os.remove(ruta_checkpoint)
+
+
+def vaciar_tablas(modelos):
+    """Borra las filas de los modelos, de los dependientes a los independientes."""
+    with transaction.atomic():
+        for modelo in reversed(modelos):
+            borrar_sin_senales(modelo._base_manager.all())
+
+
+def restaurar(directorio, tamano_lote=TAMANO_LOTE, checkpoint=None, reiniciar=False, vaciar=False, al_avanzar=None):
+    """
+    Restaura el respaldo de `directorio` continuando desde el checkpoint (salvo
+    reiniciar=True). Con vaciar=True, si no hay una restauración a medias, borra
+    antes las tablas del respaldo. Devuelve {modelo: filas restauradas}.
+    al_avanzar(modelo, filas, total) se llama tras cada lote confirmado.
+    """
+    manifiesto = leer_manifiesto(directorio)
+    ruta_checkpoint = checkpoint or os.path.join(directorio, CHECKPOINT)
+    progreso = {} if reiniciar else leer_checkpoint(ruta_checkpoint, manifiesto)
+    modelos = [modelo_de(entrada) for entrada in manifiesto['modelos']]
+    if vaciar and not progreso:
+        vaciar_tablas(modelos)
+
+    for entrada in manifiesto['modelos']:
+        etiqueta, total = entrada['modelo'], entrada['filas']
+        if progreso.get(etiqueta, 0) >= total:
+            continue
+
+        def al_confirmar(filas, etiqueta=etiqueta, total=total):
+            progreso[etiqueta] = filas
+            guardar_checkpoint(ruta_checkpoint, manifiesto, progreso)
+            if al_avanzar:
+                al_avanzar(etiqueta, filas, total)
+
+        progreso[etiqueta] = restaurar_modelo(directorio, entrada, progreso.get(etiqueta, 0), tamano_lote,
+                                              al_confirmar)
+
+    terminar_restauracion(modelos, ruta_checkpoint)
+    return progreso
@@ -0,0 +1,204 @@
+"""
+Restauración rápida de un respaldo de activos/respaldo.py.
+
+En dos fases:
+
+1. Las tablas que no apuntan a otras del respaldo (usuarios, Zona, Categoria,
+   ValorSugerido) se cargan a la vez, una por proceso, con las inserciones por
+   lotes de restaurar_modelo().
+2. El resto (Marca, Activo, Tranzabilidad, Historial, archivo, ...) en orden de
+   dependencias. En PostgreSQL con COPY, una transacción por tabla con las
+   restricciones diferidas: directo a la tabla si está vacía o, si no, a una
+   tabla temporal y de ahí con INSERT ... ON CONFLICT para sobrescribir los
+   mismos ids. En SQLite, con inserciones por lotes y la verificación de
+   llaves foráneas desactivada, como loaddata; se verifica al final.
+
+SQLite admite un solo escritor a la vez, así que ahí la primera fase también
+es secuencial. El checkpoint se guarda por tabla terminada (y por lote en las
+inserciones secuenciales): una tabla cargada con COPY se confirma entera o no
+se confirma.
+"""
+import json
+import multiprocessing
+import os
+
+import django
+from django.db import connection, transaction
+from django.utils.duration import duration_iso_string
+
+from .respaldo import (CHECKPOINT, TAMANO_LOTE, dependencias, filas_respaldo, guardar_checkpoint, leer_checkpoint,
+                       leer_manifiesto, modelo_de, restaurar_modelo, terminar_restauracion, vaciar_tablas)
+
+
+PROCESOS = 4
+
+# Bytes por lectura que COPY pide al flujo
+TAMANO_BLOQUE = 1 << 16
+
+
+def _restaurar_en_proceso(argumentos):
+    directorio, entrada, desde, tamano_lote = argumentos
+    filas = restaurar_modelo(directorio, entrada, desde, tamano_lote)
+    connection.close()
+    return entrada['modelo'], filas
+
+
+# --- COPY (PostgreSQL) ----------------------------------------------------------
+
+def _formateador(campo):
+    """Valor de Python -> texto que entiende COPY en formato CSV."""
+    tipo = campo.get_internal_type()
+    if tipo == 'JSONField':
+        return lambda valor: json.dumps(valor, ensure_ascii=False)
+    if tipo == 'BinaryField':
+        return lambda valor: '\\x' + bytes(valor).hex()
+    if tipo == 'BooleanField':
+        return lambda valor: 't' if valor else 'f'
+    if tipo == 'DurationField':
+        return duration_iso_string
+    if tipo in ('DateTimeField', 'DateField', 'TimeField'):
+        return lambda valor: valor.isoformat()
+    return str
+
+
+def _lineas_csv(filas, formateadores):
+    # NULL es el campo vacío sin comillas; todo lo demás va entre comillas (así '' no es NULL)
+    for valores in filas:
+        campos = []
+        for valor, formatear in zip(valores, formateadores):
+            if valor is None:
+                campos.append('')
+            else:
+                campos.append('"' + formatear(valor).replace('"', '""') + '"')
+        yield ','.join(campos) + '\n'
+
+
+class _Flujo:
+    """Archivo de solo lectura sobre un generador de líneas, para copy_expert."""
+
+    def __init__(self, lineas):
+        self._lineas = lineas
+        self._pendiente = b''
+        self.filas = 0
+
+    def read(self, tamano=TAMANO_BLOQUE):
+        partes = [self._pendiente]
+        largo = len(self._pendiente)
+        while tamano < 0 or largo < tamano:
+            linea = next(self._lineas, None)
+            if linea is None:
+                break
+            self.filas += 1
+            parte = linea.encode('utf-8')
+            partes.append(parte)
+            largo += len(parte)
+        datos = b''.join(partes)
+        if tamano < 0:
+            self._pendiente = b''
+            return datos
+        self._pendiente = datos[tamano:]
+        return datos[:tamano]
+
+
+def _copiar(cursor, sql, flujo):
+    if hasattr(cursor, 'copy_expert'):
+        # psycopg2
+        cursor.copy_expert(sql, flujo, size=TAMANO_BLOQUE)
+    else:
+        # psycopg 3
+        with cursor.copy(sql) as copia:
+            while datos := flujo.read(TAMANO_BLOQUE):
+                copia.write(datos)
+
+
+def copiar_modelo(directorio, entrada, desde=0):
+    """Carga con COPY las filas de una entrada a partir de `desde`. Devuelve las filas del modelo."""
+    modelo = modelo_de(entrada)
+    campos = {campo.attname: campo for campo in modelo._meta.concrete_fields}
+    seleccion = [campos[columna] for columna in entrada['columnas']]
+    quote = connection.ops.quote_name
+    tabla = quote(modelo._meta.db_table)
+    lista_columnas = ', '.join(quote(campo.column) for campo in seleccion)
+    flujo = _Flujo(_lineas_csv(filas_respaldo(directorio, entrada, modelo, desde),
+                               [_formateador(campo) for campo in seleccion]))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Las llaves foráneas de Django son DEFERRABLE: se verifican una vez, al confirmar
+        cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+        # Si el servidor cae antes de escribir el WAL, la tabla se vuelve a cargar
+        cursor.execute('SET LOCAL synchronous_commit = off')
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {tabla})')
+        if not cursor.fetchone()[0]:
+            _copiar(cursor, f'COPY {tabla} ({lista_columnas}) FROM STDIN WITH (FORMAT csv)', flujo)
+        else:
+            temporal = quote('restauracion_' + modelo._meta.db_table)
+            pk = quote(modelo._meta.pk.column)
+            cursor.execute(f'CREATE TEMPORARY TABLE {temporal} (LIKE {tabla} INCLUDING DEFAULTS) ON COMMIT DROP')
+            _copiar(cursor, f'COPY {temporal} ({lista_columnas}) FROM STDIN WITH (FORMAT csv)', flujo)
+            actualizar = ', '.join(f'{quote(campo.column)} = EXCLUDED.{quote(campo.column)}'
+                                   for campo in seleccion if not campo.primary_key)
+            conflicto = f'DO UPDATE SET {actualizar}' if actualizar else 'DO NOTHING'
+            cursor.execute(f'INSERT INTO {tabla} ({lista_columnas}) SELECT {lista_columnas} FROM {temporal} '
+                           f'ON CONFLICT ({pk}) {conflicto}')
+    return desde + flujo.filas
+
+
+# --- Restauración --------------------------------------------------------------
+
+def restaurar_paralelo(directorio, procesos=PROCESOS, tamano_lote=TAMANO_LOTE, checkpoint=None, reiniciar=False,
+                       vaciar=False, al_avanzar=None):
+    """
+    Igual que respaldo.restaurar() pero en dos fases (ver el docstring del
+    módulo). al_avanzar(modelo, filas, total) se llama al terminar cada tabla y,
+    en las inserciones secuenciales, tras cada lote.
+    """
+    manifiesto = leer_manifiesto(directorio)
+    ruta_checkpoint = checkpoint or os.path.join(directorio, CHECKPOINT)
+    progreso = {} if reiniciar else leer_checkpoint(ruta_checkpoint, manifiesto)
+    modelos = [modelo_de(entrada) for entrada in manifiesto['modelos']]
+    if vaciar and not progreso:
+        vaciar_tablas(modelos)
+
+    incluidos = set(modelos)
+    pendientes = [(entrada, modelo) for entrada, modelo in zip(manifiesto['modelos'], modelos)
+                  if progreso.get(entrada['modelo'], 0) < entrada['filas']]
+    independientes = [entrada for entrada, modelo in pendientes if not dependencias(modelo, incluidos)]
+    dependientes = [entrada for entrada, modelo in pendientes if dependencias(modelo, incluidos)]
+    totales = {entrada['modelo']: entrada['filas'] for entrada in manifiesto['modelos']}
+    postgresql = connection.vendor == 'postgresql'
+
+    def avanzar(etiqueta, filas):
+        progreso[etiqueta] = filas
+        guardar_checkpoint(ruta_checkpoint, manifiesto, progreso)
+        if al_avanzar:
+            al_avanzar(etiqueta, filas, totales[etiqueta])
+
+    def por_lotes(entrada):
+        return restaurar_modelo(directorio, entrada, progreso.get(entrada['modelo'], 0), tamano_lote,
+                                lambda filas: avanzar(entrada['modelo'], filas))
+
+    # Fase 1: tablas independientes, una por proceso
+    if postgresql and procesos > 1 and len(independientes) > 1:
+        trabajos = [(directorio, entrada, progreso.get(entrada['modelo'], 0), tamano_lote) for entrada in independientes]
+        # spawn: cada proceso arranca Django y abre su propia conexión
+        contexto = multiprocessing.get_context('spawn')
+        with contexto.Pool(min(procesos, len(trabajos)), initializer=django.setup) as pool:
+            for etiqueta, filas in pool.imap_unordered(_restaurar_en_proceso, trabajos):
+                avanzar(etiqueta, filas)
+    else:
+        for entrada in independientes:
+            por_lotes(entrada)
+
+    # Fase 2: tablas con llaves foráneas, en orden de dependencias
+    with connection.constraint_checks_disabled():
+        for entrada in dependientes:
+            if postgresql:
+                avanzar(entrada['modelo'], copiar_modelo(directorio, entrada, progreso.get(entrada['modelo'], 0)))
+            else:
+                por_lotes(entrada)
+    if not postgresql:
+        # Con la verificación desactivada nada se comprobó al insertar (en PostgreSQL lo hizo cada COMMIT)
+        connection.check_constraints(table_names=[modelo._meta.db_table for modelo in modelos])
+
+    terminar_restauracion(modelos, ruta_checkpoint)
+    return progreso
@@ -0,0 +1,102 @@
+"""
+Resumen materializado del inventario (InventarioResumen).
+
+Guarda cuántos activos hay por (zona, categoría, marca, estado, operador,
+con_persona) para que dashboards y reportes lean decenas de filas en vez de
+recorrer toda la tabla de activos. Se ajusta en la misma transacción que la
+escritura: Activo.save(), la señal post_delete de Activo y la importación
+masiva. El comando resumen_inventario lo reconstruye y verifica el desfase.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q
+
+from .models import Activo, InventarioResumen
+
+
+CAMPOS_CLAVE = ('zona_id', 'categoria_id', 'marca_id', 'estado', 'operador', 'con_persona')
+
+CON_PERSONA = ExpressionWrapper(
+    Q(nombres_apellidos__isnull=False) & ~Q(nombres_apellidos=''),
+    output_field=BooleanField()
+)
+
+
+def clave(activo):
+    return (activo.zona_id, activo.categoria_id, activo.marca_id, activo.estado, activo.operador,
+            bool(activo.nombres_apellidos))
+
+
+def clave_guardada(pk):
+    """Clave del activo tal como está en la base de datos (None si no existe)."""
+    fila = Activo.objects.filter(pk=pk).annotate(con_persona=CON_PERSONA).values_list(*CAMPOS_CLAVE).first()
+    return tuple(fila) if fila else None
+
+
+def aplicar(deltas):
+    """Suma {clave: cantidad} al resumen. Debe llamarse dentro de la transacción de la escritura."""
+    for clave_resumen, cantidad in deltas.items():
+        if not cantidad:
+            continue
+        filtro = dict(zip(CAMPOS_CLAVE, clave_resumen))
+        pk = InventarioResumen.objects.filter(**filtro).order_by('pk').values_list('pk', flat=True).first()
+        if pk is None or not InventarioResumen.objects.filter(pk=pk).update(total=F('total') + cantidad):
+            InventarioResumen.objects.create(total=cantidad, **filtro)
+
+
+def mover(anterior, activo):
+    """Pasa el activo de la clave anterior (None si es nuevo) a la actual."""
+    actual = clave(activo)
+    if anterior == actual:
+        return
+    deltas = Counter({actual: 1})
+    if anterior is not None:
+        deltas[anterior] -= 1
+    aplicar(deltas)
+
+
+def conteo_real():
+    """{clave: total} calculado directamente sobre la tabla de activos."""
+    filas = Activo.objects.annotate(con_persona=CON_PERSONA).values_list(*CAMPOS_CLAVE).annotate(
+        total=Count('item')
+    ).order_by()
+    conteo = Counter()
+    for *clave_resumen, total in filas:
+        conteo[tuple(clave_resumen)] += total
+    return conteo
+
+
+def conteo_resumen():
+    """{clave: total} según InventarioResumen (las filas repetidas se suman, los ceros se omiten)."""
+    conteo = Counter()
+    for *clave_resumen, total in InventarioResumen.objects.values_list(*CAMPOS_CLAVE, 'total'):
+        conteo[tuple(clave_resumen)] += total
+    return Counter({c: total for c, total in conteo.items() if total})
+
+
+def diferencias():
+    """Lista de (clave, total_real, total_resumen) donde el resumen no coincide."""
+    real = conteo_real()
+    resumen = conteo_resumen()
+    return [
+        (c, real[c], resumen[c])
+        for c in sorted(set(real) | set(resumen), key=str)
+        if real[c] != resumen[c]
+    ]
+
+
+@transaction.atomic
+def reconstruir():
+    """Recalcula el resumen desde cero. Devuelve la cantidad de filas creadas."""
+    if connection.vendor == 'postgresql':
+        # Las escrituras concurrentes esperan a que termine y luego aplican su delta sobre las filas nuevas
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {InventarioResumen._meta.db_table} IN ACCESS EXCLUSIVE MODE')
+    InventarioResumen.objects.all().delete()
+    filas = [
+        InventarioResumen(total=total, **dict(zip(CAMPOS_CLAVE, clave_resumen)))
+        for clave_resumen, total in conteo_real().items()
+    ]
+    InventarioResumen.objects.bulk_create(filas)
+    return len(filas)
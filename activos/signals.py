@@ -0,0 +1,99 @@
+"""
+Señales de la app activos.
+
+Cualquier escritura sobre Activo o Tranzabilidad invalida los snapshots de los
+dashboards al confirmarse la transacción (si no hay transacción, de inmediato).
+Las rutas masivas que no disparan señales (bulk_create/bulk_update) llaman a
+invalidar_dashboards() por su cuenta.
+
+Al borrar un Activo (también desde un queryset) se descuenta de InventarioResumen
+dentro de la misma transacción.
+
+Las zonas, categorías y marcas en memoria (activos/referencias.py, de donde
+salen también las marcas por categoría del formulario) se recargan al escribir
+una Zona, una Categoría o una Marca, y los valores nuevos de los campos con
+sugerencias (activos/sugerencias.py) se registran al guardar un Activo.
+
+La lista de usuarios del filtro de tranzabilidad (activos/movimientos.py) se
+invalida cuando un usuario registra su primer movimiento o cambia su usuario.
+
+El índice de búsqueda en memoria (activos/indice.py) se arma con la primera
+petición del worker y se actualiza con cada escritura confirmada.
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .estadisticas import invalidar_dashboards
+from .indice import indice
+from .movimientos import CLAVE_USUARIOS, registrar_usuario
+from .models import Activo, Categoria, Marca, Tranzabilidad, Zona
+from .referencias import invalidar_referencias
+from .resumen import clave, aplicar
+from .sugerencias import registrar
+
+
+@receiver(post_save, sender=Activo)
+@receiver(post_delete, sender=Activo)
+@receiver(post_save, sender=Tranzabilidad)
+@receiver(post_delete, sender=Tranzabilidad)
+def invalidar_snapshots(sender, **kwargs):
+    transaction.on_commit(invalidar_dashboards)
+
+
+@receiver(post_save, sender=Zona)
+@receiver(post_delete, sender=Zona)
+@receiver(post_save, sender=Marca)
+@receiver(post_delete, sender=Marca)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def renovar_referencias(sender, **kwargs):
+    transaction.on_commit(invalidar_referencias)
+
+
+@receiver(post_save, sender=Tranzabilidad)
+def registrar_usuario_movimiento(sender, instance, created, **kwargs):
+    if created and instance.usuario_id:
+        usuario_id = instance.usuario_id
+        transaction.on_commit(lambda: registrar_usuario(usuario_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidar_usuarios_movimientos(sender, update_fields=None, **kwargs):
+    # El inicio de sesión solo actualiza last_login
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(lambda: cache.delete(CLAVE_USUARIOS))
+
+
+@receiver(post_save, sender=Activo)
+def registrar_sugerencias(sender, instance, **kwargs):
+    registrar([instance])
+
+
+@receiver(post_delete, sender=Activo)
+def descontar_del_resumen(sender, instance, **kwargs):
+    aplicar({clave(instance): -1})
+
+
+@receiver(post_save, sender=Activo)
+def actualizar_indice(sender, instance, **kwargs):
+    pk, registro = instance.pk, indice.registro(instance)
+    transaction.on_commit(lambda: indice.actualizar(pk, registro))
+
+
+@receiver(post_delete, sender=Activo)
+def quitar_del_indice(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: indice.quitar(pk))
+
+
+@receiver(request_started, dispatch_uid='activos_iniciar_indice')
+def iniciar_indice(sender, **kwargs):
+    # Solo la primera petición del worker; luego el índice se mantiene solo
+    request_started.disconnect(dispatch_uid='activos_iniciar_indice')
+    indice.iniciar()
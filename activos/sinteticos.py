@@ -0,0 +1,324 @@
+"""
+Inventarios sintéticos para pruebas de carga y benchmarks.
+
+Generador crea activos con datos verosímiles (seriales, IMEI con dígito de
+control, ICCID con el prefijo de cada operador para que detectar_operador los
+reconozca, asignaciones a personas, estados) y su historia: un ingreso por
+activo más eventos de Tranzabilidad con sus cambios de Historial enlazados.
+Todo se escribe con bulk_create por lotes, una transacción por lote.
+
+Cada lote tiene su propio generador aleatorio (semilla y posición), así que
+los lotes se pueden escribir en varios procesos. Con la misma semilla, la
+misma fecha `hasta` y las mismas tablas de referencia el contenido es
+idéntico; con varios procesos solo cambia el orden de los ids. Como bulk_create no dispara señales, al
+terminar hay que llamar a despues_de_generar() (resumen, sugerencias, índice
+de búsqueda y cachés).
+"""
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .estadisticas import invalidar_dashboards
+from .indice import indice
+from .models import (Activo, Categoria, Historial, Marca, Tranzabilidad, Zona, ESTADO_ASIGNADO, ESTADO_BAJA,
+                     ESTADO_CONFIRMADO)
+from .movimientos import CLAVE_USUARIOS
+from .referencias import invalidar_referencias
+from .resumen import reconstruir as reconstruir_resumen
+from .sugerencias import reconstruir as reconstruir_sugerencias
+
+
+# Activos por lote (cada lote es una transacción)
+TAMANO_LOTE = 5000
+# Filas por INSERT (el backend lo reduce si pasa su límite de parámetros)
+TAMANO_INSERT = 1000
+
+ZONAS = (
+    'Valledupar', 'AGUACHICA MORROCOY', 'BOSCONIA', 'CHIMICHAGUA', 'CODAZZI', 'CURUMANI',
+    'EL COPEY', 'LA JAGUA', 'PAILITAS', 'SAN ALBERTO', 'VALLEDUPAR PRINCIPAL', 'VALLEDUPAR TERMINAL 2',
+)
+
+CATEGORIAS = {
+    'MAQUINA': ('MAQUINA SUNMI V2', 'MAQUINA SUNMI V2 PRO', 'MAQUINA NEWLAND N910', 'MAQUINA NEWLAND SP830',
+                'MAQUINA SMART POST CS10'),
+    'Televisores': ('LG', 'SAMSUNG', 'KALLEY'),
+}
+
+# Categorías cuyos equipos llevan IMEI y SIM
+CATEGORIAS_CON_SIM = {'MAQUINA'}
+
+# Prefijos que reconoce Activo.detectar_operador, con el peso de cada operador
+PREFIJOS_ICCID = {'Tigo': '89577', 'Claro': '57101', 'Movistar': '8957'}
+PESOS_OPERADOR = {'Tigo': 45, 'Claro': 35, 'Movistar': 20}
+
+# Primeros 8 dígitos (TAC) de los IMEI
+TACS = ('35845210', '86753104', '35328711', '86991203')
+
+NOMBRES = ('Carlos', 'María', 'Luis', 'Ana', 'Jorge', 'Diana', 'Andrés', 'Paola', 'Jesús', 'Yesenia')
+APELLIDOS = ('Pérez', 'Gómez', 'Rodríguez', 'Martínez', 'Quintero', 'Mendoza', 'Ospino', 'Maestre', 'Araújo')
+CARGOS = ('vendedor ambulante', 'recaudador', 'vendedor tat', 'administrativos')
+
+# Eventos después del ingreso; los dos últimos dejan cambios en Historial
+TIPOS_EVENTO = ('transferencia', 'asignacion', 'actualizacion', 'cambio_estado')
+CAMPOS_HISTORIAL = ('responsable', 'punto_venta', 'observacion', 'centro_costo_punto')
+
+
+def serial(semilla, posicion):
+    """Serial del activo generado en esa posición con esa semilla."""
+    return f'SNT{semilla % 1000:03d}{posicion:09d}'
+
+
+def digito_luhn(digitos):
+    """Dígito de control de Luhn (IMEI e ICCID)."""
+    total = 0
+    for i, digito in enumerate(reversed(digitos)):
+        valor = int(digito)
+        if i % 2 == 0:
+            valor *= 2
+            if valor > 9:
+                valor -= 9
+        total += valor
+    return str((10 - total % 10) % 10)
+
+
+def _digitos(rng, cantidad):
+    return ''.join(rng.choices('0123456789', k=cantidad))
+
+
+def imei(rng):
+    base = rng.choice(TACS) + _digitos(rng, 6)
+    return base + digito_luhn(base)
+
+
+def iccid(rng, operador):
+    """ICCID de 19 dígitos con el prefijo del operador y dígito de control."""
+    prefijo = PREFIJOS_ICCID[operador]
+    if operador == 'Movistar':
+        # 89577 es de Tigo: el dígito siguiente a 8957 no puede ser 7
+        prefijo += rng.choice('01234568')
+    base = prefijo + _digitos(rng, 18 - len(prefijo))
+    return base + digito_luhn(base)
+
+
+@contextmanager
+def fechas_manuales():
+    """
+    Desactiva auto_now/auto_now_add de las fechas mientras se genera, para
+    escribir fechas repartidas en el tiempo. Solo para comandos: el cambio es
+    del proceso entero.
+    """
+    campos = [Activo._meta.get_field(nombre) for nombre in ('fecha_creacion', 'fecha_modificacion', 'fecha_confirmacion')]
+    campos += [Tranzabilidad._meta.get_field('fecha'), Historial._meta.get_field('fecha')]
+    previos = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    for campo in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in previos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def preparar_referencias(zonas=ZONAS, categorias=CATEGORIAS):
+    """Crea las zonas, categorías y marcas que falten. Devuelve (zonas, marcas)."""
+    Zona.objects.bulk_create([Zona(nombre=nombre) for nombre in zonas], ignore_conflicts=True)
+    Categoria.objects.bulk_create([Categoria(nombre=nombre) for nombre in categorias], ignore_conflicts=True)
+    por_nombre = {categoria.nombre: categoria for categoria in Categoria.objects.filter(nombre__in=list(categorias))}
+    Marca.objects.bulk_create([
+        Marca(nombre=marca, categoria=por_nombre[categoria])
+        for categoria, marcas in categorias.items() for marca in marcas
+    ], ignore_conflicts=True)
+    # bulk_create no dispara las señales que renuevan la caché de referencias
+    invalidar_referencias()
+
+    zonas = list(Zona.objects.filter(nombre__in=list(zonas)).order_by('nombre'))
+    marcas = [
+        marca for marca in Marca.objects.filter(categoria__in=por_nombre.values()).select_related('categoria').order_by('categoria__nombre', 'nombre')
+        if marca.nombre in categorias[marca.categoria.nombre]
+    ]
+    return zonas, marcas
+
+
+def usuarios_sinteticos(cantidad=5):
+    """Usuarios (sin contraseña utilizable) a los que se atribuyen los movimientos."""
+    Usuario = get_user_model()
+    roles = ('logistica', 'admin', 'asignador')
+    usuarios = []
+    for i in range(cantidad):
+        usuario, creado = Usuario.objects.get_or_create(
+            username=f'sintetico{i + 1}', defaults={'rol': roles[i % len(roles)]}
+        )
+        if creado:
+            usuario.set_unusable_password()
+            usuario.save(update_fields=['password'])
+        usuarios.append(usuario)
+    return usuarios
+
+
+def _generar_lote(generador, inicio, fin):
+    # Un generador aleatorio por lote: el contenido de cada lote no depende de los
+    # demás, así que da lo mismo el orden o el proceso en que se escriba
+    rng = random.Random(f'{generador.semilla}:{inicio}')
+    with fechas_manuales(), transaction.atomic():
+        return generador._lote(rng, inicio, fin)
+
+
+def _lote_en_proceso(argumentos):
+    return _generar_lote(*argumentos)
+
+
+class Generador:
+    """
+    Genera `cantidad` activos a partir de la posición `desde` (el serial sale
+    de la semilla y la posición, así dos corridas con distinto `desde` no se
+    pisan).
+    """
+
+    def __init__(self, semilla=0, zonas=ZONAS, categorias=CATEGORIAS, categorias_con_sim=CATEGORIAS_CON_SIM,
+                 eventos_por_activo=3, historial_por_evento=1, usuarios=5, hasta=None, tamano_lote=TAMANO_LOTE):
+        self.semilla = semilla
+        self.categorias_con_sim = set(categorias_con_sim)
+        self.eventos_por_activo = eventos_por_activo
+        self.historial_por_evento = historial_por_evento
+        # Por defecto el inicio del día: dos corridas del mismo día con la misma semilla coinciden
+        self.hasta = hasta or timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.tamano_lote = tamano_lote
+        self.zonas, self.marcas = preparar_referencias(zonas, categorias)
+        if not self.zonas or not self.marcas:
+            raise ValueError('Se necesita al menos una zona y una marca para generar activos.')
+        self.usuarios = [usuario.pk for usuario in usuarios_sinteticos(usuarios)]
+        self.operadores = list(PESOS_OPERADOR)
+        self.pesos_operador = list(PESOS_OPERADOR.values())
+
+    def generar(self, cantidad, desde=0, procesos=1, al_avanzar=None):
+        """
+        Escribe los activos y su historia. Devuelve {'activos', 'movimientos', 'historial'}.
+        Con procesos > 1 los lotes se escriben en paralelo, cada proceso con su
+        conexión a la base configurada (útil en PostgreSQL; SQLite admite un solo
+        escritor a la vez).
+        """
+        lotes = [(self, inicio, min(inicio + self.tamano_lote, desde + cantidad))
+                 for inicio in range(desde, desde + cantidad, self.tamano_lote)]
+        totales = {'activos': 0, 'movimientos': 0, 'historial': 0}
+
+        def sumar(resultado):
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            if al_avanzar:
+                al_avanzar(totales['activos'], cantidad)
+
+        if procesos <= 1:
+            for lote in lotes:
+                sumar(_generar_lote(*lote))
+            return totales
+
+        # spawn: cada proceso arranca Django desde cero (initializer) en vez de heredar conexiones abiertas
+        contexto = multiprocessing.get_context('spawn')
+        with contexto.Pool(procesos, initializer=django.setup) as pool:
+            for resultado in pool.imap_unordered(_lote_en_proceso, lotes):
+                sumar(resultado)
+        return totales
+
+    # --- Filas ---------------------------------------------------------------
+
+    def _persona(self, rng):
+        return f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}'
+
+    def _activo(self, rng, posicion):
+        marca = rng.choice(self.marcas)
+        zona = rng.choice(self.zonas)
+        creado = self.hasta - timedelta(seconds=rng.randrange(2 * 365 * 86400))
+        modificado = creado + (self.hasta - creado) * rng.random()
+
+        azar = rng.random()
+        estado = ESTADO_BAJA if azar < 0.05 else ESTADO_ASIGNADO if azar < 0.40 else ESTADO_CONFIRMADO
+        activo = Activo(
+            sn=serial(self.semilla, posicion),
+            activo=f'{marca.nombre} {posicion}',
+            marca_id=marca.pk,
+            categoria_id=marca.categoria_id,
+            zona_id=zona.pk,
+            estado=estado,
+            observacion='Generado (sintético)',
+            fecha_creacion=creado,
+            fecha_modificacion=modificado,
+            fecha_confirmacion=creado.date(),
+        )
+        if marca.categoria.nombre in self.categorias_con_sim:
+            activo.imei1 = imei(rng)
+            activo.imei2 = imei(rng)
+            activo.iccid = iccid(rng, rng.choices(self.operadores, self.pesos_operador)[0])
+            if rng.random() < 0.3:
+                activo.mac_superflex = ':'.join(f'{rng.randrange(256):02X}' for _ in range(6))
+        if estado == ESTADO_ASIGNADO:
+            activo.nombres_apellidos = self._persona(rng)
+            activo.documento = str(rng.randrange(10_000_000, 1_200_000_000))
+            activo.responsable = self._persona(rng)
+            activo.identificacion = str(rng.randrange(10_000_000, 1_200_000_000))
+            activo.cargo = rng.choice(CARGOS)
+            activo.punto_venta = f'PDV {zona.nombre} {rng.randrange(1, 60)}'
+            activo.codigo_centro_costo = f'CC{rng.randrange(100, 999)}'
+            activo.centro_costo_punto = f'CENTRO {zona.nombre}'
+            activo.fecha_salida_bodega = (creado + timedelta(days=rng.randrange(1, 30))).date()
+        activo.preparar_guardado()
+        return activo, zona.nombre
+
+    def _eventos(self, rng, activo, zona):
+        """Movimientos del activo y, por cada uno, los cambios de Historial que genera."""
+        movimientos = [(Tranzabilidad(
+            activo_id=activo.pk, tipo='ingreso', usuario_id=rng.choice(self.usuarios), zona_destino=zona,
+            descripcion='Ingreso (sintético)', fecha=activo.fecha_creacion,
+        ), [])]
+        duracion = (self.hasta - activo.fecha_creacion).total_seconds()
+        fechas = sorted(activo.fecha_creacion + timedelta(seconds=duracion * rng.random())
+                        for _ in range(self.eventos_por_activo))
+        for fecha in fechas:
+            tipo = rng.choice(TIPOS_EVENTO)
+            usuario_id = rng.choice(self.usuarios)
+            movimiento = Tranzabilidad(
+                activo_id=activo.pk, tipo=tipo, usuario_id=usuario_id, fecha=fecha,
+                zona_origen=zona, zona_destino=rng.choice(self.zonas).nombre,
+                estado_anterior=activo.estado, estado_nuevo=activo.estado,
+                descripcion=f'{tipo} (sintético)',
+            )
+            cambios = []
+            if tipo in ('actualizacion', 'cambio_estado'):
+                for _ in range(self.historial_por_evento):
+                    campo = 'estado' if tipo == 'cambio_estado' else rng.choice(CAMPOS_HISTORIAL)
+                    cambios.append(Historial(
+                        activo_id=activo.pk, usuario_id=usuario_id, campo_cambiado=campo, fecha=fecha,
+                        valor_anterior=f'{campo} anterior', valor_nuevo=f'{campo} {rng.randrange(1000)}',
+                    ))
+            movimientos.append((movimiento, cambios))
+        return movimientos
+
+    def _lote(self, rng, inicio, fin):
+        activos = [self._activo(rng, posicion) for posicion in range(inicio, fin)]
+        Activo.objects.bulk_create([activo for activo, _ in activos], batch_size=TAMANO_INSERT)
+
+        eventos = [evento for activo, zona in activos for evento in self._eventos(rng, activo, zona)]
+        Tranzabilidad.objects.bulk_create([movimiento for movimiento, _ in eventos], batch_size=TAMANO_INSERT)
+
+        historial = []
+        for movimiento, cambios in eventos:
+            for cambio in cambios:
+                cambio.movimiento_id = movimiento.pk
+                historial.append(cambio)
+        Historial.objects.bulk_create(historial, batch_size=TAMANO_INSERT)
+        return {'activos': len(activos), 'movimientos': len(eventos), 'historial': len(historial)}
+
+
+def despues_de_generar():
+    """Pone al día lo que las señales mantienen y bulk_create se saltó."""
+    reconstruir_resumen()
+    reconstruir_sugerencias()
+    indice.invalidar()
+    invalidar_dashboards()
+    cache.delete(CLAVE_USUARIOS)
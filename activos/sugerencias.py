@@ -0,0 +1,78 @@
+"""
+Sugerencias por campo para los formularios de Activo (documento, nombres,
+identificación y centro de costo).
+
+ValorSugerido guarda los valores distintos de cada campo con su forma
+normalizada e índice por (campo, valor_normalizado), así la sugerencia es una
+búsqueda por prefijo sobre el índice y el formulario no lleva las listas
+completas. Los valores nuevos se agregan al guardar un activo (señal post_save)
+y en la importación masiva; el comando reconstruir_sugerencias quita los que ya
+no usa ningún activo.
+"""
+from django.db import transaction
+
+from .busqueda import filtro_prefijo
+from .models import Activo, ValorSugerido, normalizar
+
+
+CAMPOS = ('documento', 'nombres_apellidos', 'identificacion', 'codigo_centro_costo', 'centro_costo_punto')
+
+LIMITE = 20
+
+TAMANO_LOTE = 1000
+
+LARGO_MAXIMO = ValorSugerido._meta.get_field('valor').max_length
+
+
+def _fila(campo, valor):
+    valor = valor[:LARGO_MAXIMO]
+    return ValorSugerido(campo=campo, valor=valor, valor_normalizado=normalizar(valor))
+
+
+def registrar(activos):
+    """Agrega a la tabla los valores de los activos que aún no estén (una consulta)."""
+    nuevos = {
+        (campo, valor)
+        for activo in activos
+        for campo in CAMPOS
+        if normalizar(valor := getattr(activo, campo))
+    }
+    if nuevos:
+        ValorSugerido.objects.bulk_create(
+            [_fila(campo, valor) for campo, valor in sorted(nuevos)], ignore_conflicts=True
+        )
+
+
+def sugerencias(campo, termino, limite=LIMITE):
+    """Hasta `limite` valores del campo que empiezan por el término, en orden alfabético."""
+    termino = normalizar(termino)
+    if not termino:
+        return []
+    return list(
+        ValorSugerido.objects.filter(campo=campo).filter(filtro_prefijo('valor_normalizado', termino))
+        .order_by('valor_normalizado', 'valor').values_list('valor', flat=True)[:limite]
+    )
+
+
+@transaction.atomic
+def reconstruir():
+    """Vuelve a llenar la tabla con los valores que usan hoy los activos. Devuelve cuántos quedaron."""
+    ValorSugerido.objects.all().delete()
+    total = 0
+    for campo in CAMPOS:
+        valores = (
+            Activo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+            .order_by().values_list(campo, flat=True).distinct().iterator(chunk_size=TAMANO_LOTE)
+        )
+        lote = []
+        for valor in valores:
+            if normalizar(valor):
+                lote.append(_fila(campo, valor))
+            if len(lote) >= TAMANO_LOTE:
+                ValorSugerido.objects.bulk_create(lote, ignore_conflicts=True)
+                total += len(lote)
+                lote = []
+        if lote:
+            ValorSugerido.objects.bulk_create(lote, ignore_conflicts=True)
+            total += len(lote)
+    return total
@@ -8,7 +8,7 @@ def query_transform(context, **kwargs):
     Returns the URL-encoded querystring for the current page,
     updating the params with the key/value pairs passed to the tag.
     
-    Usage: {% query_transform page=page_obj.next_page_number %}
+    Usage: {% query_transform cursor=page_obj.cursor_siguiente %}
     """
     query = context['request'].GET.copy()
     for k, v in kwargs.items():
@@ -0,0 +1,161 @@
+"""
+Cola de importaciones respaldada en la base de datos.
+
+La vista de importación crea un TrabajoImportacion con el archivo y responde de
+inmediato; el comando procesar_importaciones toma los trabajos pendientes y los
+ejecuta con el motor de activos/importacion.py. No requiere broker externo.
+
+Sin cola (IMPORTACION_EN_SEGUNDO_PLANO=False) el trabajo solo registra el
+progreso y el resultado: el archivo se lee directo de la petición y no se
+guarda. En los dos casos el contenido se borra al terminar, bien o mal.
+"""
+import os
+import socket
+from datetime import timedelta
+from io import BytesIO
+
+import openpyxl
+from django.utils import timezone
+
+from .importacion import importar_filas
+from .models import TrabajoImportacion
+
+
+# Máximo de errores que se guardan en el trabajo (el contador sí es exacto)
+MAX_ERRORES_GUARDADOS = 500
+
+
+def nombre_worker():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def encolar_importacion(archivo, usuario, estado='pendiente'):
+    """
+    Crea un trabajo con el contenido del archivo subido. Con estado='procesando'
+    queda reservado para procesarlo en la misma petición, sin pasar por la cola
+    ni guardar el archivo (se pasa a ejecutar_trabajo).
+    """
+    return TrabajoImportacion.objects.create(
+        usuario=usuario,
+        nombre_archivo=archivo.name,
+        archivo=archivo.read() if estado == 'pendiente' else b'',
+        estado=estado,
+        fecha_inicio=timezone.now() if estado == 'procesando' else None,
+    )
+
+
+def tomar_siguiente(worker):
+    """
+    Reclama el trabajo pendiente más antiguo. El UPDATE condicional sobre el
+    estado garantiza que dos workers no tomen el mismo trabajo.
+    """
+    candidatos = TrabajoImportacion.objects.filter(estado='pendiente').order_by('fecha_creacion').values_list('pk', flat=True)[:10]
+    for pk in candidatos:
+        tomado = TrabajoImportacion.objects.filter(pk=pk, estado='pendiente').update(
+            estado='procesando',
+            worker=worker,
+            fecha_inicio=timezone.now(),
+            fecha_actualizacion=timezone.now(),
+        )
+        if tomado:
+            return TrabajoImportacion.objects.get(pk=pk)
+    return None
+
+
+def liberar_colgados(minutos):
+    """
+    Trabajos en proceso sin avance en los últimos N minutos. Los de un worker
+    caído vuelven a la cola; los que se procesaban en una petición no tienen el
+    archivo guardado y quedan fallidos. Devuelve (devueltos, fallidos).
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    colgados = TrabajoImportacion.objects.filter(estado='procesando', fecha_actualizacion__lt=limite)
+    devueltos = colgados.exclude(worker=None).update(
+        estado='pendiente',
+        worker=None,
+    )
+    fallidos = colgados.filter(worker=None).update(
+        estado='fallido',
+        mensaje='La importación se interrumpió antes de terminar. Vuelve a subir el archivo.',
+        fecha_fin=timezone.now(),
+    )
+    return devueltos, fallidos
+
+
+def ejecutar_trabajo(trabajo, archivo=None):
+    """
+    Procesa un trabajo ya reclamado y deja el resultado en la base de datos.
+    archivo: el archivo subido, si no se guardó en el trabajo (procesamiento en la petición).
+    """
+    trabajos = TrabajoImportacion.objects.filter(pk=trabajo.pk)
+
+    def al_avanzar(resultado):
+        trabajos.update(
+            filas_procesadas=resultado.filas_procesadas,
+            importados=resultado.importados,
+            actualizados=resultado.actualizados,
+            omitidos=resultado.omitidos,
+            errores=resultado.errores,
+            fecha_actualizacion=timezone.now(),
+        )
+
+    try:
+        wb = openpyxl.load_workbook(archivo or BytesIO(trabajo.archivo), read_only=True, data_only=True)
+        ws = wb.active
+        if ws.max_row:
+            trabajos.update(total_filas=max(ws.max_row - 1, 0))
+
+        filas = enumerate(ws.iter_rows(min_row=2, values_only=True), start=2)
+        resultado = importar_filas(filas, trabajo.usuario, al_avanzar=al_avanzar)
+        wb.close()
+    except Exception as e:
+        trabajos.update(
+            estado='fallido',
+            mensaje=f'Error al procesar el archivo: {str(e)}',
+            archivo=b'',
+            fecha_fin=timezone.now(),
+        )
+    else:
+        al_avanzar(resultado)
+        trabajos.update(
+            estado='completado',
+            errores_detalle=resultado.errores_list[:MAX_ERRORES_GUARDADOS],
+            mensaje=resultado.mensaje_html(),
+            # El archivo ya no se necesita: se libera el espacio
+            archivo=b'',
+            fecha_fin=timezone.now(),
+        )
+
+    trabajo.refresh_from_db()
+    return trabajo
+
+
+def progreso(trabajo):
+    """Estado del trabajo en el formato que consume importar_form.html."""
+    datos = {
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'terminado': trabajo.terminado,
+        'total_filas': trabajo.total_filas,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'importados': trabajo.importados,
+        'actualizados': trabajo.actualizados,
+        'omitidos': trabajo.omitidos,
+        'errores': trabajo.errores,
+    }
+    if trabajo.estado == 'completado':
+        datos.update({
+            'success': trabajo.errores == 0,
+            'message': trabajo.mensaje,
+            'icon': 'warning' if trabajo.errores > 0 else 'success',
+            'title': 'Importación con Observaciones' if trabajo.errores > 0 else 'Proceso Finalizado',
+            'reload': True,
+        })
+    elif trabajo.estado == 'fallido':
+        datos.update({
+            'success': False,
+            'message': trabajo.mensaje,
+            'icon': 'error',
+            'title': 'Error de Sistema',
+        })
+    return datos
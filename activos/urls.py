@@ -13,6 +13,7 @@ urlpatterns = [
     path('exportar/', views.exportar_excel, name='exportar_excel'),
     path('descargar-plantilla/', views.descargar_plantilla, name='descargar_plantilla'),
     path('importar/', views.importar_activos, name='importar_activos'),
+    path('importar/trabajos/<int:pk>/', views.progreso_importacion, name='progreso_importacion'),
     path('reporte-por-sede/', views.reporte_por_sede, name='reporte_por_sede'),
     path('crear/', views.ActivoCreateView.as_view(), name='activo-create'),
     path('<int:pk>/', views.ActivoDetailView.as_view(), name='activo_detail'),
@@ -24,6 +25,10 @@ urlpatterns = [
     path('<int:pk>/tranzabilidad/', views.RegistrarTranzabilidadView.as_view(), name='registrar-tranzabilidad'),
     
     path('api/buscar-activos/', views.buscar_activos_ajax, name='buscar_activos_ajax'),
+    path('api/autocompletado/', views.autocompletado_activos, name='autocompletado_activos'),
+    path('api/sugerencias/<str:campo>/', views.sugerencias_activos, name='sugerencias_activos'),
+    path('api/metricas/', views.metricas_vistas, name='metricas_vistas'),
+    path('api/delta/', views.exportar_delta, name='exportar_delta'),
 
     path('tranzabilidad/registrar/', views.RegistrarTranzabilidadGeneralView.as_view(), name='registrar_tranzabilidad_general'),
     path('tranzabilidad/', views.TranzabilidadListView.as_view(), name='tranzabilidad_list'),
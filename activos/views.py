@@ -2,1193 +2,431 @@ from django.shortcuts import render, redirect, get_object_or_404
 
 from django.contrib.auth.decorators import login_required
 
-from django.urls import reverse_lazy, reverse
-
-from django.views.generic import CreateView, DetailView, UpdateView, DeleteView, ListView
-
-from django.contrib.auth.mixins import LoginRequiredMixin
-
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
-
-import csv
-
-import json
-
-from openpyxl import Workbook
-
-from django.db import models
-
-from django.db.models import Q
-
-from django.contrib import messages
-
-from django.contrib.auth import get_user_model
-
-from datetime import timedelta
-
-from django.utils import timezone
-
-from .models import Activo, Tranzabilidad, Historial, Zona, Categoria, Marca
-
-from .forms import ActivoForm, CategoriaForm, ImportarActivosForm
-
-import openpyxl
-
-
-
-
-
-def ping(request):
-
-    return HttpResponse("pong", content_type="text/plain")
-
-
-
-@login_required
-
-def dashboard_redirect(request):
-
-    if request.user.is_superuser or request.user.rol == 'admin':
-
-        return redirect(reverse('activos:admin_dashboard'))
-
-    elif request.user.rol == 'logistica':
-
-        return redirect(reverse('activos:logistica_dashboard'))
-
-    elif request.user.rol == 'lectura':
-
-        return redirect(reverse('activos:lectura_dashboard'))
-
-    elif request.user.rol == 'asignador':
-
-        return redirect(reverse('activos:lectura_dashboard'))
-
-    else:
-
-        return redirect(reverse('activos:home'))
-
-
-
-@login_required
-
-def admin_dashboard(request):
-
-    if not (request.user.is_superuser or request.user.rol == 'admin'):
-
-        return redirect('activos:home')
-
-    
-
-    # Estadísticas generales
-
-    total_activos = Activo.objects.count()
-
-    # Definitions for mutual exclusivity
-
-    baja_query = Q(estado__icontains='baja')
-
-    asignado_query = Q(estado__icontains='asignado') | (Q(nombres_apellidos__isnull=False) & ~Q(nombres_apellidos=''))
-
-    confirmado_query = Q(estado__icontains='confirmado')
-
-
-
-    # 1. Dados de Baja: Matches 'baja'
-
-    dados_baja = Activo.objects.filter(baja_query).count()
-
-
-
-    # 2. Asignados: Matches asignado condition AND NOT baja
-
-    asignados = Activo.objects.filter(asignado_query).exclude(baja_query).distinct().count()
-
-
-
-    # 3. En Bodega: Matches 'confirmado' AND NOT (asignado OR baja)
-
-    # Note: 'confirmado' should not overlap with 'baja', but might overlap with 'asignado_query' (if name is present)
-
-    en_bodega = Activo.objects.filter(confirmado_query).exclude(asignado_query).exclude(baja_query).count()
-
-    
-
-    # Activos por zona
-
-    from django.db.models import Count
-
-    activos_por_zona = Activo.objects.values('zona').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')[:5]  # Top 5 zonas
-
-    
-
-    # Activos por categoría
-
-    activos_por_categoria = Activo.objects.values('categoria__nombre').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-    
-
-    # Activos por estado
-
-    activos_por_estado = Activo.objects.values('estado').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-    
-
-    # Últimos 5 activos registrados
-
-    ultimos_activos = Activo.objects.order_by('-fecha_creacion')[:5]
-
-    
-
-    # Activos por operador
-
-    activos_por_operador = Activo.objects.exclude(
-
-        operador__isnull=True
-
-    ).exclude(
-
-        operador=''
-
-    ).values('operador').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-    
-
-    return render(request, 'activos/admin_dashboard.html', {
-
-        'total_activos': total_activos,
-
-        'asignados': asignados,
-
-        'en_bodega': en_bodega,
-
-        'dados_baja': dados_baja,
-
-        'activos_por_zona': activos_por_zona,
-
-        'activos_por_categoria': activos_por_categoria,
-
-        'activos_por_estado': activos_por_estado,
-
-        'ultimos_activos': ultimos_activos,
-
-        'activos_por_operador': activos_por_operador,
-
-    })
-
-
-
-@login_required
-
-def logistica_dashboard(request):
-
-    if request.user.rol != 'logistica':
-
-        return redirect('activos:home')
-
-    
-
-    # Estadísticas generales (Misma lógica que admin)
-
-    total_activos = Activo.objects.count()
-
-    # Definitions for mutual exclusivity
-
-    baja_query = Q(estado__icontains='baja')
-
-    asignado_query = Q(estado__icontains='asignado') | (Q(nombres_apellidos__isnull=False) & ~Q(nombres_apellidos=''))
-
-    confirmado_query = Q(estado__icontains='confirmado')
-
-
-
-    # 1. Dados de Baja
-
-    dados_baja = Activo.objects.filter(baja_query).count()
-
-
-
-    # 2. Asignados: Exclude baja
-
-    asignados = Activo.objects.filter(asignado_query).exclude(baja_query).distinct().count()
-
-
-
-    # 3. En Bodega: Exclude asignado and baja
-
-    en_bodega = Activo.objects.filter(confirmado_query).exclude(asignado_query).exclude(baja_query).count()
-
-    
-
-    # Activos por categoría
-
-    from django.db.models import Count
-
-    activos_por_categoria = Activo.objects.values('categoria__nombre').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-    
-
-    # Activos por estado
-
-    activos_por_estado = Activo.objects.values('estado').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-
-
-    # Tranzabilidad (Exclusivo de logistica, mantenemos esto)
-
-    movimientos_recientes = Tranzabilidad.objects.order_by('-fecha')[:10]
-
-
-
-    return render(request, 'activos/logistica_dashboard.html', {
-
-        'total_activos': total_activos,
-
-        'asignados': asignados,
-
-        'en_bodega': en_bodega,
-
-        'dados_baja': dados_baja,
-
-        'activos_por_categoria': activos_por_categoria,
-
-        'activos_por_estado': activos_por_estado,
-
-        'movimientos_recientes': movimientos_recientes,
-
-    })
-
-
-
-@login_required
-
-def lectura_dashboard(request):
-
-    if request.user.rol not in ['lectura', 'asignador']:
-
-        return redirect('activos:home')
-
-    
-
-    # Estadísticas generales
-
-    total_activos = Activo.objects.count()
-
-    # Definitions for mutual exclusivity
-
-    baja_query = Q(estado__icontains='baja')
-
-    asignado_query = Q(estado__icontains='asignado') | (Q(nombres_apellidos__isnull=False) & ~Q(nombres_apellidos=''))
-
-    confirmado_query = Q(estado__icontains='confirmado')
-
-
-
-    dados_baja = Activo.objects.filter(baja_query).count()
-
-    asignados = Activo.objects.filter(asignado_query).exclude(baja_query).distinct().count()
-
-    en_bodega = Activo.objects.filter(confirmado_query).exclude(asignado_query).exclude(baja_query).count()
-
-    
-
-    # Gráficos básicos para visualización
-
-    from django.db.models import Count
-
-    activos_por_categoria = Activo.objects.values('categoria__nombre').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-    
-
-    activos_por_estado = Activo.objects.values('estado').annotate(
-
-        total=Count('item')
-
-    ).order_by('-total')
-
-
-
-    return render(request, 'activos/lectura_dashboard.html', {
-
-        'total_activos': total_activos,
-
-        'asignados': asignados,
-
-        'en_bodega': en_bodega,
-
-        'dados_baja': dados_baja,
-
-        'activos_por_categoria': activos_por_categoria,
-
-        'activos_por_estado': activos_por_estado,
-
-    })
-
-
-
-class ActivoListView(LoginRequiredMixin, ListView):
-
-    model = Activo
-
-    template_name = 'activos/home.html'
-
-    context_object_name = 'activos'
-
-    paginate_by = 20
-
-    
-
-    def get_queryset(self):
-
-        queryset = super().get_queryset()
-
-        
-
-        # Filtro por documento del asesor
-
-        documento = self.request.GET.get('documento', '').strip()
-
-        if documento:
-
-            queryset = queryset.filter(documento__icontains=documento)
-
-        
-
-        # Filtro por S/N
-
-        sn = self.request.GET.get('sn', '').strip()
-
-        if sn:
-
-            queryset = queryset.filter(sn__icontains=sn)
-
-
-
-        # Filtro por activo
-
-        activo = self.request.GET.get('activo', '').strip()
-
-        if activo:
-
-            queryset = queryset.filter(activo__icontains=activo)
-
-
-
-        # Filtro por IMEI (nuevo)
-
-        imei = self.request.GET.get('imei', '').strip()
-
-        if imei:
-
-            queryset = queryset.filter(
-
-                Q(imei1__icontains=imei) | Q(imei2__icontains=imei)
-
-            )
-
-        
-
-        return queryset
-
-    
-
-    def get_context_data(self, **kwargs):
-
-        context = super().get_context_data(**kwargs)
-
-        # Pasar los valores de los filtros al contexto para mantenerlos en el formulario
-
-        context['filtro_documento'] = self.request.GET.get('documento', '')
-
-        context['filtro_sn'] = self.request.GET.get('sn', '')
-
-        context['filtro_activo'] = self.request.GET.get('activo', '')
-
-        context['filtro_imei'] = self.request.GET.get('imei', '')
-
-        return context
-
-
-
-
-
-@login_required
-
-def exportar_excel(request):
-
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-    
-
-    activos = Activo.objects.all()
-
-    wb = Workbook()
-
-    ws = wb.active
-
-    ws.title = "Inventario de Activos"
-
-
-
-    # Definir estilos
-
-    header_fill = PatternFill(start_color="0F172A", end_color="0F172A", fill_type="solid")
-
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    border = Border(
-
-        left=Side(style='thin'),
-
-        right=Side(style='thin'),
-
-        top=Side(style='thin'),
-
-        bottom=Side(style='thin')
-
-    )
-
-
-
-    # Headers
-
-    headers = ['ITEM', 'DOCUMENTO', 'NOMBRES Y APELLIDOS', 'IMEI 1', 'IMEI 2', 'S/N', 
-
-               'ICCID', 'OPERADOR', 'MAC SUPERFLEX', 'MARCA', 'ACTIVO', 'CARGO', 'ESTADO', 
-
-               'FECHA CONFIRMACIÓN', 'RESPONSABLE', 'IDENTIFICACIÓN', 'ZONA', 'CATEGORÍA', 
-
-               'OBSERVACIÓN', 'PUNTO DE VENTA', 'CÓDIGO CENTRO COSTO', 'CENTRO COSTO PUNTO', 
-
-               'FECHA SALIDA BODEGA']
-
-    
-
-    ws.append(headers)
-
-    
-
-    # Aplicar estilos a encabezados
-
-    for cell in ws[1]:
-
-        cell.fill = header_fill
-
-        cell.font = header_font
-
-        cell.alignment = header_alignment
-
-        cell.border = border
-
-
-
-    # Data
-
-    for activo in activos:
-
-        row = [
-
-            activo.item,
-
-            activo.documento or '',
-
-            activo.nombres_apellidos or '',
-
-            activo.imei1 or '',
-
-            activo.imei2 or '',
-
-            activo.sn or '',
-
-            activo.iccid or '',
-
-            activo.operador or '',
-
-            activo.mac_superflex or '',
-
-            activo.marca or '',
-
-            activo.activo or '',
-
-            activo.cargo or '',
-
-            activo.estado or '',
-
-            activo.fecha_confirmacion.strftime('%d/%m/%Y') if activo.fecha_confirmacion else '',
-
-            activo.responsable or '',
-
-            activo.identificacion or '',
-
-            activo.zona or '',
-
-            str(activo.categoria) if activo.categoria else '',
-
-            activo.observacion or '',
-
-            activo.punto_venta or '',
-
-            activo.codigo_centro_costo or '',
-
-            activo.centro_costo_punto or '',
-
-            activo.fecha_salida_bodega.strftime('%d/%m/%Y') if activo.fecha_salida_bodega else ''
-
-        ]
-
-        ws.append(row)
-
-        
-
-        # Aplicar bordes a las celdas de datos
-
-        for cell in ws[ws.max_row]:
-
-            cell.border = border
-
-
-
-    # Ajustar ancho de columnas
-
-    for column in ws.columns:
-
-        max_length = 0
-
-        column_letter = column[0].column_letter
-
-        for cell in column:
-
-            try:
-
-                if len(str(cell.value)) > max_length:
-
-                    max_length = len(str(cell.value))
-
-            except:
-
-                pass
-
-        adjusted_width = min(max_length + 2, 50)
-
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-
-    fecha_hoy = timezone.now().strftime('%d-%m-%Y')
-
-    response['Content-Disposition'] = f'attachment; filename=inventario_activos_{fecha_hoy}.xlsx'
-
-    wb.save(response)
-
-    return response
-
-
-
-@login_required
-
-def descargar_plantilla(request):
-
-    if request.user.rol not in ['admin', 'logistica']:
-
-        messages.error(request, 'No tienes permisos para descargar plantillas.')
-
-        return redirect('activos:home')
-
-
-
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-    
-
-    wb = Workbook()
-
-    ws = wb.active
-
-    ws.title = "Plantilla Importación"
-
-
-
-    # Definir estilos
-
-    header_fill = PatternFill(start_color="0F172A", end_color="0F172A", fill_type="solid")
-
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    border = Border(
-
-        left=Side(style='thin'),
-
-        right=Side(style='thin'),
-
-        top=Side(style='thin'),
-
-        bottom=Side(style='thin')
-
-    )
-
-
-
-    # Headers (Mismos que en exportar_excel)
-
-    headers = ['ITEM', 'DOCUMENTO', 'NOMBRES Y APELLIDOS', 'IMEI 1', 'IMEI 2', 'S/N', 
-
-               'ICCID', 'OPERADOR', 'MAC SUPERFLEX', 'MARCA', 'ACTIVO', 'CARGO', 'ESTADO', 
-
-               'FECHA CONFIRMACIÓN', 'RESPONSABLE', 'IDENTIFICACIÓN', 'ZONA', 'CATEGORÍA', 
-
-               'OBSERVACIÓN', 'PUNTO DE VENTA', 'CÓDIGO CENTRO COSTO', 'CENTRO COSTO PUNTO', 
-
-               'FECHA SALIDA BODEGA']
-
-    
-
-    ws.append(headers)
-
-    
-
-    # Aplicar estilos a encabezados
-
-    for cell in ws[1]:
-
-        cell.fill = header_fill
-
-        cell.font = header_font
-
-        cell.alignment = header_alignment
-
-        cell.border = border
-
-
-
-    # Ajustar ancho de columnas sugerido
-
-    for col_num, column_title in enumerate(headers, 1):
-
-        column_letter = openpyxl.utils.get_column_letter(col_num)
-
-        ws.column_dimensions[column_letter].width = 20
-
-
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-
-    response['Content-Disposition'] = 'attachment; filename=plantilla_importacion_activos.xlsx'
-
-    wb.save(response)
-
-    return response
-
-
-
-@login_required
-
-def importar_activos(request):
-
-    if request.user.rol not in ['admin', 'logistica']:
-
-        messages.error(request, 'No tienes permisos para importar activos.')
-
-        return redirect('activos:home')
-
+from django.views.decorators.http import condition
 
+from django.urls import reverse_lazy, reverse
 
-    if request.method == 'POST':
+from django.views.generic import CreateView, DetailView, UpdateView, DeleteView, ListView
 
-        form = ImportarActivosForm(request.POST, request.FILES)
+from django.contrib.auth.mixins import LoginRequiredMixin
 
-        if form.is_valid():
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, FileResponse, StreamingHttpResponse
 
-            excel_file = request.FILES['archivo_excel']
+from openpyxl import Workbook
 
-            
+from django.db import models
 
-            try:
+from django.db.models import Prefetch, ProtectedError, Q
 
-                wb = openpyxl.load_workbook(excel_file, data_only=True)
+from django.contrib import messages
 
-                ws = wb.active
+from django.conf import settings
 
-                
+from .models import Activo, ActivoArchivado, Tranzabilidad, Historial, Zona, Categoria, Marca, TrabajoImportacion, InventarioResumen, normalizar
 
-                # Contadores
+from .forms import ActivoForm, CategoriaForm, ImportarActivosForm, campo_estado_nuevo
 
-                importados = 0
+from .trabajos import encolar_importacion, ejecutar_trabajo, progreso
 
-                actualizados = 0
+from .exportacion import filtrar_activos, leer_filtros, formato_exportacion, xlsx_temporal, exportacion_plana, FORMATOS_PLANOS
 
-                omitidos = 0
+from .estadisticas import contadores, snapshot_dashboard
 
-                errores = 0
+from .autocompletado import autocompletado
 
-                errores_list = []
+from .referencias import referencias
 
-                
+from .busqueda import buscar as buscar_activos, MODOS as MODOS_BUSQUEDA
 
-                # Helper para convertir valores sin notación científica
+from .sugerencias import sugerencias, CAMPOS as CAMPOS_SUGERENCIAS
 
-                def safe_str(val):
+from .paginacion import PaginacionCursorMixin
 
-                    if val is None:
+from .movimientos import usuarios_con_movimientos
 
-                        return None
+from .eliminacion import eliminar_activos
 
-                    if isinstance(val, (int, float)):
+from .metricas import metricas
 
-                        return '{:.0f}'.format(val)
+from .delta import MarcaInvalida, fin_de_ventana, leer_marca, lineas_delta
 
-                    return str(val).strip()
+import openpyxl
 
 
 
-                # Iterar filas, saltando encabezado
 
-                for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
 
-                    try:
+def ping(request):
 
-                        # 0:ITEM, 1:DOC, 2:NOMBRES, 3:IMEI1, 4:IMEI2, 5:SN, 6:ICCID, 7:OPERADOR, 8:MAC, 9:MARCA, 10:ACTIVO
+    return HttpResponse("pong", content_type="text/plain")
 
-                        
 
-                        sn = safe_str(row[5])
 
-                        
+@login_required
 
-                        if not sn:
+def dashboard_redirect(request):
 
-                            # Sin serial no procesamos
+    if request.user.is_superuser or request.user.rol == 'admin':
 
-                            continue
+        return redirect(reverse('activos:admin_dashboard'))
 
+    elif request.user.rol == 'logistica':
 
+        return redirect(reverse('activos:logistica_dashboard'))
 
-                        # --- PREPARACIÓN Y VALIDACIÓN DE DATOS (Mochila de datos) ---
+    elif request.user.rol == 'lectura':
 
-                        
+        return redirect(reverse('activos:lectura_dashboard'))
 
-                        # Datos directos
+    elif request.user.rol == 'asignador':
 
-                        documento = safe_str(row[1])
+        return redirect(reverse('activos:lectura_dashboard'))
 
-                        nombres = str(row[2]).strip() if row[2] else None
+    else:
 
-                        imei1 = safe_str(row[3])
+        return redirect(reverse('activos:home'))
 
-                        imei2 = safe_str(row[4])
 
-                        iccid = safe_str(row[6])
 
-                        operador = str(row[7]).strip() if row[7] else None
+@login_required
 
-                        mac = safe_str(row[8])
+def admin_dashboard(request):
 
-                        nombre_activo = str(row[10]).strip() if row[10] else None
+    if not (request.user.is_superuser or request.user.rol == 'admin'):
 
-                        cargo = str(row[11]).strip() if row[11] else "vendedor ambulante"
+        return redirect('activos:home')
 
-                        estado = str(row[12]).strip() if row[12] else "activo confirmado"
+    
 
-                        
+    # Estadísticas, top 5 zonas, operadores y últimos activos (snapshot en caché, ver activos/estadisticas.py)
 
-                        # Lógica especial: nombres + activo confirmado = asignado
+    return render(request, 'activos/admin_dashboard.html', snapshot_dashboard('admin'))
 
-                        if nombres and estado.lower() == 'activo confirmado':
 
-                            estado = 'asignado'
 
-                            
+@login_required
 
-                        responsable = str(row[14]).strip() if row[14] else None
+def logistica_dashboard(request):
 
-                        identificacion = safe_str(row[15])
+    if request.user.rol != 'logistica':
 
-                        observacion = str(row[18]).strip() if row[18] else "Importado masivamente"
+        return redirect('activos:home')
 
-                        punto_venta = str(row[19]).strip() if row[19] else None
+    
 
-                        codigo_centro = safe_str(row[20])
+    # Estadísticas generales (Misma lógica que admin) y tranzabilidad reciente
 
-                        centro_punto = str(row[21]).strip() if row[21] else None
+    return render(request, 'activos/logistica_dashboard.html', snapshot_dashboard('logistica'))
 
 
 
-                        # Datos Relacionales (FKs)
+@login_required
 
-                        zona_txt = str(row[16]).strip() if row[16] else "Valledupar"
+def lectura_dashboard(request):
 
-                        categoria_nombre = str(row[17]).strip() if row[17] else None
+    if request.user.rol not in ['lectura', 'asignador']:
 
-                        marca_nombre = str(row[9]).strip() if row[9] else None
+        return redirect('activos:home')
 
+    
 
+    # Estadísticas generales y gráficos básicos para visualización
 
-                        # --- VALIDACIÓN FKs ---
+    return render(request, 'activos/lectura_dashboard.html', snapshot_dashboard('lectura'))
 
-                        
 
-                        # Zona
 
-                        if not Zona.objects.filter(nombre__iexact=zona_txt).exists():
+class ActivoListView(LoginRequiredMixin, PaginacionCursorMixin, ListView):
 
-                            errores += 1
+    model = Activo
 
-                            errores_list.append(f"Fila {row_idx} (S/N {sn}): Zona '{zona_txt}' no existe.")
+    template_name = 'activos/home.html'
 
-                            continue
+    context_object_name = 'activos'
 
-                            
+    paginate_by = 20
 
-                        # Categoría
+    # Paginación por cursor sobre la llave primaria (ver activos/paginacion.py)
 
-                        categoria_obj = None
+    orden_cursor = ('item',)
 
-                        if categoria_nombre:
 
-                            categoria_obj = Categoria.objects.filter(nombre__iexact=categoria_nombre).first()
 
-                            
+    def contar(self, queryset):
 
-                        if not categoria_obj:
+        # Sin filtros el total exacto sale de InventarioResumen, sin COUNT(*)
 
-                            errores += 1
+        if not queryset.query.has_filters():
 
-                            errores_list.append(f"Fila {row_idx} (S/N {sn}): Categoría '{categoria_nombre}' no existe.")
+            return contadores()['total_activos'], True
 
-                            continue
+        return super().contar(queryset)
 
+    
 
+    def get_queryset(self):
 
-                        # Marca
+        # La marca se muestra con su categoría (Marca.__str__)
 
-                        marca_obj = None
+        queryset = super().get_queryset().select_related('marca__categoria')
 
-                        if marca_nombre:
+        
 
-                            if categoria_obj:
+        # Los filtros de texto usan las columnas normalizadas (mayúsculas, con índice)
 
-                                marca_obj = Marca.objects.filter(nombre__iexact=marca_nombre, categoria=categoria_obj).first()
+        # Filtro por documento del asesor
 
-                                if not marca_obj:
+        documento = normalizar(self.request.GET.get('documento', ''))
 
-                                     if Marca.objects.filter(nombre__iexact=marca_nombre).exists():
+        if documento:
 
-                                         errores += 1
+            queryset = queryset.filter(documento_normalizado__contains=documento)
 
-                                         errores_list.append(f"Fila {row_idx} (S/N {sn}): La marca '{marca_nombre}' no pertenece a la categoría '{categoria_nombre}'.")
+        
 
-                                         continue
+        # Filtro por S/N
 
-                                     else:
+        sn = normalizar(self.request.GET.get('sn', ''))
 
-                                         errores += 1
+        if sn:
 
-                                         errores_list.append(f"Fila {row_idx} (S/N {sn}): Marca '{marca_nombre}' no existe.")
+            queryset = queryset.filter(sn_normalizado__contains=sn)
 
-                                         continue
 
-                            else:
 
-                                marca_obj = Marca.objects.filter(nombre__iexact=marca_nombre).first()
+        # Filtro por activo
 
-                        
+        activo = normalizar(self.request.GET.get('activo', ''))
 
-                        if not marca_obj:
+        if activo:
 
-                            errores += 1
+            queryset = queryset.filter(activo_normalizado__contains=activo)
 
-                            errores_list.append(f"Fila {row_idx} (S/N {sn}): Marca '{marca_nombre}' es obligatoria o no existe.")
 
-                            continue
 
+        # Filtro por IMEI (nuevo)
 
+        imei = normalizar(self.request.GET.get('imei', ''))
 
-                        # --- LÓGICA CORE: BUSCAR O CREAR/ACTUALIZAR ---
+        if imei:
 
-                        
+            queryset = queryset.filter(
 
-                        activo_existente = Activo.objects.filter(sn__iexact=sn).first()
+                Q(imei1_normalizado__contains=imei) | Q(imei2_normalizado__contains=imei)
 
-                        
+            )
 
-                        if activo_existente:
+        
 
-                            # --- LÓGICA DE ACTUALIZACIÓN (UPSERT) ---
+        return queryset
 
-                            cambios = []
+    
 
-                            
+    def get_context_data(self, **kwargs):
 
-                            # Lista de campos a verificar y actualizar si están vacíos
+        context = super().get_context_data(**kwargs)
 
-                            campos_a_verificar = [
+        # Pasar los valores de los filtros al contexto para mantenerlos en el formulario
 
-                                ('documento', documento),
+        context['filtro_documento'] = self.request.GET.get('documento', '')
 
-                                ('nombres_apellidos', nombres),
+        context['filtro_sn'] = self.request.GET.get('sn', '')
 
-                                ('imei1', imei1),
+        context['filtro_activo'] = self.request.GET.get('activo', '')
 
-                                ('imei2', imei2),
+        context['filtro_imei'] = self.request.GET.get('imei', '')
 
-                                ('iccid', iccid),
+        return context
 
-                                ('operador', operador),
 
-                                ('mac_superflex', mac),
 
-                                ('marca', marca_obj),
+@login_required
 
-                                ('activo', nombre_activo),
+def descargar_plantilla(request):
 
-                                # ('cargo', cargo), # Cargo suele tener default, cuidado al actualizar
+    if request.user.rol not in ['admin', 'logistica']:
 
-                                # ('estado', estado), # Estado es delicado, mejor no tocar si ya tiene
+        messages.error(request, 'No tienes permisos para descargar plantillas.')
 
-                                ('responsable', responsable),
+        return redirect('activos:home')
 
-                                ('identificacion', identificacion),
 
-                                # ('zona', zona_txt), # Zona tiene default
 
-                                ('categoria', categoria_obj),
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 
-                                # ('observacion', observacion), # Observacion suele tener info
+    
 
-                                ('punto_venta', punto_venta),
+    wb = Workbook()
 
-                                ('codigo_centro_costo', codigo_centro),
+    ws = wb.active
 
-                                ('centro_costo_punto', centro_punto),
+    ws.title = "Plantilla Importación"
 
-                            ]
 
-                            
 
-                            se_actualizo = False
+    # Definir estilos
 
-                            for campo, nuevo_valor in campos_a_verificar:
+    header_fill = PatternFill(start_color="0F172A", end_color="0F172A", fill_type="solid")
 
-                                valor_actual = getattr(activo_existente, campo)
+    header_font = Font(bold=True, color="FFFFFF", size=12)
 
-                                
+    header_alignment = Alignment(horizontal="center", vertical="center")
 
-                                # Normalizar para chequeo de vacío (incluyendo "None" string, espacios, formulas)
+    border = Border(
 
-                                val_str = str(valor_actual).strip().lower() if valor_actual is not None else ""
+        left=Side(style='thin'),
 
-                                si_es_vacio = val_str == "" or val_str == "none" or val_str == "null" or val_str.startswith('=')
+        right=Side(style='thin'),
 
-                                
+        top=Side(style='thin'),
 
-                                if si_es_vacio and nuevo_valor:
+        bottom=Side(style='thin')
 
-                                    setattr(activo_existente, campo, nuevo_valor)
+    )
 
-                                    cambios.append(campo)
 
-                                    se_actualizo = True
 
-                            
+    # Headers (Mismos que en exportar_excel)
 
-                            if se_actualizo:
+    headers = ['ITEM', 'DOCUMENTO', 'NOMBRES Y APELLIDOS', 'IMEI 1', 'IMEI 2', 'S/N', 
 
-                                activo_existente.save()
+               'ICCID', 'OPERADOR', 'MAC SUPERFLEX', 'MARCA', 'ACTIVO', 'CARGO', 'ESTADO', 
 
-                                actualizados += 1
+               'FECHA CONFIRMACIÓN', 'RESPONSABLE', 'IDENTIFICACIÓN', 'ZONA', 'CATEGORÍA', 
 
-                                
+               'OBSERVACIÓN', 'PUNTO DE VENTA', 'CÓDIGO CENTRO COSTO', 'CENTRO COSTO PUNTO', 
 
-                                # Registrar Trazabilidad (Actualización)
+               'FECHA SALIDA BODEGA']
 
-                                Tranzabilidad.objects.create(
+    
 
-                                    activo=activo_existente,
+    ws.append(headers)
 
-                                    tipo='actualizacion',
+    
 
-                                    usuario=request.user,
+    # Aplicar estilos a encabezados
 
-                                    descripcion=f'Actualización masiva: campos completados {", ".join(cambios)}'
+    for cell in ws[1]:
 
-                                )
+        cell.fill = header_fill
 
-                            else:
+        cell.font = header_font
 
-                                omitidos += 1
+        cell.alignment = header_alignment
 
-                        
+        cell.border = border
 
-                        else:
 
-                            # --- CREACIÓN NUEVO ACTIVO ---
 
-                            nuevo_activo = Activo(
+    # Ajustar ancho de columnas sugerido
 
-                                documento=documento,
+    for col_num, column_title in enumerate(headers, 1):
 
-                                nombres_apellidos=nombres,
+        column_letter = openpyxl.utils.get_column_letter(col_num)
 
-                                imei1=imei1,
+        ws.column_dimensions[column_letter].width = 20
 
-                                imei2=imei2,
 
-                                sn=sn,
 
-                                iccid=iccid,
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
-                                operador=operador,
+    response['Content-Disposition'] = 'attachment; filename=plantilla_importacion_activos.xlsx'
 
-                                mac_superflex=mac,
+    wb.save(response)
 
-                                marca=marca_obj,
+    return response
 
-                                activo=nombre_activo,
 
-                                cargo=cargo,
 
-                                estado=estado,
+@login_required
 
-                                responsable=responsable,
+def importar_activos(request):
 
-                                identificacion=identificacion,
+    if request.user.rol not in ['admin', 'logistica']:
 
-                                zona=zona_txt,
+        messages.error(request, 'No tienes permisos para importar activos.')
 
-                                categoria=categoria_obj,
+        return redirect('activos:home')
 
-                                observacion=observacion,
 
-                                punto_venta=punto_venta,
 
-                                codigo_centro_costo=codigo_centro,
+    if request.method == 'POST':
 
-                                centro_costo_punto=centro_punto
+        form = ImportarActivosForm(request.POST, request.FILES)
 
-                            )
+        if form.is_valid():
 
-                            nuevo_activo.save()
+            excel_file = request.FILES['archivo_excel']
 
-                            
+            es_ajax = request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
 
-                            # Registrar trazabilidad
+            
 
-                            Tranzabilidad.objects.create(
+            try:
 
-                                activo=nuevo_activo,
+                if settings.IMPORTACION_EN_SEGUNDO_PLANO:
 
-                                tipo='ingreso',
+                    # Se encola y responde de inmediato; el worker (procesar_importaciones)
 
-                                usuario=request.user,
+                    # procesa el archivo y el cliente consulta el progreso
 
-                                zona_destino=zona_txt,
+                    trabajo = encolar_importacion(excel_file, request.user)
 
-                                descripcion='Importación masiva desde Excel'
+                    msg = f'La importación #{trabajo.pk} quedó en cola. Puedes seguir trabajando mientras se procesa.'
 
-                            )
+                    
 
-                            
+                    if es_ajax:
 
-                            importados += 1
+                        return JsonResponse({
 
-                        
+                            'success': True,
 
-                    except Exception as e:
+                            'trabajo_id': trabajo.pk,
 
-                        print(f"Error en fila {row_idx}: {e}")
+                            'progreso_url': reverse('activos:progreso_importacion', kwargs={'pk': trabajo.pk}),
 
-                        errores += 1
+                            'message': msg,
 
-                        errores_list.append(f"Fila {row_idx}: Error inesperado - {str(e)}")
+                            'icon': 'info',
 
-                
+                            'title': 'Importación en Cola'
 
-                # Construir mensaje final
+                        }, status=202)
 
-                icono = 'success'
 
-                titulo = 'Proceso Finalizado'
 
-                
+                    messages.info(request, msg)
 
-                msg = f'<br>Importados: {importados}<br>Actualizados: {actualizados}<br>Omitidos (Duplicados): {omitidos}'
+                    return redirect('activos:home')
 
                 
 
-                if errores > 0:
-
-                    icono = 'warning'
+                # Sin worker: se procesa en la misma petición
 
-                    titulo = 'Importación con Observaciones'
+                trabajo = encolar_importacion(excel_file, request.user, estado='procesando')
 
-                    detalles_error = "<br>".join(errores_list[:5]) # Mostrar primeros 5
+                trabajo = ejecutar_trabajo(trabajo, excel_file)
 
-                    if len(errores_list) > 5:
-
-                        detalles_error += f"<br>... y {len(errores_list)-5} errores más."
-
-                    msg += f'<br><br><b>Errores ({errores}):</b><br><div style="text-align:left; font-size:0.9em;">{detalles_error}</div>'
+                datos = progreso(trabajo)
 
                 
 
-                if request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
-
-                    return JsonResponse({
-
-                        'success': errores == 0, # Aunque haya errores, el proceso terminó. success=False puede indicar fallo total.
-
-                        # Aquí, si hay importados parciales, es un "success" parcial.
-
-                        # Pero para el frontend, queremos que muestre el icono correcto.
-
-                        'message': msg,
+                if es_ajax:
 
-                        'icon': icono,
+                    return JsonResponse(datos, status=500 if trabajo.estado == 'fallido' else 200)
 
-                        'title': titulo,
 
-                        'reload': True # Indicar que se debe recargar la página al cerrar alerta
 
-                    })
+                if trabajo.estado == 'fallido':
 
+                    messages.error(request, trabajo.mensaje)
 
+                else:
 
-                # Usar el sistema de mensajes de Django, pero pasando flags para que SweetAlert lo renderice bien (HTML)
+                    # Usar el sistema de mensajes de Django, pero pasando flags para que SweetAlert lo renderice bien (HTML)
 
-                messages.add_message(request, messages.SUCCESS if errores == 0 else messages.WARNING, msg, extra_tags='html_safe')
+                    messages.add_message(request, messages.SUCCESS if trabajo.errores == 0 else messages.WARNING, trabajo.mensaje, extra_tags='html_safe')
 
                 
 
@@ -1200,7 +438,7 @@ def importar_activos(request):
 
                 err_msg = f'Error al procesar el archivo: {str(e)}'
 
-                if request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
+                if es_ajax:
 
                     return JsonResponse({
 
@@ -1218,12 +456,6 @@ def importar_activos(request):
 
                 return redirect('activos:home')
 
-                
-
-            except Exception as e:
-
-                messages.error(request, f'Error al procesar el archivo: {str(e)}')
-
     else:
 
         form = ImportarActivosForm()
@@ -1242,79 +474,65 @@ def importar_activos(request):
 
 
 
-class ActivoCreateView(LoginRequiredMixin, CreateView):
-
-    model = Activo
-
-    form_class = ActivoForm
-
-    template_name = 'activos/activo_form.html'
+@login_required
 
-    success_url = reverse_lazy('activos:home')
+def progreso_importacion(request, pk):
 
-    
+    """Progreso de un trabajo de importación en JSON (lo consulta importar_form.html)."""
 
-    def get_template_names(self):
+    if request.user.rol not in ['admin', 'logistica']:
 
-        if self.request.GET.get('modal'):
+        return JsonResponse({'error': 'No tienes permisos para ver importaciones.'}, status=403)
 
-            return ['activos/partials/form_activo.html']
 
-        return [self.template_name]
 
+    trabajo = get_object_or_404(TrabajoImportacion.objects.defer('archivo'), pk=pk)
 
+    if trabajo.usuario_id != request.user.pk and request.user.rol != 'admin':
 
-    def get_form_kwargs(self):
+        return JsonResponse({'error': 'No tienes permisos para ver esta importación.'}, status=403)
 
-        kwargs = super().get_form_kwargs()
 
-        kwargs['is_update'] = False
 
-        return kwargs
+    return JsonResponse(progreso(trabajo))
 
-    
 
-    def get_context_data(self, **kwargs):
 
-        context = super().get_context_data(**kwargs)
+class ActivoCreateView(LoginRequiredMixin, CreateView):
 
-        # Datos para autocompletado
+    model = Activo
 
-        context['documentos'] = Activo.objects.exclude(documento__isnull=True).exclude(documento='').values_list('documento', flat=True).distinct()
+    form_class = ActivoForm
 
-        context['nombres'] = Activo.objects.exclude(nombres_apellidos__isnull=True).exclude(nombres_apellidos='').values_list('nombres_apellidos', flat=True).distinct()
+    template_name = 'activos/activo_form.html'
 
-        context['identificaciones'] = Activo.objects.exclude(identificacion__isnull=True).exclude(identificacion='').values_list('identificacion', flat=True).distinct()
+    success_url = reverse_lazy('activos:home')
 
-        context['codigos_centro'] = Activo.objects.exclude(codigo_centro_costo__isnull=True).exclude(codigo_centro_costo='').values_list('codigo_centro_costo', flat=True).distinct()
+    
 
-        context['nombres_centro'] = Activo.objects.exclude(centro_costo_punto__isnull=True).exclude(centro_costo_punto='').values_list('centro_costo_punto', flat=True).distinct()
+    def get_template_names(self):
 
-        
+        if self.request.GET.get('modal'):
 
-        # Datos de marcas agrupadas por categoría para filtrado dinámico
+            return ['activos/partials/form_activo.html']
 
-        marcas_por_categoria = {}
+        return [self.template_name]
 
-        for marca in Marca.objects.select_related('categoria').all():
 
-            cat_id = marca.categoria.id
 
-            if cat_id not in marcas_por_categoria:
+    def get_form_kwargs(self):
 
-                marcas_por_categoria[cat_id] = []
+        kwargs = super().get_form_kwargs()
 
-            marcas_por_categoria[cat_id].append({'id': marca.id, 'nombre': marca.nombre})
+        kwargs['is_update'] = False
 
-        context['marcas_por_categoria_json'] = json.dumps(marcas_por_categoria)
+        return kwargs
 
-        
 
-        context['marcas_por_categoria_json'] = json.dumps(marcas_por_categoria)
 
-        
+    # Las marcas por categoría las carga el formulario desde autocompletado_activos
 
-        return context
+    # (JSON en caché con ETag) y las sugerencias por campo, desde sugerencias_activos
 
 
 
@@ -1346,6 +564,8 @@ class ActivoDetailView(LoginRequiredMixin, DetailView):
 
     model = Activo
 
+    queryset = Activo.objects.select_related('categoria', 'marca__categoria', 'zona')
+
     template_name = 'activos/activo_detail.html'
 
 
@@ -1384,69 +604,31 @@ class ActivoUpdateView(LoginRequiredMixin, UpdateView):
 
 
 
-    def get_form_kwargs(self):
-
-        kwargs = super().get_form_kwargs()
-
-        kwargs['is_update'] = True
-
-        return kwargs
-
-
-
-    def form_invalid(self, form):
-
-        response = super().form_invalid(form)
-
-        if self.request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
-
-            response.status_code = 422
-
-        return response
-
-    
-
-    def get_context_data(self, **kwargs):
-
-        context = super().get_context_data(**kwargs)
-
-        # Datos para autocompletado
-
-        context['documentos'] = Activo.objects.exclude(documento__isnull=True).exclude(documento='').values_list('documento', flat=True).distinct()
-
-        context['nombres'] = Activo.objects.exclude(nombres_apellidos__isnull=True).exclude(nombres_apellidos='').values_list('nombres_apellidos', flat=True).distinct()
-
-        context['identificaciones'] = Activo.objects.exclude(identificacion__isnull=True).exclude(identificacion='').values_list('identificacion', flat=True).distinct()
-
-        context['codigos_centro'] = Activo.objects.exclude(codigo_centro_costo__isnull=True).exclude(codigo_centro_costo='').values_list('codigo_centro_costo', flat=True).distinct()
+    def get_form_kwargs(self):
 
-        context['nombres_centro'] = Activo.objects.exclude(centro_costo_punto__isnull=True).exclude(centro_costo_punto='').values_list('centro_costo_punto', flat=True).distinct()
+        kwargs = super().get_form_kwargs()
 
-        
+        kwargs['is_update'] = True
 
-        # Datos de marcas agrupadas por categoría para filtrado dinámico
+        return kwargs
 
-        marcas_por_categoria = {}
 
-        for marca in Marca.objects.select_related('categoria').all():
 
-            cat_id = marca.categoria.id
+    def form_invalid(self, form):
 
-            if cat_id not in marcas_por_categoria:
+        response = super().form_invalid(form)
 
-                marcas_por_categoria[cat_id] = []
+        if self.request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
 
-            marcas_por_categoria[cat_id].append({'id': marca.id, 'nombre': marca.nombre})
+            response.status_code = 422
 
-        context['marcas_por_categoria_json'] = json.dumps(marcas_por_categoria)
+        return response
 
-        
 
-        context['marcas_por_categoria_json'] = json.dumps(marcas_por_categoria)
 
-        
+    # Las marcas por categoría las carga el formulario desde autocompletado_activos
 
-        return context
+    # (JSON en caché con ETag) y las sugerencias por campo, desde sugerencias_activos
 
 
 
@@ -1658,37 +840,7 @@ class ActivoAsignarView(LoginRequiredMixin, UpdateView):
 
         context['titulo'] = 'Asignar Activo'
 
-        # Datos para autocompletado (igual que en UpdateView)
-
-        context['documentos'] = Activo.objects.exclude(documento__isnull=True).exclude(documento='').values_list('documento', flat=True).distinct()
-
-        context['nombres'] = Activo.objects.exclude(nombres_apellidos__isnull=True).exclude(nombres_apellidos='').values_list('nombres_apellidos', flat=True).distinct()
-
-        context['identificaciones'] = Activo.objects.exclude(identificacion__isnull=True).exclude(identificacion='').values_list('identificacion', flat=True).distinct()
-
-        context['codigos_centro'] = Activo.objects.exclude(codigo_centro_costo__isnull=True).exclude(codigo_centro_costo='').values_list('codigo_centro_costo', flat=True).distinct()
-
-        context['nombres_centro'] = Activo.objects.exclude(centro_costo_punto__isnull=True).exclude(centro_costo_punto='').values_list('centro_costo_punto', flat=True).distinct()
-
-        
-
-        # Datos de marcas agrupadas por categoría para filtrado dinámico
-
-        marcas_por_categoria = {}
-
-        for marca in Marca.objects.select_related('categoria').all():
-
-            cat_id = marca.categoria.id
-
-            if cat_id not in marcas_por_categoria:
-
-                marcas_por_categoria[cat_id] = []
-
-            marcas_por_categoria[cat_id].append({'id': marca.id, 'nombre': marca.nombre})
-
-        context['marcas_por_categoria_json'] = json.dumps(marcas_por_categoria)
-
-        
+        # Autocompletado: igual que en UpdateView, lo carga el formulario desde autocompletado_activos
 
         return context
 
@@ -1752,6 +904,8 @@ class ActivoDeleteView(LoginRequiredMixin, DeleteView):
 
             usuario=self.request.user,
 
+            item_eliminado=self.object.pk,
+
             descripcion=f'Activo eliminado. Serial: {self.object.sn}, Documento: {self.object.documento}'
 
         )
@@ -1782,7 +936,7 @@ def eliminar_multiples_activos(request):
 
         # Obtener los IDs de los activos a eliminar
 
-        activos_ids = request.POST.getlist('activos_ids')
+        activos_ids = [pk for pk in request.POST.getlist('activos_ids') if pk.isdigit()]
 
         
 
@@ -1794,37 +948,17 @@ def eliminar_multiples_activos(request):
 
         
 
-        # Eliminar los activos
+        # Eliminar (o archivar) por lotes, con los registros de tranzabilidad en bloque
 
-        activos_eliminados = Activo.objects.filter(pk__in=activos_ids)
+        archivar = request.POST.get('archivar') == '1'
 
-        cantidad = activos_eliminados.count()
+        cantidad = eliminar_activos(activos_ids, request.user, archivar=archivar)
 
         
 
-        # Registrar trazabilidad para cada activo antes de eliminar
-
-        for activo in activos_eliminados:
+        accion = 'archivaron' if archivar else 'eliminaron'
 
-            Tranzabilidad.objects.create(
-
-                activo=activo,
-
-                tipo='eliminacion',
-
-                usuario=request.user,
-
-                descripcion=f'Activo eliminado (Masivo). Serial: {activo.sn}, Documento: {activo.documento}'
-
-            )
-
-
-
-        activos_eliminados.delete()
-
-        
-
-        messages.success(request, f'Se eliminaron {cantidad} activo(s) exitosamente.')
+        messages.success(request, f'Se {accion} {cantidad} activo(s) exitosamente.')
 
         return redirect('activos:home')
 
@@ -1844,7 +978,7 @@ def eliminar_multiples_activos(request):
 
     
 
-    activos = Activo.objects.filter(pk__in=activos_ids)
+    activos = Activo.objects.filter(pk__in=activos_ids).select_related('marca')
 
     
 
@@ -1868,7 +1002,7 @@ def eliminar_multiples_activos(request):
 
 # Tranzabilidad CRUD
 
-class TranzabilidadListView(LoginRequiredMixin, ListView):
+class TranzabilidadListView(LoginRequiredMixin, PaginacionCursorMixin, ListView):
 
     model = Tranzabilidad
 
@@ -1878,6 +1012,10 @@ class TranzabilidadListView(LoginRequiredMixin, ListView):
 
     paginate_by = 20
 
+    # Paginación por cursor sobre (fecha, id), cubierta por activos_tranz_fecha_id_idx
+
+    orden_cursor = ('-fecha', '-id')
+
 
 
     def dispatch(self, request, *args, **kwargs):
@@ -1896,7 +1034,15 @@ class TranzabilidadListView(LoginRequiredMixin, ListView):
 
         queryset = super().get_queryset()
 
-        queryset = queryset.select_related('activo', 'usuario', 'activo__categoria', 'activo__marca')
+        queryset = queryset.select_related('activo', 'usuario', 'activo__categoria', 'activo__marca__categoria', 'activo__zona')
+
+        # Cambios de Historial de cada movimiento (para el modal), en una consulta para toda la página
+
+        queryset = queryset.prefetch_related(
+
+            Prefetch('historiales', queryset=Historial.objects.order_by('fecha', 'id'))
+
+        )
 
         
 
@@ -1934,19 +1080,19 @@ class TranzabilidadListView(LoginRequiredMixin, ListView):
 
         
 
-        activo_query = self.request.GET.get('activo')
+        activo_query = normalizar(self.request.GET.get('activo'))
 
         if activo_query:
 
             queryset = queryset.filter(
 
-                Q(activo__activo__icontains=activo_query) |
+                Q(activo__activo_normalizado__contains=activo_query) |
 
-                Q(activo__sn__icontains=activo_query) |
+                Q(activo__sn_normalizado__contains=activo_query) |
 
                 Q(activo__item__icontains=activo_query) |
 
-                Q(activo__documento__icontains=activo_query)
+                Q(activo__documento_normalizado__contains=activo_query)
 
             )
 
@@ -1954,15 +1100,15 @@ class TranzabilidadListView(LoginRequiredMixin, ListView):
 
         # Filtro especifico por IMEI (busca en imei1 o imei2)
 
-        imei = self.request.GET.get('imei')
+        imei = normalizar(self.request.GET.get('imei'))
 
         if imei:
 
             queryset = queryset.filter(
 
-                Q(activo__imei1__icontains=imei) |
+                Q(activo__imei1_normalizado__contains=imei) |
 
-                Q(activo__imei2__icontains=imei)
+                Q(activo__imei2_normalizado__contains=imei)
 
             )
 
@@ -1982,11 +1128,9 @@ class TranzabilidadListView(LoginRequiredMixin, ListView):
 
         context['tipos_accion'] = Tranzabilidad.TIPO_CHOICES
 
-        context['usuarios'] = get_user_model().objects.filter(
-
-            id__in=Tranzabilidad.objects.values_list('usuario_id', flat=True).distinct()
+        # Usuarios con movimientos, desde la caché (ver activos/movimientos.py)
 
-        )
+        context['usuarios'] = usuarios_con_movimientos()
 
         
 
@@ -2006,40 +1150,6 @@ class TranzabilidadListView(LoginRequiredMixin, ListView):
 
         
 
-        # Historial de cambios por movimiento (para el modal)
-
-        # Optimizacion: Evitar consultas N+1 cargando historiales relevantes en memoria o filtrando
-
-        # Dado que es paginado, podemos hacer la consulta para los items de la pagina actual
-
-        movimientos_page = context['movimientos'] # Esto es la page_obj o lista paginada en ListView
-
-        
-
-        historiales = {}
-
-        for mov in movimientos_page:
-
-            if mov.activo and mov.tipo in ['actualizacion', 'cambio_estado']:
-
-                # Buscamos historiales cercanos a la fecha del movimiento
-
-                # Usamos un rango pequeño de tiempo porque el historial se crea en la misma transacción/flujo
-
-                historiales[mov.id] = Historial.objects.filter(
-
-                    activo=mov.activo,
-
-                    fecha__range=[mov.fecha - timedelta(seconds=2), mov.fecha + timedelta(seconds=2)]
-
-                ).order_by('fecha')
-
-        
-
-        context['historiales'] = historiales
-
-        
-
         return context
 
 
@@ -2068,15 +1178,25 @@ class RegistrarTranzabilidadView(LoginRequiredMixin, CreateView):
 
 
 
+    def get_form(self, form_class=None):
+
+        form = super().get_form(form_class)
+
+        form.fields['estado_nuevo'] = campo_estado_nuevo()
+
+        return form
+
+
+
     def get_context_data(self, **kwargs):
 
         context = super().get_context_data(**kwargs)
 
         context['activo'] = get_object_or_404(Activo, pk=self.kwargs['pk'])
 
-        # Obtener zonas únicas de los activos
+        # Nombres de las zonas (el movimiento guarda el nombre)
 
-        context['zonas'] = Activo.objects.values_list('zona', flat=True).distinct()
+        context['zonas'] = [zona.nombre for zona in referencias().zonas]
 
         return context
 
@@ -2102,9 +1222,11 @@ class RegistrarTranzabilidadView(LoginRequiredMixin, CreateView):
 
 
 
-        if form.cleaned_data['zona_destino']:
+        zona_destino = referencias().zona(form.cleaned_data['zona_destino'])
 
-            activo.zona = form.cleaned_data['zona_destino']
+        if zona_destino:
+
+            activo.zona = zona_destino
 
             activo.save()
 
@@ -2132,9 +1254,11 @@ def historial_activo(request, pk):
 
     activo = get_object_or_404(Activo, pk=pk)
 
-    historial = Historial.objects.filter(activo=activo).order_by('-fecha')
+    # Ambas consultas usan los índices (activo, fecha)
+
+    historial = Historial.objects.filter(activo=activo).select_related('usuario').order_by('-fecha')
 
-    movimientos = Tranzabilidad.objects.filter(activo=activo).order_by('-fecha')
+    movimientos = Tranzabilidad.objects.filter(activo=activo).select_related('usuario').order_by('-fecha')
 
     return render(request, 'activos/historial_activo.html', {
 
@@ -2164,55 +1288,29 @@ def reporte_por_sede(request):
 
     # Obtener parámetros de filtro
 
-    fecha_inicio = request.GET.get('fecha_inicio')
-
-    fecha_fin = request.GET.get('fecha_fin')
-
-    zona = request.GET.get('zona')
-
-    categoria = request.GET.get('categoria')
-
-    estado = request.GET.get('estado')
-
-
-
-    # Base queryset
-
-    activos = Activo.objects.all().select_related('categoria')
-
-
-
-    # Aplicar filtros
-
-    if fecha_inicio:
+    filtros = leer_filtros(request.GET)
 
-        activos = activos.filter(fecha_creacion__date__gte=fecha_inicio)
 
-    if fecha_fin:
 
-        activos = activos.filter(fecha_creacion__date__lte=fecha_fin)
+    # Base queryset con los filtros aplicados (compartidos con exportar_excel)
 
-    if zona:
+    activos = filtrar_activos(request.GET, Activo.objects.all().select_related('categoria', 'zona', 'marca__categoria'))
 
-        activos = activos.filter(zona=zona)
 
-    if categoria:
 
-        activos = activos.filter(categoria_id=categoria)
+    # Datos para los filtros (desde el resumen de inventario, sin recorrer todos los activos)
 
-    if estado:
+    con_activos = InventarioResumen.objects.filter(total__gt=0)
 
-        activos = activos.filter(estado=estado)
+    refs = referencias()
 
+    con_zona = set(con_activos.values_list('zona_id', flat=True).distinct())
 
+    zonas = [zona for zona in refs.zonas if zona.pk in con_zona]
 
-    # Datos para los filtros
+    categorias = sorted(refs.categorias, key=lambda categoria: categoria.nombre)
 
-    zonas = Activo.objects.values_list('zona', flat=True).distinct().order_by('zona')
-
-    categorias = Categoria.objects.all().order_by('nombre')
-
-    estados = Activo.objects.values_list('estado', flat=True).distinct().order_by('estado')
+    estados = con_activos.values_list('estado', flat=True).distinct().order_by('estado')
 
 
 
@@ -2228,15 +1326,17 @@ def reporte_por_sede(request):
 
         # Mantener filtros seleccionados
 
-        'filtro_fecha_inicio': fecha_inicio,
+        'filtro_fecha_inicio': filtros['fecha_inicio'].isoformat() if filtros['fecha_inicio'] else '',
 
-        'filtro_fecha_fin': fecha_fin,
+        'filtro_fecha_fin': filtros['fecha_fin'].isoformat() if filtros['fecha_fin'] else '',
 
-        'filtro_zona': zona,
+        'filtro_zona': filtros['zona'] or '',
 
-        'filtro_categoria': int(categoria) if categoria else '',
+        'filtro_categoria': filtros['categoria'] or '',
 
-        'filtro_estado': estado,
+        'filtro_estado': filtros['estado'],
+
+        'filtro_incluir_archivo': request.GET.get('incluir_archivo') == '1',
 
     })
 
@@ -2254,215 +1354,55 @@ def exportar_excel(request):
 
 
 
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-    
-
-    # Obtener parámetros de filtro (mismos que en reporte)
-
-    fecha_inicio = request.GET.get('fecha_inicio')
-
-    fecha_fin = request.GET.get('fecha_fin')
-
-    zona = request.GET.get('zona')
-
-    categoria = request.GET.get('categoria')
-
-    estado = request.GET.get('estado')
-
-
-
-    # Base queryset
-
-    activos = Activo.objects.all().select_related('categoria')
+    # Mismos filtros que en el reporte
 
+    activos = filtrar_activos(request.GET)
 
+    # ?incluir_archivo=1: también los activos archivados, con los mismos filtros
 
-    # Aplicar filtros
+    archivados = None
 
-    if fecha_inicio:
+    if request.GET.get('incluir_archivo') == '1':
 
-        activos = activos.filter(fecha_creacion__date__gte=fecha_inicio)
+        archivados = filtrar_activos(request.GET, ActivoArchivado.objects.all())
 
-    if fecha_fin:
 
-        activos = activos.filter(fecha_creacion__date__lte=fecha_fin)
 
-    if zona:
+    # ?formato=csv|ndjson: exportación plana para integraciones, enviada a medida que se lee.
 
-        activos = activos.filter(zona=zona)
+    # Sin formato, los resultados grandes también van en CSV (ver formato_exportacion)
 
-    if categoria:
+    formato = formato_exportacion(request.GET.get('formato'), activos, archivados)
 
-        activos = activos.filter(categoria_id=categoria)
+    if formato in FORMATOS_PLANOS:
 
-    if estado:
+        response = StreamingHttpResponse(exportacion_plana(activos, formato, archivados), content_type=FORMATOS_PLANOS[formato])
 
-        activos = activos.filter(estado=estado)
-
-
-
-    wb = Workbook()
-
-    ws = wb.active
-
-    ws.title = "Reporte de Activos"
+        response['Content-Disposition'] = f'attachment; filename=reporte_activos.{formato}'
 
+        return response
 
 
-    # Definir estilos
 
-    header_fill = PatternFill(start_color="0F172A", end_color="0F172A", fill_type="solid")
+    # Se genera en modo write-only sobre un archivo temporal, con memoria estable sin importar
 
-    header_font = Font(bold=True, color="FFFFFF", size=12)
+    # la cantidad de activos; la respuesta empieza cuando el archivo está completo
 
-    header_alignment = Alignment(horizontal="center", vertical="center")
+    archivo = xlsx_temporal(activos, archivados)
 
-    border = Border(
+    response = FileResponse(
 
-        left=Side(style='thin'),
+        archivo,
 
-        right=Side(style='thin'),
+        as_attachment=True,
 
-        top=Side(style='thin'),
+        filename='reporte_activos.xlsx',
 
-        bottom=Side(style='thin')
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
     )
 
-
-
-    # Headers completos
-
-    headers = ['ITEM', 'DOCUMENTO', 'NOMBRES Y APELLIDOS', 'IMEI 1', 'IMEI 2', 'S/N', 
-
-               'ICCID', 'OPERADOR', 'MAC SUPERFLEX', 'MARCA', 'ACTIVO', 'CARGO', 'ESTADO', 
-
-               'FECHA CONFIRMACIÓN', 'RESPONSABLE', 'IDENTIFICACIÓN', 'ZONA', 'CATEGORÍA', 
-
-               'OBSERVACIÓN', 'PUNTO DE VENTA', 'CÓDIGO CENTRO COSTO', 'CENTRO COSTO PUNTO', 
-
-               'FECHA SALIDA BODEGA', 'FECHA CREACIÓN']
-
-    
-
-    ws.append(headers)
-
-    
-
-    # Aplicar estilos a encabezados
-
-    for cell in ws[1]:
-
-        cell.fill = header_fill
-
-        cell.font = header_font
-
-        cell.alignment = header_alignment
-
-        cell.border = border
-
-
-
-    # Data
-
-    for activo in activos:
-
-        row = [
-
-            activo.item,
-
-            activo.documento or '',
-
-            activo.nombres_apellidos or '',
-
-            activo.imei1 or '',
-
-            activo.imei2 or '',
-
-            activo.sn or '',
-
-            activo.iccid or '',
-
-            activo.operador or '',
-
-            activo.mac_superflex or '',
-
-            str(activo.marca) if activo.marca else '',
-
-            activo.activo or '',
-
-            activo.cargo or '',
-
-            activo.estado or '',
-
-            activo.fecha_confirmacion.strftime('%d/%m/%Y') if activo.fecha_confirmacion else '',
-
-            activo.responsable or '',
-
-            activo.identificacion or '',
-
-            activo.zona or '',
-
-            str(activo.categoria) if activo.categoria else '',
-
-            activo.observacion or '',
-
-            activo.punto_venta or '',
-
-            activo.codigo_centro_costo or '',
-
-            activo.centro_costo_punto or '',
-
-            activo.fecha_salida_bodega.strftime('%d/%m/%Y') if activo.fecha_salida_bodega else '',
-
-            activo.fecha_creacion.strftime('%d/%m/%Y %H:%M') if activo.fecha_creacion else ''
-
-        ]
-
-        ws.append(row)
-
-        
-
-        # Aplicar bordes
-
-        for cell in ws[ws.max_row]:
-
-            cell.border = border
-
-
-
-    # Ajustar ancho de columnas
-
-    for column in ws.columns:
-
-        max_length = 0
-
-        column_letter = column[0].column_letter
-
-        for cell in column:
-
-            try:
-
-                if len(str(cell.value)) > max_length:
-
-                    max_length = len(str(cell.value))
-
-            except:
-
-                pass
-
-        adjusted_width = (max_length + 2) * 1.2
-
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-
-    response['Content-Disposition'] = 'attachment; filename=reporte_activos.xlsx'
-
-    wb.save(response)
+    response.block_size = 64 * 1024
 
     return response
 
@@ -2476,10 +1416,6 @@ def exportar_excel(request):
 
 
 
-
-
-
-
 # Zona CRUD
 
 
@@ -2596,6 +1532,20 @@ class ZonaDeleteView(LoginRequiredMixin, DeleteView):
 
 
 
+    def form_valid(self, form):
+
+        try:
+
+            return super().form_valid(form)
+
+        except ProtectedError:
+
+            messages.error(self.request, 'No se puede eliminar la zona: tiene activos asignados.')
+
+            return redirect('activos:zona_list')
+
+
+
 
 
 # Categoria CRUD
@@ -2829,23 +1779,21 @@ class CategoriaDeleteView(LoginRequiredMixin, DeleteView):
 def buscar_activos_ajax(request):
     """
     Busca activos por varios criterios y retorna JSON.
-    Query params: q (termino de busqueda)
+    Query params: q (termino de busqueda), modo ('exacto' para lecturas del escáner),
+    incluir_archivo ('1' para buscar también en los activos archivados)
     """
-    query = request.GET.get('q', '').strip()
+    query = normalizar(request.GET.get('q', '')) or ''
     if len(query) < 2:
         return JsonResponse({'results': []})
+
+    modo = request.GET.get('modo', 'completo')
+    if modo not in MODOS_BUSQUEDA:
+        modo = 'completo'
     
-    # Buscar por SN, Activo, Documento, IMEI
-    # Priorizar coincidencias exactas o inicio
-    
-    qs = Activo.objects.filter(
-        Q(sn__icontains=query) |
-        Q(activo__icontains=query) |
-        Q(documento__icontains=query) |
-        Q(imei1__icontains=query) |
-        Q(imei2__icontains=query)
-    ).values('item', 'activo', 'sn', 'documento', 'imei1', 'zona', 'responsable', 'estado')[:20]  # Limitar resultados
+    # Primero coincidencias exactas de SN/IMEI/ICCID/MAC, luego prefijo y luego subcadena (ver busqueda.py)
+    qs = buscar_activos(query, modo=modo, incluir_archivo=request.GET.get('incluir_archivo') == '1')
     
+    refs = referencias()
     results = []
     for item in qs:
         # Construir texto descriptivo
@@ -2858,13 +1806,74 @@ def buscar_activos_ajax(request):
             'text': text,
             'sn': item['sn'],
             'imei': item['imei1'],
-            'zona': item['zona'],
-            'estado': item['estado']
+            'zona': refs.nombre_zona(item['zona_id']),
+            'estado': item['estado'],
+            'nivel': item['nivel'],
+            'archivado': item.get('archivado', False)
         })
         
     return JsonResponse({'results': results})
 
 
+def _etag_autocompletado(request):
+    return autocompletado()['etag']
+
+
+@login_required
+@condition(etag_func=_etag_autocompletado)
+def autocompletado_activos(request):
+    """
+    JSON con las marcas por categoría de los formularios de Activo.
+    Responde 304 si el ETag del navegador sigue vigente.
+    """
+    response = HttpResponse(autocompletado()['contenido'], content_type='application/json')
+    # El navegador debe revalidar siempre con el ETag (form_activo.html lo guarda en localStorage)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def sugerencias_activos(request, campo):
+    """Valores del campo que empiezan por ?q= (sugerencias de los formularios de Activo)."""
+    if campo not in CAMPOS_SUGERENCIAS:
+        return JsonResponse({'error': 'Campo no válido'}, status=404)
+    response = JsonResponse({'campo': campo, 'resultados': sugerencias(campo, request.GET.get('q', ''))})
+    # Las mismas letras se repiten al escribir y borrar: el navegador puede reutilizar la respuesta un momento
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
+
+
+@login_required
+def metricas_vistas(request):
+    """
+    Percentiles de consultas, tiempos y tamaño por vista de este proceso (ver activos/metricas.py).
+    POST con reiniciar=1 descarta las muestras.
+    """
+    if request.user.rol != 'admin':
+        return JsonResponse({'error': 'No tienes permisos para ver las métricas.'}, status=403)
+    if request.method == 'POST' and request.POST.get('reiniciar') == '1':
+        metricas.reiniciar()
+    return JsonResponse(metricas.resumen())
+
+
+@login_required
+def exportar_delta(request):
+    """
+    Cambios desde la marca ?desde= (fecha ISO 8601; sin ella, todo) en NDJSON
+    (ver activos/delta.py). La siguiente marca va en la línea "fin" y en X-Delta-Siguiente.
+    """
+    if request.user.rol not in ['admin', 'logistica', 'asignador']:
+        return JsonResponse({'error': 'No tienes permisos para exportar reportes.'}, status=403)
+    try:
+        desde = leer_marca(request.GET.get('desde'))
+    except MarcaInvalida as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    hasta = fin_de_ventana(desde)
+    response = StreamingHttpResponse(lineas_delta(desde, hasta), content_type='application/x-ndjson')
+    response['X-Delta-Siguiente'] = hasta.isoformat()
+    return response
+
+
 class RegistrarTranzabilidadGeneralView(LoginRequiredMixin, CreateView):
 
     model = Tranzabilidad
@@ -2899,15 +1908,16 @@ class RegistrarTranzabilidadGeneralView(LoginRequiredMixin, CreateView):
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         form.fields['activo'].widget.attrs.update({'class': 'form-control', 'id': 'id_activo'})
+        form.fields['estado_nuevo'] = campo_estado_nuevo()
         return form
 
     def get_context_data(self, **kwargs):
 
         context = super().get_context_data(**kwargs)
 
-        # Obtener zonas únicas de los activos para el datalist o select
+        # Nombres de las zonas para el select (el movimiento guarda el nombre)
 
-        context['zonas'] = Activo.objects.values_list('zona', flat=True).distinct()
+        context['zonas'] = [zona.nombre for zona in referencias().zonas]
 
         return context
 
@@ -2935,9 +1945,11 @@ class RegistrarTranzabilidadGeneralView(LoginRequiredMixin, CreateView):
 
 
 
-        if form.cleaned_data['zona_destino']:
+        zona_destino = referencias().zona(form.cleaned_data['zona_destino'])
+
+        if zona_destino:
 
-            activo.zona = form.cleaned_data['zona_destino']
+            activo.zona = zona_destino
 
             save_activo = True
 
@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también las consultas de sesión y autenticación
+    'activos.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -74,6 +76,64 @@ DATABASES = {
     )
 }
 
+# En SQLite las transacciones se abren en modo IMMEDIATE para que los workers de
+# importación no lean y escriban los mismos seriales en paralelo.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    })
+
+# Caché de la aplicación (snapshots de los dashboards). Por defecto en memoria
+# del proceso; con varios workers cada uno guarda su copia y el TTL acota el desfase.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'inventario-pda'),
+    }
+}
+
+# Segundos que vive un snapshot de dashboard si ninguna escritura lo invalida antes
+DASHBOARD_CACHE_SEGUNDOS = int(os.environ.get('DASHBOARD_CACHE_SEGUNDOS', '300'))
+
+# Segundos que un proceso usa sus zonas, categorías y marcas en memoria sin volver a leerlas
+# aunque no vea cambiar la versión (ver activos/referencias.py)
+REFERENCIAS_SEGUNDOS = int(os.environ.get('REFERENCIAS_SEGUNDOS', '300'))
+
+# Segundos que vive en caché la lista de usuarios del filtro de tranzabilidad
+TRANZABILIDAD_USUARIOS_CACHE_SEGUNDOS = int(os.environ.get('TRANZABILIDAD_USUARIOS_CACHE_SEGUNDOS', '3600'))
+
+# Días que un activo dado de baja permanece en el inventario antes de poder archivarse
+ARCHIVO_DIAS_BAJA = int(os.environ.get('ARCHIVO_DIAS_BAJA', '180'))
+
+# Métricas por vista (activos/metricas.py): consultas, tiempos y tamaño de cada petición
+METRICAS_ACTIVAS = os.environ.get('METRICAS_ACTIVAS', 'True') == 'True'
+
+# Peticiones recientes por vista sobre las que se calculan los percentiles
+METRICAS_MUESTRAS = int(os.environ.get('METRICAS_MUESTRAS', '500'))
+
+# Consultas SQL por petición que se permiten a una vista sin presupuesto propio
+METRICAS_PRESUPUESTO_CONSULTAS = int(os.environ.get('METRICAS_PRESUPUESTO_CONSULTAS', '30'))
+
+# Presupuesto de consultas de las vistas más usadas (incluye sesión y usuario)
+METRICAS_PRESUPUESTOS = {
+    'activos:home': 8,
+    'activos:admin_dashboard': 6,
+    'activos:logistica_dashboard': 6,
+    'activos:lectura_dashboard': 6,
+    'activos:tranzabilidad_list': 8,
+    'activos:reporte_por_sede': 8,
+    'activos:activo_detail': 6,
+    'activos:activo-create': 6,
+    'activos:activo_update': 8,
+    'activos:buscar_activos_ajax': 6,
+    'activos:sugerencias_activos': 4,
+    'activos:autocompletado_activos': 4,
+}
+
+# Si es True, pasarse del presupuesto levanta PresupuestoExcedido en vez de un warning (pruebas)
+METRICAS_PRESUPUESTO_ESTRICTO = os.environ.get('METRICAS_PRESUPUESTO_ESTRICTO', 'False') == 'True'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,3 +197,27 @@ AUTHENTICATION_BACKENDS = [
     'usuarios.backends.CaseInsensitiveModelBackend',
     'django.contrib.auth.backends.ModelBackend',
 ]
+
+# Importaciones de Excel: si es True se encolan y las procesa
+# `python manage.py procesar_importaciones`; si es False se procesan en la misma petición.
+# Con True hace falta un CACHE_BACKEND compartido (DatabaseCache, Redis, ...): el worker es otro
+# proceso y con LocMemCache la web no ve sus invalidaciones de dashboards, búsqueda y referencias.
+IMPORTACION_EN_SEGUNDO_PLANO = os.environ.get('IMPORTACION_EN_SEGUNDO_PLANO', 'False') == 'True'
+
+# Índice de búsqueda de activos en memoria de cada worker (ver activos/indice.py),
+# unos 700 bytes por activo.
+# Con más activos que el máximo, o pasados los segundos indicados sin reconstruirse,
+# las búsquedas se hacen en SQL. Los cambios de otros procesos se traen de la base
+# cada INDICE_BUSQUEDA_SINCRONIZAR_SEGUNDOS (al buscar).
+INDICE_BUSQUEDA_ACTIVO = os.environ.get('INDICE_BUSQUEDA_ACTIVO', 'True') == 'True'
+INDICE_BUSQUEDA_MAX_ACTIVOS = int(os.environ.get('INDICE_BUSQUEDA_MAX_ACTIVOS', '150000'))
+INDICE_BUSQUEDA_SEGUNDOS = int(os.environ.get('INDICE_BUSQUEDA_SEGUNDOS', '600'))
+INDICE_BUSQUEDA_SINCRONIZAR_SEGUNDOS = float(os.environ.get('INDICE_BUSQUEDA_SINCRONIZAR_SEGUNDOS', '2'))
+
+# Exportación del reporte (ver activos/exportacion.py): el xlsx no se envía hasta estar completo.
+# Sin ?formato=, con más filas que este límite se exporta en CSV, que sí se envía mientras se lee.
+EXPORTACION_XLSX_MAX_FILAS = int(os.environ.get('EXPORTACION_XLSX_MAX_FILAS', '50000'))
+
+# Exportación delta (ver activos/delta.py): se exporta hasta "ahora" menos este margen,
+# para no saltarse cambios de transacciones que aún no se confirman al momento de exportar.
+DELTA_MARGEN_SEGUNDOS = int(os.environ.get('DELTA_MARGEN_SEGUNDOS', '60'))